@@ -0,0 +1,225 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+import trio
+from attr import define, field
+
+CASSETTE_VERSION = 1
+RECORD = "record"
+REPLAY = "replay"
+
+# The body is stored decoded, these would describe the encoded one
+_DROPPED_RESPONSE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class CassetteMiss(Exception):
+    """A replayed request that was not recorded"""
+
+
+def _body_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:16] if content else ""
+
+
+def _encode_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(body: Dict[str, str]) -> bytes:
+    if "base64" in body:
+        return base64.b64decode(body["base64"])
+    return body["text"].encode("utf-8")
+
+
+@define
+class Cassette:
+    """
+    Http interactions and client library calls, recorded to a json file.
+
+    Interactions are matched on method, url and request body; the same request
+    sent several times is answered in the order it was recorded. Request headers
+    (and so tokens) are never stored. Replayed responses wait `latency` times the
+    recorded latency, 0 answers at once and 1 replays at realistic timings.
+    """
+
+    path: Path
+    mode: str = REPLAY
+    latency: float = 0.0
+    sleep: Callable[[float], None] = time.sleep
+    interactions: List[Dict[str, Any]] = field(init=False, factory=list)
+    calls: List[Dict[str, Any]] = field(init=False, factory=list)
+    _pending: Dict[Tuple, Deque[Dict]] = field(init=False)
+    _lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    def __attrs_post_init__(self):
+        self.path = Path(self.path)
+        if self.mode not in (RECORD, REPLAY):
+            raise ValueError(f"unknown cassette mode: {self.mode}")
+        if self.mode == REPLAY:
+            data = json.loads(self.path.read_text())
+            self.interactions = data["interactions"]
+            self.calls = data.get("calls", [])
+        self._pending = defaultdict(deque)
+        for i in self.interactions:
+            req = i["request"]
+            self._pending[(req["method"], req["url"], req["body"])].append(i)
+        for c in self.calls:
+            self._pending[("call", c["name"], json.dumps(c["args"]))].append(c)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    # Http
+
+    def record(self, request: httpx.Request, response: httpx.Response, elapsed: float):
+        interaction = {
+            "request": {
+                "method": request.method,
+                "url": str(request.url),
+                "body": _body_hash(request.content),
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": [
+                    [k, v]
+                    for k, v in response.headers.items()
+                    if k.lower() not in _DROPPED_RESPONSE_HEADERS
+                ],
+                "body": _encode_body(response.content),
+            },
+            "latency": elapsed,
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def play(self, request: httpx.Request) -> Tuple[httpx.Response, float]:
+        """The recorded response of a request, and how long to wait before it"""
+        key = (request.method, str(request.url), _body_hash(request.content))
+        recorded = self._next(key, f"{request.method} {request.url}")
+        res = recorded["response"]
+        response = httpx.Response(
+            res["status_code"],
+            headers=res["headers"],
+            content=_decode_body(res["body"]),
+            request=request,
+        )
+        return response, recorded["latency"] * self.latency
+
+    # Client library calls
+
+    def call(self, name: str, args: List[Any], fn: Callable[[], Any]) -> Any:
+        """Record the json result of `fn`, or replay it without calling `fn`"""
+        if self.recording:
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.calls.append(
+                    {"name": name, "args": args, "result": result, "latency": elapsed}
+                )
+            return result
+        recorded = self._next(("call", name, json.dumps(args)), f"{name}{args}")
+        if self.latency:
+            self.sleep(recorded["latency"] * self.latency)
+        return recorded["result"]
+
+    def save(self):
+        if not self.recording:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": CASSETTE_VERSION,
+            "interactions": self.interactions,
+            "calls": self.calls,
+        }
+        self.path.write_text(json.dumps(data, indent=1))
+
+    def _next(self, key: Tuple, description: str) -> Dict:
+        with self._lock:
+            queue = self._pending.get(key)
+            if not queue:
+                raise CassetteMiss(f"not in cassette {self.path}: {description}")
+            return queue.popleft()
+
+
+class CassetteTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Serve requests from a cassette, or send them and record the responses.
+
+    Works for both the sync and the async client, pass it as the transport of
+    the session.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.cassette = cassette
+        self._transport = transport
+        self._async_transport = async_transport
+        # the session may open a new client on this transport after closing one,
+        # only the transports created here are dropped on close
+        self._owned = transport is None, async_transport is None
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.cassette.recording:
+            response, delay = self.cassette.play(request)
+            if delay:
+                self.cassette.sleep(delay)
+            return response
+        if self._transport is None:
+            self._transport = httpx.HTTPTransport()
+        start = time.perf_counter()
+        response = self._transport.handle_request(request)
+        response.read()
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.cassette.recording:
+            response, delay = self.cassette.play(request)
+            if delay:
+                await trio.sleep(delay)
+            return response
+        if self._async_transport is None:
+            self._async_transport = httpx.AsyncHTTPTransport()
+        start = time.perf_counter()
+        response = await self._async_transport.handle_async_request(request)
+        await response.aread()
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        if self._transport is not None and self._owned[0]:
+            self._transport.close()
+            self._transport = None
+
+    async def aclose(self):
+        if self._async_transport is not None and self._owned[1]:
+            await self._async_transport.aclose()
+            self._async_transport = None
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The cassette of the running command, None outside of record/replay"""
+    return _cassette
+
+
+def use_cassette(cassette: Optional[Cassette]):
+    global _cassette
+    _cassette = cassette
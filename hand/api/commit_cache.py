@@ -0,0 +1,133 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from hand.config import DEFAULT_BASE_FOLDER
+from hand.exchange import GitHubCommitInfo, GitHubRepoCommit
+
+DEFAULT_CACHE_PATH = DEFAULT_BASE_FOLDER / "commit-push-times.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS push_times (
+    org TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    commit_hash TEXT NOT NULL,
+    pushed_time TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (org, repo, commit_hash)
+);
+"""
+
+
+class CommitPushCache:
+    """
+    Push times of commits already seen, keyed by (org, repo, commit hash).
+
+    The push time of a commit never changes once Github recorded it, so entries
+    don't expire, they are only removed by `prune`.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(_SCHEMA)
+
+    def get_many(
+        self, org: str, commits: Iterable[GitHubRepoCommit]
+    ) -> Dict[GitHubRepoCommit, GitHubCommitInfo]:
+        """Cached push times of the commits, unseen commits are left out"""
+        found = {}
+        for commit in commits:
+            row = self._conn.execute(
+                "SELECT pushed_time FROM push_times"
+                " WHERE org = ? AND repo = ? AND commit_hash = ?",
+                (org, commit.name, commit.commit_hash),
+            ).fetchone()
+            if row is not None:
+                found[commit] = GitHubCommitInfo(
+                    commit_hash=commit.commit_hash, pushed_time=row[0], repo=commit.name
+                )
+        return found
+
+    def put_many(self, org: str, infos: Iterable[GitHubCommitInfo]):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO push_times VALUES (?, ?, ?, ?, ?)",
+            ((org, i.repo, i.commit_hash, i.pushed_time, now) for i in infos),
+        )
+        self._conn.commit()
+
+    def entries(
+        self, org: Optional[str] = None, repo_prefix: str = ""
+    ) -> List[Tuple[str, GitHubCommitInfo, float]]:
+        """(org, commit info, time recorded) of the matching entries"""
+        where, args = self._filter(org, repo_prefix, None)
+        rows = self._conn.execute(
+            "SELECT org, repo, commit_hash, pushed_time, recorded_at FROM push_times"
+            f" {where} ORDER BY org, repo, commit_hash",
+            args,
+        ).fetchall()
+        return [
+            (org, GitHubCommitInfo(repo=repo, commit_hash=h, pushed_time=t), at)
+            for org, repo, h, t, at in rows
+        ]
+
+    def prune(
+        self,
+        org: Optional[str] = None,
+        repo_prefix: str = "",
+        older_than: Optional[float] = None,
+    ) -> int:
+        """
+        Remove the matching entries, all of them without any filter.
+        `older_than` is in seconds since the entry was recorded.
+        Returns the number of entries removed.
+        """
+        where, args = self._filter(org, repo_prefix, older_than)
+        removed = self._conn.execute(f"DELETE FROM push_times {where}", args).rowcount
+        self._conn.commit()
+        return removed
+
+    def info(self) -> Dict[str, int]:
+        count, nm_orgs = self._conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT org) FROM push_times"
+        ).fetchone()
+        return {"entries": count, "orgs": nm_orgs, "size": self.path.stat().st_size}
+
+    def close(self):
+        self._conn.close()
+
+    def _filter(
+        self, org: Optional[str], repo_prefix: str, older_than: Optional[float]
+    ) -> Tuple[str, tuple]:
+        conditions, args = [], []
+        if org is not None:
+            conditions.append("org = ?")
+            args.append(org)
+        if repo_prefix:
+            # GLOB is case sensitive like repo prefixes elsewhere, unlike LIKE
+            conditions.append("repo GLOB ?")
+            args.append(_glob_escape(repo_prefix) + "*")
+        if older_than is not None:
+            conditions.append("recorded_at < ?")
+            args.append(time.time() - older_than)
+        if not conditions:
+            return "", ()
+        return "WHERE " + " AND ".join(conditions), tuple(args)
+
+
+def _glob_escape(s: str) -> str:
+    return "".join(f"[{c}]" if c in "*?[" else c for c in s)
+
+
+_commit_cache: Optional[CommitPushCache] = None
+
+
+def get_commit_cache() -> CommitPushCache:
+    """The cache shared by every command"""
+    global _commit_cache
+    if _commit_cache is None:
+        _commit_cache = CommitPushCache()
+    return _commit_cache
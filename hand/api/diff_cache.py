@@ -0,0 +1,36 @@
+from pathlib import Path
+from typing import Optional
+
+from hand.config import DEFAULT_BASE_FOLDER
+from .git import GitApi
+
+DEFAULT_CACHE_DIR = DEFAULT_BASE_FOLDER / "template-diffs"
+
+
+class TemplateDiffCache:
+    """
+    Patches between two commits of a template repo, keyed by their shas.
+
+    The diff of a pair of commits never changes, so it is computed once and
+    applied to every student repo; entries don't expire.
+    """
+
+    def __init__(
+        self, path: Path = DEFAULT_CACHE_DIR, git_api: Optional[GitApi] = None
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.git_api = git_api or GitApi()
+
+    def path_of(self, base_sha: str, head_sha: str) -> Path:
+        return self.path / f"{base_sha}-{head_sha}.diff"
+
+    def get(self, repo_path: Path, base_sha: str, head_sha: str) -> Path:
+        """The patch file, made from the local template repo on a miss"""
+        patch = self.path_of(base_sha, head_sha)
+        if not patch.exists():
+            # a partly written patch never shows up under the final name
+            tmp = patch.with_suffix(".tmp")
+            self.git_api.write_diff(repo_path, base_sha, head_sha, tmp)
+            tmp.replace(patch)
+        return patch
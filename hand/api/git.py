@@ -1,19 +1,75 @@
 import os
+import re
 from pathlib import Path
+from typing import Iterable, List, Optional
 
 import git
-from attr import define
+from attr import define, field
 from loguru import logger as log
 
 
+def sparse_patterns(paths: Iterable[str]) -> List[str]:
+    """Sparse-checkout patterns matching exactly the given repo paths"""
+    return ["/" + re.sub(r"([\\*?\[])", r"\\\1", p) for p in paths]
+
+
+@define
+class ApplyResult:
+    status: str  # "applied", "conflicted", "no-op" or "failed"
+    conflicts: List[str] = field(factory=list)
+    error: Optional[str] = None
+
+
 @define
 class GitApi:
-    def clone_remote(self, dst: Path, remote_url: str):
-        """Clone a remote repository into a local folder"""
-        git.Repo.clone_from(remote_url, dst)
+    def clone_remote(
+        self,
+        dst: Path,
+        remote_url: str,
+        timeout: Optional[float] = None,
+        reference: Optional[Path] = None,
+        sparse_paths: Optional[Iterable[str]] = None,
+    ):
+        """
+        Clone a remote repository into a local folder
+
+        With `reference`, objects already in that local repository are borrowed
+        through git alternates instead of being fetched and stored again. The
+        reference repository must outlive the clone.
+
+        With `sparse_paths`, the clone is blobless and only those paths are
+        checked out, so only their blobs are downloaded.
+        """
+        opts = {}
+        if reference is not None:
+            opts["reference"] = str(reference)
+        if sparse_paths is not None:
+            opts.update(filter="blob:none", no_checkout=True)
+        # the git process is killed after `timeout` seconds
+        git.Git().clone(remote_url, str(dst), kill_after_timeout=timeout, **opts)
+        if sparse_paths is not None:
+            r: git.Repo = git.Repo(dst)
+            r.git.sparse_checkout("set", "--no-cone", *sparse_patterns(sparse_paths))
+            # the blobs of the checked out paths are fetched on demand
+            r.git.reset("--hard", kill_after_timeout=timeout)
         log.info(f"clone repo: {remote_url} -> {dst}")
 
-    def sync_remote(self, dst: Path, remote_url: str):
+    def mirror_remote(
+        self, dst: Path, remote_url: str, timeout: Optional[float] = None
+    ):
+        """Keep a bare mirror of a remote repository in dst up to date"""
+        if not dst.exists():
+            git.Git().clone(
+                remote_url, str(dst), mirror=True, kill_after_timeout=timeout
+            )
+            log.info(f"mirror repo: {remote_url} -> {dst}")
+            return
+        r: git.Repo = git.Repo(dst)
+        r.remote("origin").set_url(remote_url)
+        r.git.remote("update", "--prune", kill_after_timeout=timeout)
+        log.info(f"update mirror: {remote_url} -> {dst}")
+
+    def sync_remote(self, dst: Path, remote_url: str, timeout: Optional[float] = None):
         """Synchronize a folder in dst with a git repo specified in remote url"""
         r: git.Repo = git.Repo(dst)
         remote = git.Remote(repo=r, name="origin").set_url(remote_url)
@@ -24,4 +80,46 @@ class GitApi:
             log.info(f"remove untracked file: {target}")
         # Reset current tree and update to remote head
         r.heads[0].checkout(force=True)
-        remote.pull()
+        r.git.pull(remote.name, kill_after_timeout=timeout)
+
+    def resolve(self, repo_path: Path, rev: str) -> str:
+        """Full sha of the commit a revision names"""
+        return git.Repo(repo_path).commit(rev).hexsha
+
+    def write_diff(self, repo_path: Path, base: str, head: str, dst: Path):
+        """Write the diff from commit base to head as a patch `git apply` takes"""
+        r: git.Repo = git.Repo(repo_path)
+        with open(dst, "wb") as f:
+            r.git.diff(base, head, "--binary", "--full-index", "-M", output_stream=f)
+
+    def changed_paths(self, repo_path: Path, base: str, head: str) -> List[str]:
+        """Paths the diff from commit base to head touches, both names of a rename"""
+        r: git.Repo = git.Repo(repo_path)
+        out = r.git.diff(base, head, "--name-only", "--no-renames", "-z")
+        return [p for p in out.split("\0") if p]
+
+    def apply_patch(self, repo_path: Path, patch: Path) -> ApplyResult:
+        """
+        Apply a patch to the work tree and the index of a repo.
+
+        Hunks that don't apply cleanly are merged with the blobs the patch was
+        made from, as `git am -3` does; a patch already in the repo is a no-op.
+        """
+        r: git.Repo = git.Repo(repo_path)
+        if patch.stat().st_size == 0:
+            return ApplyResult("no-op")
+        try:
+            r.git.apply("--check", "--reverse", str(patch))
+            return ApplyResult("no-op")
+        except git.GitCommandError:
+            pass
+        try:
+            r.git.apply("--3way", str(patch))
+        except git.GitCommandError as err:
+            unmerged = r.git.diff("--name-only", "--diff-filter=U").splitlines()
+            if unmerged:
+                return ApplyResult("conflicted", conflicts=unmerged)
+            return ApplyResult("failed", error=str(err.stderr).strip())
+        if not r.index.diff("HEAD"):
+            return ApplyResult("no-op")
+        return ApplyResult("applied")
@@ -1,117 +1,763 @@
-from typing import Any, Dict, List, Optional
+import base64
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
-import httpx
-from attr import attrs
+import trio
+from attr import Factory, attrib, attrs
+from loguru import logger as log
 
-from hand.exchange import GitHubRepoCommit
+from hand.exchange import GitHubCommitsAfter, GitHubRepoCommit
+from .session import (
+    AsyncGithubClient,
+    GithubClient,
+    GithubSession,
+    get_session,
+    is_shared_session,
+)
 
+API_ENDPOINT = "https://api.github.com"
 QL_ENDPOINT = "https://api.github.com/graphql"
+# Number of lookups packed into a single GraphQL query
+QL_BATCH_SIZE = 50
+# Existence checks only select a few fields, more repos fit in a query
+QL_CHECK_BATCH_SIZE = 100
+# Max page size of the REST api
+PAGE_SIZE = 100
+# Git Data api entries of `create_tree`, None as the sha of a blob deletes the path
+TreeEntry = Dict[str, Any]
+
+T = TypeVar("T")
+K = TypeVar("K")
+
+
+class GithubQueryError(Exception):
+    """A GraphQL request that failed as a whole, its answers are unknown"""
+
+
+@attrs(auto_attribs=True)
+class ApiCall(Generic[T]):
+    """A single request to Github and how to read its response"""
+
+    method: str
+    url: str
+    parse: Callable[[Any], T]
+    json: Optional[Dict[str, Any]] = None
+    params: Optional[Dict[str, Any]] = None
 
 
 @attrs(auto_attribs=True)
 class GithubAPI:
     token: str
     org: str
+    session: GithubSession = attrib(factory=get_session, repr=False, eq=False)
+    client: GithubClient = attrib(
+        default=Factory(lambda self: self.session.client(self.token), takes_self=True),
+        init=False,
+        repr=False,
+        eq=False,
+    )
+
+    def close(self):
+        """Close the connections of a private session, the shared one stays open"""
+        if not is_shared_session(self.session):
+            self.session.close()
 
     def can_access_org(self) -> bool:
         """Verify if current user can get access to org with token"""
-        client = get_client(self.token)
-        result = viewerIsOrgMember(client, org=self.org)
+        try:
+            result = self._send(viewerIsOrgMember(self.org))
+        except GithubQueryError:
+            return False
         return result if result is not None else False
 
     def invite_user_to_team(self, team_slug: str, user: str) -> bool:
-        # TODO
-        return False
+        return self._send(inviteToTeam(self.org, team_slug, user))
+
+    def invite_users_to_team(self, team_slug: str, users: List[str]) -> Dict[str, bool]:
+        return {u: self.invite_user_to_team(team_slug, u) for u in users}
 
     def get_commit_pushed_time(self, commit: GitHubRepoCommit) -> Optional[str]:
-        client = get_client(self.token)
-        result = commitPushedDate(client, self.org, commit)
+        return self.get_commits_pushed_time([commit])[commit]
+
+    def get_commits_pushed_time(
+        self, commits: Iterable[GitHubRepoCommit], batch_size: int = QL_BATCH_SIZE
+    ) -> Dict[GitHubRepoCommit, Optional[str]]:
+        """
+        Get the push time of many commits, `batch_size` commits per request.
+        Commits that can't be resolved are mapped to None.
+        """
+        result: Dict[GitHubRepoCommit, Optional[str]] = {}
+        for batch in _batches(commits, batch_size):
+            result.update(self._send(commitsPushedDate(self.org, batch)))
         return result
 
     def repo_exists(self, repo: str) -> bool:
-        # TODO
-        return False
+        return self.repos_exist([repo])[repo]
+
+    def repos_exist(
+        self, repos: Iterable[str], batch_size: int = QL_CHECK_BATCH_SIZE
+    ) -> Dict[str, bool]:
+        result: Dict[str, bool] = {}
+        for batch in _batches(repos, batch_size):
+            result.update(self._send(reposExist(self.org, batch)))
+        return result
 
     def query_repo_with_prefix(self, prefix: str) -> List[str]:
-        pass
+        """Names of the repos starting with prefix, from the cached org listing"""
+        from hand.utils.github_scanner import query_matching_repos
+
+        repos = query_matching_repos(self.org, prefix, self.token, verbose=False)
+        return [r.name for r in repos]
+
+    def query_student_repos(
+        self, hw_prefix: str, ignore_list: Iterable[str] = ()
+    ) -> List[str]:
+        """
+        Names of the `{hw_prefix}-{student}` repos of a homework, the repos of the
+        users in `ignore_list` (e.g. graders) are left out.
+        """
+        from hand.utils.github_scanner import partition_matching_repos
+
+        partition = partition_matching_repos(
+            self.org, hw_prefix, self.token, ignore_list, verbose=False
+        )
+        return sorted(r.name for repos in partition.students.values() for r in repos)
+
+    def get_commits_after(
+        self, repos: Iterable[str], since: datetime, batch_size: int = QL_BATCH_SIZE
+    ) -> Dict[str, Optional[GitHubCommitsAfter]]:
+        """
+        Count the commits made after `since` on the default branch of each repo,
+        `batch_size` repos per request. Repos that can't be resolved map to None.
+        """
+        result: Dict[str, Optional[GitHubCommitsAfter]] = {}
+        for batch in _batches(repos, batch_size):
+            result.update(self._send(commitsAfter(self.org, batch, since)))
+        return result
 
     def remote_branch_exists(self, repo: str, branch: str) -> bool:
-        return False
+        return self.remote_branches_exist([repo], branch)[repo]
+
+    def remote_branches_exist(
+        self, repos: Iterable[str], branch: str, batch_size: int = QL_CHECK_BATCH_SIZE
+    ) -> Dict[str, bool]:
+        result: Dict[str, bool] = {}
+        for batch in _batches(repos, batch_size):
+            result.update(self._send(branchesExist(self.org, batch, branch)))
+        return result
+
+    def find_issue_with_title(self, repo: str, title: str) -> Optional[int]:
+        """Number of the first issue (open or closed) with the title"""
+        return self.find_issues_with_title([repo], title)[repo]
+
+    def find_issues_with_title(
+        self, repos: Iterable[str], title: str, batch_size: int = QL_CHECK_BATCH_SIZE
+    ) -> Dict[str, Optional[int]]:
+        """
+        Look for the issue in a page of issues of every repo per query, only repos
+        with more issues left to scan are queried again.
+        """
+        found: Dict[str, Optional[int]] = {}
+        cursors: Dict[str, Optional[str]] = dict.fromkeys(repos)
+        while cursors:
+            pages: Dict[str, IssuePage] = {}
+            for batch in _batches(cursors.items(), batch_size):
+                pages.update(self._send(issuesWithTitle(self.org, batch, title)))
+            cursors = _scan_issue_pages(pages, found)
+        return found
+
+    # Git Data, to commit to a repo without a clone
+
+    def get_branch_head(self, repo: str, branch: str) -> Optional[str]:
+        """Sha of the commit the branch points to"""
+        return self._send(branchHead(self.org, repo, branch))
+
+    def get_commit_tree(self, repo: str, sha: str) -> Optional[str]:
+        return self._send(commitTree(self.org, repo, sha))
+
+    def get_tree_files(self, repo: str, tree: str) -> Optional[List[str]]:
+        """Paths of every file in the tree, subtrees included"""
+        return self._send(treeFiles(self.org, repo, tree))
+
+    def create_blob(self, repo: str, content: bytes) -> Optional[str]:
+        return self._send(createBlob(self.org, repo, content))
+
+    def create_tree(
+        self, repo: str, base_tree: str, entries: List[TreeEntry]
+    ) -> Optional[str]:
+        """A tree of `entries` on top of `base_tree`, its sha"""
+        return self._send(createTree(self.org, repo, base_tree, entries))
+
+    def create_commit(
+        self, repo: str, message: str, tree: str, parents: List[str]
+    ) -> Optional[str]:
+        return self._send(createCommit(self.org, repo, message, tree, parents))
+
+    def create_branch(self, repo: str, branch: str, sha: str) -> bool:
+        return self._send(createRef(self.org, repo, branch, sha))
+
+    def create_pull(
+        self, repo: str, title: str, body: str, head: str, base: str
+    ) -> Optional[int]:
+        """Open a pull request, its number"""
+        return self._send(createPull(self.org, repo, title, body, head, base))
+
+    def _send(self, call: "ApiCall[T]") -> T:
+        res = self.client.request(
+            call.method, call.url, json=call.json, params=call.params
+        )
+        return call.parse(res)
+
+
+@attrs(auto_attribs=True)
+class AsyncGithubAPI:
+    """
+    `GithubAPI` for trio, every method is a coroutine.
+
+    The batch variants fan out inside their own nursery, with at most
+    `concurrency` requests of a call in flight; the rate limit scheduler of the
+    session still bounds the total.
+    """
+
+    token: str
+    org: str
+    session: GithubSession = attrib(factory=get_session, repr=False, eq=False)
+    concurrency: int = 8
+    client: AsyncGithubClient = attrib(
+        default=Factory(
+            lambda self: self.session.async_client(self.token), takes_self=True
+        ),
+        init=False,
+        repr=False,
+        eq=False,
+    )
+
+    async def aclose(self):
+        """Same as `GithubAPI.close`"""
+        if not is_shared_session(self.session):
+            await self.session.aclose()
+
+    async def can_access_org(self) -> bool:
+        """Verify if current user can get access to org with token"""
+        try:
+            result = await self._send(viewerIsOrgMember(self.org))
+        except GithubQueryError:
+            return False
+        return result if result is not None else False
+
+    async def invite_user_to_team(self, team_slug: str, user: str) -> bool:
+        return await self._send(inviteToTeam(self.org, team_slug, user))
+
+    async def invite_users_to_team(
+        self, team_slug: str, users: List[str]
+    ) -> Dict[str, bool]:
+        return await self._gather(
+            lambda u: self.invite_user_to_team(team_slug, u), users
+        )
+
+    async def get_commit_pushed_time(self, commit: GitHubRepoCommit) -> Optional[str]:
+        return (await self.get_commits_pushed_time([commit]))[commit]
+
+    async def get_commits_pushed_time(
+        self, commits: Iterable[GitHubRepoCommit], batch_size: int = QL_BATCH_SIZE
+    ) -> Dict[GitHubRepoCommit, Optional[str]]:
+        """Same as `GithubAPI.get_commits_pushed_time`, batches are sent at once"""
+        return await self._send_batches(
+            lambda batch: commitsPushedDate(self.org, batch), commits, batch_size
+        )
+
+    async def repo_exists(self, repo: str) -> bool:
+        return (await self.repos_exist([repo]))[repo]
+
+    async def repos_exist(
+        self, repos: Iterable[str], batch_size: int = QL_CHECK_BATCH_SIZE
+    ) -> Dict[str, bool]:
+        return await self._send_batches(
+            lambda batch: reposExist(self.org, batch), repos, batch_size
+        )
+
+    async def query_repo_with_prefix(self, prefix: str) -> List[str]:
+        # the cached org listing lives in a sqlite file, keep it off the event loop
+        sync_api = GithubAPI(token=self.token, org=self.org, session=self.session)
+        return await trio.to_thread.run_sync(sync_api.query_repo_with_prefix, prefix)
+
+    async def query_student_repos(
+        self, hw_prefix: str, ignore_list: Iterable[str] = ()
+    ) -> List[str]:
+        sync_api = GithubAPI(token=self.token, org=self.org, session=self.session)
+        return await trio.to_thread.run_sync(
+            sync_api.query_student_repos, hw_prefix, ignore_list
+        )
+
+    async def get_commits_after(
+        self, repos: Iterable[str], since: datetime, batch_size: int = QL_BATCH_SIZE
+    ) -> Dict[str, Optional[GitHubCommitsAfter]]:
+        """Same as `GithubAPI.get_commits_after`, batches are sent at once"""
+        return await self._send_batches(
+            lambda batch: commitsAfter(self.org, batch, since), repos, batch_size
+        )
+
+    async def remote_branch_exists(self, repo: str, branch: str) -> bool:
+        return (await self.remote_branches_exist([repo], branch))[repo]
+
+    async def remote_branches_exist(
+        self, repos: Iterable[str], branch: str, batch_size: int = QL_CHECK_BATCH_SIZE
+    ) -> Dict[str, bool]:
+        return await self._send_batches(
+            lambda batch: branchesExist(self.org, batch, branch), repos, batch_size
+        )
+
+    async def find_issue_with_title(self, repo: str, title: str) -> Optional[int]:
+        """Number of the first issue (open or closed) with the title"""
+        return (await self.find_issues_with_title([repo], title))[repo]
+
+    async def find_issues_with_title(
+        self, repos: Iterable[str], title: str, batch_size: int = QL_CHECK_BATCH_SIZE
+    ) -> Dict[str, Optional[int]]:
+        """Same as `GithubAPI.find_issues_with_title`, batches are sent at once"""
+        found: Dict[str, Optional[int]] = {}
+        cursors: Dict[str, Optional[str]] = dict.fromkeys(repos)
+        while cursors:
+            pages = await self._send_batches(
+                lambda batch: issuesWithTitle(self.org, batch, title),
+                cursors.items(),
+                batch_size,
+            )
+            cursors = _scan_issue_pages(pages, found)
+        return found
+
+    # Git Data, to commit to a repo without a clone
+
+    async def get_branch_head(self, repo: str, branch: str) -> Optional[str]:
+        """Sha of the commit the branch points to"""
+        return await self._send(branchHead(self.org, repo, branch))
+
+    async def get_commit_tree(self, repo: str, sha: str) -> Optional[str]:
+        return await self._send(commitTree(self.org, repo, sha))
+
+    async def get_tree_files(self, repo: str, tree: str) -> Optional[List[str]]:
+        """Paths of every file in the tree, subtrees included"""
+        return await self._send(treeFiles(self.org, repo, tree))
+
+    async def create_blob(self, repo: str, content: bytes) -> Optional[str]:
+        return await self._send(createBlob(self.org, repo, content))
+
+    async def create_tree(
+        self, repo: str, base_tree: str, entries: List[TreeEntry]
+    ) -> Optional[str]:
+        """A tree of `entries` on top of `base_tree`, its sha"""
+        return await self._send(createTree(self.org, repo, base_tree, entries))
+
+    async def create_commit(
+        self, repo: str, message: str, tree: str, parents: List[str]
+    ) -> Optional[str]:
+        return await self._send(createCommit(self.org, repo, message, tree, parents))
+
+    async def create_branch(self, repo: str, branch: str, sha: str) -> bool:
+        return await self._send(createRef(self.org, repo, branch, sha))
+
+    async def create_pull(
+        self, repo: str, title: str, body: str, head: str, base: str
+    ) -> Optional[int]:
+        """Open a pull request, its number"""
+        return await self._send(createPull(self.org, repo, title, body, head, base))
+
+    async def _send(self, call: "ApiCall[T]") -> T:
+        res = await self.client.request(
+            call.method, call.url, json=call.json, params=call.params
+        )
+        return call.parse(res)
+
+    async def _send_batches(
+        self,
+        make_call: Callable[[List[K]], "ApiCall[Dict[K, T]]"],
+        items: Iterable[K],
+        batch_size: int,
+    ) -> Dict[K, T]:
+        batches = [tuple(b) for b in _batches(items, batch_size)]
+        results = await self._gather(
+            lambda batch: self._send(make_call(list(batch))), batches
+        )
+        merged: Dict[K, T] = {}
+        for batch in batches:
+            merged.update(results[batch])
+        return merged
 
-    # TODO: change return value
-    def find_issue_with_title(self, repo: str, title: str) -> bool:
-        return False
+    async def _gather(self, fn: Callable[[K], Any], items: Iterable[K]) -> Dict[K, Any]:
+        """Run `fn` on every item concurrently, results keep the order of the items"""
+        items = list(dict.fromkeys(items))
+        results: Dict[K, Any] = {}
+        limiter = trio.CapacityLimiter(self.concurrency)
 
-    # async def is_user_in_team(self, user: str, team: str) -> bool:
-    #     pass
+        async def run(item):
+            async with limiter:
+                results[item] = await fn(item)
 
-    # async def is_valid_user(self) -> bool:
-    #     pass
+        async with trio.open_nursery() as nursery:
+            for item in items:
+                nursery.start_soon(run, item)
+        return {item: results[item] for item in items}
 
-    # async def get_team_members(self) -> List[str]:
-    #     pass
 
-    # async def invite_user_to_team(self, user: str, team: str):
-    #     pass
+def get_client(token) -> GithubClient:
+    return get_session().client(token)
 
 
-def get_client(token):
-    return httpx.Client(
-        headers=httpx.Headers(
-            {
-                "User-Agent": "GitHubClassroomUtils/1.0",
-                "Authorization": f"token {token}",
-            }
+def _batches(items: Iterable[K], batch_size: int) -> Iterable[List[K]]:
+    items = list(dict.fromkeys(items))
+    for i in range(0, len(items), batch_size):
+        yield items[i : i + batch_size]
+
+
+class IssuePage(NamedTuple):
+    # number of the issue with the title, if it is in this page
+    number: Optional[int]
+    # cursor of the next page, None when there are no more issues to scan
+    next_cursor: Optional[str]
+
+
+def _scan_issue_pages(
+    pages: Dict[str, IssuePage], found: Dict[str, Optional[int]]
+) -> Dict[str, Optional[str]]:
+    """Record the issues found, return the repos to query again with their cursor"""
+    cursors: Dict[str, Optional[str]] = {}
+    for repo, page in pages.items():
+        if page.number is None and page.next_cursor is not None:
+            cursors[repo] = page.next_cursor
+        else:
+            found[repo] = page.number
+    return cursors
+
+
+def _field(status: int, *keys: str) -> Callable[[Any], Any]:
+    """Parse a field of the json body, None unless the response has `status`"""
+
+    def parse(res) -> Any:
+        if res.status_code != status:
+            return None
+        value = res.json()
+        for key in keys:
+            value = value[key]
+        return value
+
+    return parse
+
+
+def _repos_ql(
+    org: str,
+    repos: List[str],
+    selection: Callable[[int], str],
+    params: Iterable[str] = (),
+    variables: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """An aliased query selecting `selection(n)` on repository `r{n}` of the org"""
+    params = ["$org: String!", *params]
+    params += [f"$repo{n}: String!" for n in range(len(repos))]
+    variables = {"org": org, **(variables or {})}
+    fields = []
+    for n, repo in enumerate(repos):
+        fields.append(
+            f"r{n}: repository(owner: $org, name: $repo{n}) {{ {selection(n)} }}"
         )
+        variables[f"repo{n}"] = repo
+    ql = f"query ({', '.join(params)}) {{\n" + "\n".join(fields) + "\n}"
+    return ql, variables
+
+
+def _repo_fields(body: Dict, repos: List[str]) -> Dict[str, Optional[Dict]]:
+    """Repository field of every alias, None if the repo can't be found"""
+    data: Dict[str, Any] = body.get("data") or {}
+    return {repo: data.get(f"r{n}") for n, repo in enumerate(repos)}
+
+
+def _ql_call(
+    ql: str, variables: Dict[str, Any], parse: Callable[[Dict], T]
+) -> ApiCall[T]:
+    """
+    A GraphQL query, `parse` gets the decoded body.
+
+    Raises GithubQueryError when the request fails as a whole, a failed batch
+    must not read as "not found" for all of its repos.
+    """
+
+    def parse_response(res) -> T:
+        body: Dict = res.json() if res.status_code == 200 else {}
+        if body.get("data") is None:
+            raise GithubQueryError(
+                f"GraphQL query failed ({res.status_code}): {body.get('errors')}"
+            )
+        # errors of a single alias don't fail the others, a missing repo is an
+        # expected answer of the existence checks
+        errors = [e for e in body.get("errors") or [] if e.get("type") != "NOT_FOUND"]
+        if errors:
+            log.warning(f"GraphQL errors: {errors}")
+        return parse(body)
+
+    return ApiCall(
+        method="POST",
+        url=QL_ENDPOINT,
+        json={"query": ql, "variables": variables},
+        parse=parse_response,
     )
 
 
 # Queries
 
 
-def commitPushedDate(
-    client: httpx.Client, org: str, commit: GitHubRepoCommit
-) -> Optional[str]:
-    ql = """query ($org: String!, $repo: String!, $hash: String!) {
-                repository(owner: $org, name: $repo) {
-                    object(expression: $hash) {
+def commitsPushedDate(
+    org: str, commits: List[GitHubRepoCommit]
+) -> ApiCall[Dict[GitHubRepoCommit, Optional[str]]]:
+    """Resolve the commits in one query, each repository lookup gets its own alias"""
+    ql, variables = _repos_ql(
+        org,
+        [commit.name for commit in commits],
+        lambda n: f"""object(expression: $hash{n}) {{
+                    ... on Commit {{
+                        pushedDate
+                    }}
+                }}""",
+        params=[f"$hash{n}: String!" for n in range(len(commits))],
+        variables={f"hash{n}": c.commit_hash for n, c in enumerate(commits)},
+    )
+
+    def parse(body: Dict) -> Dict[GitHubRepoCommit, Optional[str]]:
+        pushed: Dict[GitHubRepoCommit, Optional[str]] = dict.fromkeys(commits)
+        data: Dict[str, Any] = body.get("data") or {}
+        for n, commit in enumerate(commits):
+            # the same repo may be asked for several commits, read back by alias
+            commit_obj = (data.get(f"r{n}") or {}).get("object") or {}
+            pushed[commit] = commit_obj.get("pushedDate")
+        return pushed
+
+    return _ql_call(ql, variables, parse)
+
+
+def commitsAfter(
+    org: str, repos: List[str], since: datetime
+) -> ApiCall[Dict[str, Optional[GitHubCommitsAfter]]]:
+    """Query the default branch history of the repos in one aliased query"""
+    ql, variables = _repos_ql(
+        org,
+        repos,
+        lambda n: """defaultBranchRef {
+                    target {
                         ... on Commit {
-                            pushedDate
+                            history(since: $since, first: 1) {
+                                totalCount
+                                nodes {
+                                    abbreviatedOid
+                                    committedDate
+                                    pushedDate
+                                }
+                            }
                         }
                     }
-                }
-        }"""
-    result = client.post(
-        QL_ENDPOINT,
-        json={
-            "query": ql,
-            "variables": {"org": org, "repo": commit.name, "hash": commit.commit_hash,},
-        },
-    )
-    if result.status_code == 200:
-        body: Dict = result.json()
-        if body.get("errors", None) is not None:
-            print(body["errors"])
-            return None
-        else:
-            commit_obj: Dict[str, Any] = body["data"]["repository"]["object"]
-            return commit_obj["pushedDate"]
+                }""",
+        params=["$since: GitTimestamp!"],
+        variables={"since": since.isoformat()},
+    )
 
+    def parse(body: Dict) -> Dict[str, Optional[GitHubCommitsAfter]]:
+        found: Dict[str, Optional[GitHubCommitsAfter]] = dict.fromkeys(repos)
+        for repo, field in _repo_fields(body, repos).items():
+            branch = (field or {}).get("defaultBranchRef")
+            history = ((branch or {}).get("target") or {}).get("history")
+            if history is None:
+                # missing repo or empty repo without a default branch
+                continue
+            info = GitHubCommitsAfter(repo=repo, nm_commits=history["totalCount"])
+            if history["nodes"]:
+                last = history["nodes"][0]
+                info.last_commit_hash = last["abbreviatedOid"]
+                info.last_committed_time = last["committedDate"]
+                info.last_pushed_time = last["pushedDate"]
+            found[repo] = info
+        return found
 
-def viewerIsOrgMember(client: httpx.Client, org: str) -> Optional[bool]:
+    return _ql_call(ql, variables, parse)
+
+
+def viewerIsOrgMember(org: str) -> ApiCall[Optional[bool]]:
     ql = """query($org: String!){
                 organization(login:$org){
                     viewerIsAMember
                 }
         }"""
-    result = client.post(QL_ENDPOINT, json={"query": ql, "variables": {"org": org}})
 
-    if result.status_code == 200:
-        body: Dict = result.json()
+    def parse(body: Dict) -> Optional[bool]:
+        if not body:
+            return None
         if body.get("errors", None) is not None:
-            print(body["errors"])
             return False
-        else:
-            org: Dict[str, Any] = body["data"]["organization"]
-            return org["viewerIsAMember"]
-    return None
+        org: Dict[str, Any] = body["data"]["organization"]
+        return org["viewerIsAMember"]
+
+    return _ql_call(ql, {"org": org}, parse)
+
+
+def reposExist(org: str, repos: List[str]) -> ApiCall[Dict[str, bool]]:
+    ql, variables = _repos_ql(org, repos, lambda n: "id")
+
+    def parse(body: Dict) -> Dict[str, bool]:
+        return {r: f is not None for r, f in _repo_fields(body, repos).items()}
+
+    return _ql_call(ql, variables, parse)
+
+
+def branchesExist(org: str, repos: List[str], branch: str) -> ApiCall[Dict[str, bool]]:
+    # `qualifiedName` only matches the exact ref, unlike the `git/refs` prefix match
+    ql, variables = _repos_ql(
+        org,
+        repos,
+        lambda n: "ref(qualifiedName: $ref) { id }",
+        params=["$ref: String!"],
+        variables={"ref": f"refs/heads/{branch}"},
+    )
+
+    def parse(body: Dict) -> Dict[str, bool]:
+        fields = _repo_fields(body, repos)
+        return {r: (f or {}).get("ref") is not None for r, f in fields.items()}
+
+    return _ql_call(ql, variables, parse)
+
+
+def issuesWithTitle(
+    org: str, cursors: List[Tuple[str, Optional[str]]], title: str
+) -> ApiCall[Dict[str, IssuePage]]:
+    """A page of issues (open or closed) of every (repo, cursor) pair"""
+    repos = [repo for repo, _ in cursors]
+    ql, variables = _repos_ql(
+        org,
+        repos,
+        lambda n: f"""issues(first: {PAGE_SIZE}, after: $after{n}) {{
+                    nodes {{ number title }}
+                    pageInfo {{ hasNextPage endCursor }}
+                }}""",
+        params=[f"$after{n}: String" for n in range(len(cursors))],
+        variables={f"after{n}": cursor for n, (_, cursor) in enumerate(cursors)},
+    )
+
+    def parse(body: Dict) -> Dict[str, IssuePage]:
+        pages: Dict[str, IssuePage] = {}
+        for repo, field in _repo_fields(body, repos).items():
+            issues = (field or {}).get("issues")
+            if issues is None:
+                pages[repo] = IssuePage(number=None, next_cursor=None)
+                continue
+            number = next(
+                (
+                    int(i["number"])
+                    for i in issues["nodes"]
+                    if i["title"].strip() == title.strip()
+                ),
+                None,
+            )
+            info = issues["pageInfo"]
+            cursor = info["endCursor"] if info["hasNextPage"] else None
+            pages[repo] = IssuePage(number=number, next_cursor=cursor)
+        return pages
+
+    return _ql_call(ql, variables, parse)
+
+
+def inviteToTeam(org: str, team_slug: str, user: str) -> ApiCall[bool]:
+    return ApiCall(
+        method="PUT",
+        url=f"{API_ENDPOINT}/orgs/{org}/teams/{team_slug}/memberships/{user}",
+        parse=lambda res: res.status_code == 200,
+    )
+
+
+# Git Data
+
+
+def branchHead(org: str, repo: str, branch: str) -> ApiCall[Optional[str]]:
+    return ApiCall(
+        method="GET",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/git/ref/heads/{branch}",
+        parse=_field(200, "object", "sha"),
+    )
+
+
+def commitTree(org: str, repo: str, sha: str) -> ApiCall[Optional[str]]:
+    return ApiCall(
+        method="GET",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/git/commits/{sha}",
+        parse=_field(200, "tree", "sha"),
+    )
+
+
+def treeFiles(org: str, repo: str, tree: str) -> ApiCall[Optional[List[str]]]:
+    def parse(res) -> Optional[List[str]]:
+        if res.status_code != 200:
+            return None
+        return [e["path"] for e in res.json()["tree"] if e["type"] == "blob"]
+
+    return ApiCall(
+        method="GET",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/git/trees/{tree}",
+        params={"recursive": "1"},
+        parse=parse,
+    )
+
+
+def createBlob(org: str, repo: str, content: bytes) -> ApiCall[Optional[str]]:
+    return ApiCall(
+        method="POST",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/git/blobs",
+        json={"content": base64.b64encode(content).decode(), "encoding": "base64"},
+        parse=_field(201, "sha"),
+    )
+
+
+def createTree(
+    org: str, repo: str, base_tree: str, entries: List[TreeEntry]
+) -> ApiCall[Optional[str]]:
+    return ApiCall(
+        method="POST",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/git/trees",
+        json={"base_tree": base_tree, "tree": entries},
+        parse=_field(201, "sha"),
+    )
+
+
+def createCommit(
+    org: str, repo: str, message: str, tree: str, parents: List[str]
+) -> ApiCall[Optional[str]]:
+    return ApiCall(
+        method="POST",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/git/commits",
+        json={"message": message, "tree": tree, "parents": parents},
+        parse=_field(201, "sha"),
+    )
+
+
+def createRef(org: str, repo: str, branch: str, sha: str) -> ApiCall[bool]:
+    return ApiCall(
+        method="POST",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/git/refs",
+        json={"ref": f"refs/heads/{branch}", "sha": sha},
+        parse=lambda res: res.status_code == 201,
+    )
+
+
+def createPull(
+    org: str, repo: str, title: str, body: str, head: str, base: str
+) -> ApiCall[Optional[int]]:
+    return ApiCall(
+        method="POST",
+        url=f"{API_ENDPOINT}/repos/{org}/{repo}/pulls",
+        json={"title": title, "body": body, "head": head, "base": base},
+        parse=_field(201, "number"),
+    )
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+import httpx
+
+from hand.config import DEFAULT_BASE_FOLDER
+
+DEFAULT_CACHE_PATH = DEFAULT_BASE_FOLDER / "http-cache.sqlite3"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024  # bytes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+_CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+
+class CachedResponse:
+    """A response served from disk after Github answered `304 Not Modified`"""
+
+    from_cache = True
+
+    def __init__(self, url: str, headers: Dict[str, str], content: bytes):
+        self.url = url
+        self.status_code = 200
+        self.headers = httpx.Headers(headers)
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _cache_key(url: str, params: Optional[dict], headers: Dict[str, str]) -> str:
+    if params:
+        url = url + "?" + urlencode(sorted((k, str(v)) for k, v in params.items()))
+    # Different tokens may see different things, don't share entries between them
+    auth = headers.get("Authorization", "")
+    auth_hash = hashlib.sha256(auth.encode()).hexdigest()[:16]
+    return f"{auth_hash} {url}"
+
+
+class HttpCache:
+    """
+    On-disk cache of Github GET responses, revalidated with conditional requests.
+
+    Responses carrying an `ETag` or `Last-Modified` header are stored per url. The
+    next request to the same url sends `If-None-Match`/`If-Modified-Since`, and a
+    `304 Not Modified`, which doesn't count against the rate limit, is answered
+    from disk. The least recently used entries are evicted beyond `max_size` bytes.
+    """
+
+    def __init__(
+        self, path: Path = DEFAULT_CACHE_PATH, max_size: int = DEFAULT_MAX_SIZE
+    ):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # pagers share the cache between threads, so every access holds the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict],
+        headers: Optional[Dict[str, str]],
+        send: Callable[[Dict[str, str]], Any],
+    ):
+        """
+        Send a GET request through the cache.
+        `send` takes the request headers to use and performs the actual request.
+        """
+        key, entry, headers = self._prepare(url, params, headers)
+        return self._finish(url, key, entry, send(headers))
+
+    async def aget(
+        self,
+        url: str,
+        params: Optional[dict],
+        headers: Optional[Dict[str, str]],
+        send: Callable[[Dict[str, str]], Awaitable[Any]],
+    ):
+        """Async version of `get`"""
+        key, entry, headers = self._prepare(url, params, headers)
+        return self._finish(url, key, entry, await send(headers))
+
+    def _prepare(self, url: str, params: Optional[dict], headers: Optional[dict]):
+        headers = dict(headers or {})
+        if any(h in headers for h in _CONDITIONAL_HEADERS):
+            # the caller handles the revalidation on its own
+            return None, None, headers
+
+        key = _cache_key(url, params, headers)
+        entry = self._lookup(key)
+        if entry is not None:
+            etag, last_modified = entry
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return key, entry, headers
+
+    def _finish(self, url: str, key: Optional[str], entry, resp):
+        if key is None:
+            return resp
+        if resp.status_code == 304 and entry is not None:
+            cached = self._load(key)
+            if cached is not None:
+                return CachedResponse(url, *cached)
+        elif resp.status_code == 200:
+            self._store(key, resp)
+        return resp
+
+    def _lookup(self, key: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _load(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        headers, body = row
+        return json.loads(headers), body
+
+    def _store(self, key: str, resp):
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if etag is None and last_modified is None:
+            return
+        body: bytes = resp.content
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    etag,
+                    last_modified,
+                    json.dumps(dict(resp.headers)),
+                    body,
+                    len(body),
+                    time.time(),
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+        if total is None or total <= self.max_size:
+            return
+        to_remove = []
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            to_remove.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_remove)
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": count, "size": size}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_http_cache: Optional[HttpCache] = None
+_http_cache_disabled = False
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """The cache shared by every command, None if caching is turned off"""
+    global _http_cache
+    if _http_cache is None and not _http_cache_disabled:
+        _http_cache = HttpCache()
+    return _http_cache
+
+
+def set_http_cache(cache: Optional[HttpCache]):
+    """Replace the shared cache, or turn caching off with None"""
+    global _http_cache, _http_cache_disabled
+    _http_cache = cache
+    _http_cache_disabled = cache is None
+
+
+def cached_request(
+    method: str,
+    url: str,
+    params: Optional[dict],
+    headers: Optional[Dict[str, str]],
+    send: Callable[[Optional[Dict[str, str]]], Any],
+):
+    """Send a request, answering GETs through the shared cache when it is enabled"""
+    cache = get_http_cache()
+    if method.upper() != "GET" or cache is None:
+        return send(headers)
+    return cache.get(url, params, headers, send)
+
+
+async def acached_request(
+    method: str,
+    url: str,
+    params: Optional[dict],
+    headers: Optional[Dict[str, str]],
+    send: Callable[[Optional[Dict[str, str]]], Awaitable[Any]],
+):
+    """Async version of `cached_request`"""
+    cache = get_http_cache()
+    if method.upper() != "GET" or cache is None:
+        return await send(headers)
+    return await cache.aget(url, params, headers, send)
@@ -0,0 +1,229 @@
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import trio
+from attr import define, field
+from loguru import logger as log
+
+# Github asks to wait at least a minute on a secondary rate limit without Retry-After
+# https://docs.github.com/en/rest/overview/resources-in-the-rest-api#secondary-rate-limits
+SECONDARY_LIMIT_DEFAULT_WAIT = 60.0
+# Polling interval of async requests waiting for a free slot
+_ASYNC_POLL_INTERVAL = 0.01
+
+
+@define
+class RateLimitBudget:
+    """Rate limit of a single Github resource (core, graphql, search...) as last reported"""
+
+    resource: str
+    limit: int
+    remaining: int
+    reset: float  # epoch seconds
+    nm_requests: int = 0
+    first_remaining: Optional[int] = None
+
+    @property
+    def consumed(self) -> int:
+        """Quota used since we first saw this resource, within the same reset window"""
+        if self.first_remaining is None:
+            return 0
+        return max(self.first_remaining - self.remaining, 0)
+
+
+def _header(resp, name: str) -> Optional[str]:
+    return resp.headers.get(name)
+
+
+def _is_secondary_limit_body(resp) -> bool:
+    try:
+        message: str = resp.json().get("message", "")
+    except Exception:
+        return False
+    message = message.lower()
+    return "secondary rate limit" in message or "abuse" in message
+
+
+@define
+class RateLimitScheduler:
+    """
+    Every request to Github goes through here.
+
+    Keeps track of the primary rate limits reported in `X-RateLimit-*` headers and of
+    secondary limits (`Retry-After`), and sleeps until the limit resets instead of
+    failing. The number of requests in flight follows AIMD: it grows by one every
+    `window` successful requests and is halved when a secondary limit is hit.
+    """
+
+    max_concurrency: int = 16
+    min_concurrency: int = 1
+    max_retries: int = 5
+    clock: Callable[[], float] = time.time
+    sleep: Callable[[float], None] = time.sleep
+
+    window: float = field(init=False)
+    budgets: Dict[str, RateLimitBudget] = field(init=False, factory=dict)
+    nm_requests: int = field(init=False, default=0)
+    nm_throttled: int = field(init=False, default=0)
+    time_throttled: float = field(init=False, default=0.0)
+    _in_flight: int = field(init=False, default=0)
+    _blocked_until: float = field(init=False, default=0.0)
+    _lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    def __attrs_post_init__(self):
+        self.window = float(self.max_concurrency)
+
+    # Public
+
+    def request(self, send: Callable[[], Any]):
+        """Send a request through the scheduler, `send` is called once per attempt"""
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            try:
+                resp = send()
+            finally:
+                self._release()
+            delay = self.observe(resp)
+            if delay is None or attempt == self.max_retries:
+                return resp
+            self._throttle(delay)
+            self.sleep(delay)
+        return resp
+
+    async def arequest(self, send: Callable[[], Awaitable[Any]]):
+        """Async version of `request` for trio"""
+        for attempt in range(self.max_retries + 1):
+            await self._aacquire()
+            try:
+                resp = await send()
+            finally:
+                self._release()
+            delay = self.observe(resp)
+            if delay is None or attempt == self.max_retries:
+                return resp
+            self._throttle(delay)
+            await trio.sleep(delay)
+        return resp
+
+    def observe(self, resp) -> Optional[float]:
+        """
+        Update the limits from a response.
+        Returns the seconds to wait before retrying, or None if the response is final.
+        """
+        now = self.clock()
+        with self._lock:
+            self.nm_requests += 1
+            self._update_budget(resp)
+
+            remaining = _header(resp, "X-RateLimit-Remaining")
+            reset = _header(resp, "X-RateLimit-Reset")
+            retry_after = _header(resp, "Retry-After")
+
+            if resp.status_code in (403, 429):
+                if retry_after is not None:
+                    return self._on_secondary_limit(now, float(retry_after))
+                if remaining == "0" and reset is not None:
+                    return self._block_until(float(reset) + 1, now)
+                if resp.status_code == 429 or _is_secondary_limit_body(resp):
+                    return self._on_secondary_limit(now, SECONDARY_LIMIT_DEFAULT_WAIT)
+                return None
+
+            if remaining == "0" and reset is not None:
+                # this one got through, but the next one would not
+                self._blocked_until = max(self._blocked_until, float(reset) + 1)
+            self.window = min(self.window + 1 / self.window, self.max_concurrency)
+            return None
+
+    def report(self) -> List[str]:
+        """Human readable summary of the budget consumed so far"""
+        lines = [f"Github requests: {self.nm_requests}"]
+        for b in self.budgets.values():
+            reset = time.strftime("%H:%M:%S", time.localtime(b.reset))
+            lines.append(
+                f"  {b.resource}: {b.nm_requests} requests, {b.consumed} quota used,"
+                f" {b.remaining}/{b.limit} left (resets at {reset})"
+            )
+        if self.nm_throttled > 0:
+            lines.append(
+                f"  throttled {self.nm_throttled} times,"
+                f" {self.time_throttled:.1f}s in total"
+            )
+        return lines
+
+    # Internals
+
+    def _update_budget(self, resp):
+        resource = _header(resp, "X-RateLimit-Resource") or "core"
+        limit = _header(resp, "X-RateLimit-Limit")
+        remaining = _header(resp, "X-RateLimit-Remaining")
+        reset = _header(resp, "X-RateLimit-Reset")
+        if limit is None or remaining is None or reset is None:
+            return
+
+        budget = self.budgets.get(resource)
+        if budget is None or budget.reset != float(reset):
+            # a new reset window starts counting from scratch
+            budget = RateLimitBudget(
+                resource=resource,
+                limit=int(limit),
+                remaining=int(remaining),
+                reset=float(reset),
+                nm_requests=budget.nm_requests if budget else 0,
+                first_remaining=int(remaining) + 1,
+            )
+            self.budgets[resource] = budget
+        budget.nm_requests += 1
+        budget.remaining = min(budget.remaining, int(remaining))
+
+    def _on_secondary_limit(self, now: float, wait: float) -> float:
+        self.window = max(self.window / 2, self.min_concurrency)
+        log.debug(f"secondary rate limit, concurrency lowered to {int(self.window)}")
+        return self._block_until(now + wait, now)
+
+    def _block_until(self, until: float, now: float) -> float:
+        self._blocked_until = max(self._blocked_until, until)
+        return max(self._blocked_until - now, 0.0)
+
+    def _throttle(self, delay: float):
+        with self._lock:
+            self.nm_throttled += 1
+            self.time_throttled += delay
+        log.info(f"Github rate limit reached, waiting {delay:.0f}s")
+
+    def _try_acquire(self) -> Optional[float]:
+        """Take a slot, or return how long to wait before trying again"""
+        with self._lock:
+            wait = self._blocked_until - self.clock()
+            if wait > 0:
+                return wait
+            if self._in_flight < int(self.window):
+                self._in_flight += 1
+                return None
+            return _ASYNC_POLL_INTERVAL
+
+    def _acquire(self):
+        while True:
+            wait = self._try_acquire()
+            if wait is None:
+                return
+            self.sleep(wait)
+
+    async def _aacquire(self):
+        while True:
+            wait = self._try_acquire()
+            if wait is None:
+                return
+            await trio.sleep(wait)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+
+_scheduler = RateLimitScheduler()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """The scheduler shared by every command"""
+    return _scheduler
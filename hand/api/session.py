@@ -0,0 +1,251 @@
+import importlib.util
+import threading
+from itertools import count
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import trio
+from attr import define
+from loguru import logger as log
+
+from .http_cache import acached_request, cached_request
+from .ratelimit import RateLimitScheduler, get_scheduler
+from .stats import RequestStats, get_stats
+
+T = TypeVar("T")
+
+USER_AGENT = "GitHubClassroomUtils/1.0"
+
+
+@define(frozen=True)
+class SessionOptions:
+    """Connection pool settings shared by every request to Github"""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    timeout: float = 30.0
+    # needs the `h2` package, falls back to HTTP/1.1 without it
+    http2: bool = False
+    # replaces the network, e.g. with a httpx.MockTransport
+    transport: Optional[object] = None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class GithubSession:
+    """
+    Long-lived pooled http clients used for every request to Github.
+
+    Connections are kept alive between requests, so only the first request to
+    api.github.com pays for the TCP and TLS handshake. Requests go through the rate
+    limit scheduler, and GET requests through the http cache. Every attempt is
+    recorded in the request stats. The async client is bound to the trio run it
+    was created in, a new one is created for a new run. Start the runs with `run`,
+    which closes that client when the run returns.
+    """
+
+    def __init__(
+        self,
+        options: Optional[SessionOptions] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        stats: Optional[RequestStats] = None,
+    ):
+        self.options = options or SessionOptions()
+        self.scheduler = scheduler or get_scheduler()
+        self.stats = stats or get_stats()
+        self._client: Optional[httpx.Client] = None
+        # the pagers first use the client from several threads at once
+        self._client_lock = threading.Lock()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_run = None
+
+    def _client_kwargs(self) -> dict:
+        opt = self.options
+        http2 = opt.http2 and _http2_available()
+        if opt.http2 and not http2:
+            log.warning("http2 requested but `h2` is not installed, using HTTP/1.1")
+        kwargs = dict(
+            headers={"User-Agent": USER_AGENT},
+            timeout=opt.timeout,
+            follow_redirects=True,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=opt.max_connections,
+                max_keepalive_connections=opt.max_keepalive_connections,
+                keepalive_expiry=opt.keepalive_expiry,
+            ),
+        )
+        if opt.transport is not None:
+            kwargs["transport"] = opt.transport
+        return kwargs
+
+    @property
+    def http(self) -> httpx.Client:
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._client_kwargs())
+            return self._client
+
+    @property
+    def async_http(self) -> httpx.AsyncClient:
+        run = trio.lowlevel.current_trio_token()
+        if self._async_client is None or self._async_run is not run:
+            # connections of a previous trio run can't be used anymore
+            self._async_client = httpx.AsyncClient(**self._client_kwargs())
+            self._async_run = run
+        return self._async_client
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        headers = kwargs.pop("headers", None)
+
+        def send(headers):
+            attempts = count()
+            return self.scheduler.request(
+                lambda: self.stats.timed(
+                    "github",
+                    method,
+                    url,
+                    lambda: self.http.request(method, url, headers=headers, **kwargs),
+                    retry=next(attempts) > 0,
+                )
+            )
+
+        return cached_request(method, url, kwargs.get("params"), headers, send)
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        headers = kwargs.pop("headers", None)
+        client = self.async_http
+
+        async def send(headers):
+            attempts = count()
+            return await self.scheduler.arequest(
+                lambda: self.stats.atimed(
+                    "github",
+                    method,
+                    url,
+                    lambda: client.request(method, url, headers=headers, **kwargs),
+                    retry=next(attempts) > 0,
+                )
+            )
+
+        return await acached_request(method, url, kwargs.get("params"), headers, send)
+
+    def client(self, token: str) -> "GithubClient":
+        return GithubClient(self, token)
+
+    def async_client(self, token: str) -> "AsyncGithubClient":
+        return AsyncGithubClient(self, token)
+
+    def run(self, async_fn: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """`trio.run` the function, the async client of the run is closed after it"""
+
+        async def main() -> T:
+            try:
+                return await async_fn(*args)
+            finally:
+                await self.aclose()
+
+        return trio.run(main)
+
+    def close(self):
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def __enter__(self) -> "GithubSession":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _auth_headers(token: str, headers: Optional[dict]) -> dict:
+    return {"Authorization": f"token {token}", **(headers or {})}
+
+
+class GithubClient:
+    """Requests authenticated with a token, over a shared session"""
+
+    def __init__(self, session: GithubSession, token: str):
+        self.session = session
+        self.token = token
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs["headers"] = _auth_headers(self.token, kwargs.get("headers"))
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PATCH", url, **kwargs)
+
+
+class AsyncGithubClient:
+    """Async version of `GithubClient`"""
+
+    def __init__(self, session: GithubSession, token: str):
+        self.session = session
+        self.token = token
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs["headers"] = _auth_headers(self.token, kwargs.get("headers"))
+        return await self.session.arequest(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+
+_session: Optional[GithubSession] = None
+_session_options = SessionOptions()
+
+
+def get_session() -> GithubSession:
+    """The session shared by every command"""
+    global _session
+    if _session is None:
+        _session = GithubSession(_session_options)
+    return _session
+
+
+def configure_session(options: SessionOptions):
+    """Change the pool settings, the current session is closed"""
+    global _session_options
+    close_session()
+    _session_options = options
+
+
+def is_shared_session(session: GithubSession) -> bool:
+    """Whether `session` is the one of `get_session`, only closed by `close_session`"""
+    return session is _session
+
+
+def close_session():
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
@@ -0,0 +1,229 @@
+import json
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from attr import define, field
+from rich.table import Table
+
+# Path segments replaced by a placeholder, so requests group by endpoint
+_TEMPLATE_RULES = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"^/orgs/[^/]+"), "/orgs/{org}"),
+    (re.compile(r"^/users/[^/]+"), "/users/{user}"),
+    (re.compile(r"/teams/[^/]+"), "/teams/{team}"),
+    (re.compile(r"/memberships/[^/]+"), "/memberships/{user}"),
+    (re.compile(r"/collaborators/[^/]+"), "/collaborators/{user}"),
+    (re.compile(r"/git/(refs?)/.+"), r"/git/\1/{ref}"),
+    (re.compile(r"/commits/[^/]+"), "/commits/{sha}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{number}"),
+]
+
+
+def endpoint_template(url: str) -> str:
+    """`/repos/org/hw1-a/issues/3` -> `/repos/{owner}/{repo}/issues/{number}`"""
+    path = urlsplit(url).path or "/"
+    for pattern, placeholder in _TEMPLATE_RULES:
+        path = pattern.sub(placeholder, path, count=1)
+    return path
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@define
+class EndpointStats:
+    """Requests sent to a single endpoint, retries included"""
+
+    service: str
+    method: str
+    endpoint: str
+    latencies: List[float] = field(factory=list)
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    nm_retries: int = 0
+    nm_not_modified: int = 0
+    nm_errors: int = 0
+
+    @property
+    def nm_requests(self) -> int:
+        return len(self.latencies)
+
+    def percentiles(self, *qs: float) -> List[float]:
+        ordered = sorted(self.latencies)
+        return [_percentile(ordered, q) for q in qs]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        return {
+            "service": self.service,
+            "method": self.method,
+            "endpoint": self.endpoint,
+            "requests": self.nm_requests,
+            "retries": self.nm_retries,
+            "not_modified": self.nm_not_modified,
+            "errors": self.nm_errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_total": sum(self.latencies),
+            "latency_p50": p50,
+            "latency_p95": p95,
+            "latency_p99": p99,
+        }
+
+
+@define
+class RequestStats:
+    """
+    Counts and latencies of every request sent to Github and Google.
+
+    Requests are grouped by service, method and endpoint template. Every attempt
+    is recorded, an attempt after a rate limit counts as a retry. A `304 Not
+    Modified` counts as a cache hit, it didn't cost any rate limit.
+    """
+
+    clock: Callable[[], float] = time.perf_counter
+    endpoints: Dict[Tuple[str, str, str], EndpointStats] = field(
+        init=False, factory=dict
+    )
+    _lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    # Public
+
+    def record(
+        self,
+        service: str,
+        method: str,
+        endpoint: str,
+        latency: float,
+        status_code: Optional[int] = None,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        retry: bool = False,
+    ):
+        """Record an attempt, `status_code` is None when no response came back"""
+        key = (service, method, endpoint)
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats(service, method, endpoint)
+            stats.latencies.append(latency)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.nm_retries += retry
+            stats.nm_not_modified += status_code == 304
+            stats.nm_errors += status_code is None or status_code >= 400
+
+    def timed(
+        self, service: str, method: str, url: str, send: Callable[[], Any], retry=False
+    ):
+        """Send a http request, recording how long the response took"""
+        start = self.clock()
+        resp = None
+        try:
+            resp = send()
+            return resp
+        finally:
+            self._record_response(service, method, url, resp, start, retry)
+
+    async def atimed(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        send: Callable[[], Awaitable[Any]],
+        retry=False,
+    ):
+        """Async version of `timed`"""
+        start = self.clock()
+        resp = None
+        try:
+            resp = await send()
+            return resp
+        finally:
+            self._record_response(service, method, url, resp, start, retry)
+
+    @contextmanager
+    def measure(self, service: str, method: str, endpoint: str):
+        """Record a call made through a client library, e.g. pygsheets"""
+        start = self.clock()
+        status_code = None
+        try:
+            yield
+            status_code = 200
+        finally:
+            self.record(service, method, endpoint, self.clock() - start, status_code)
+
+    @property
+    def nm_requests(self) -> int:
+        return sum(s.nm_requests for s in self.endpoints.values())
+
+    def summary(self) -> Table:
+        t = Table(title="Requests")
+        t.add_column("Endpoint", style="cyan")
+        for name in ("Count", "Retry", "304", "Err", "p50", "p95", "p99", "Received"):
+            t.add_column(name, justify="right")
+        by_time = sorted(self.endpoints.values(), key=lambda s: -sum(s.latencies))
+        for s in by_time:
+            p50, p95, p99 = s.percentiles(50, 95, 99)
+            t.add_row(
+                f"{s.service} {s.method} {s.endpoint}",
+                str(s.nm_requests),
+                str(s.nm_retries),
+                str(s.nm_not_modified),
+                str(s.nm_errors),
+                *(f"{p * 1000:.0f}ms" for p in (p50, p95, p99)),
+                f"{s.bytes_received // 1024} KiB",
+            )
+        return t
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.nm_requests,
+            "endpoints": [s.to_dict() for s in self.endpoints.values()],
+        }
+
+    def dump_json(self, path: Path):
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+
+    # Internals
+
+    def _record_response(self, service, method, url, resp, start, retry):
+        self.record(
+            service,
+            method,
+            endpoint_template(url),
+            self.clock() - start,
+            status_code=None if resp is None else resp.status_code,
+            bytes_sent=_content_size(resp, "request"),
+            bytes_received=_content_size(resp),
+            retry=retry,
+        )
+
+
+def _content_size(resp, attr: Optional[str] = None) -> int:
+    """Body size of the response, or of its request"""
+    try:
+        obj = resp if attr is None else getattr(resp, attr)
+        return len(obj.content)
+    except (AttributeError, RuntimeError):
+        # no response, or a stand-in without a body
+        return 0
+
+
+_stats = RequestStats()
+
+
+def get_stats() -> RequestStats:
+    """The stats shared by every command"""
+    return _stats
@@ -32,6 +32,13 @@ def patch_project(
         default=None, help="default to tmpl-{hw-prefix}-revise"
     ),
     only_repo: Optional[str] = typer.Option(default=None, help="only repo to patch"),
+    mirror: bool = typer.Option(
+        True, help="clone student repos against a local mirror of the template"
+    ),
+    sparse: bool = typer.Option(
+        True, help="only download and check out the files the patch touches"
+    ),
+    ignore: List[str] = Opt.IGNORE,
     dry: bool = Opt.DRY,
     yes: bool = Opt.ACCEPT_ALL,
 ):
@@ -44,6 +51,8 @@ def patch_project(
     from hand.api.github import GithubAPI
 
     gh = GithubAPI(token=settings.github.token, org=settings.github.org)
+    if not src_repo:
+        src_repo = f"tmpl-{hw}-revise"
 
     # Check source repo exists
     if not gh.repo_exists(src_repo):
@@ -68,24 +77,40 @@ def patch_project(
     # Get final output repo
     target_repos: List[str]
     if only_repo is not None:
-        [only_repo]
+        target_repos = [only_repo]
     else:
-        # target_repos = gh.query_repo_with_prefix(prefix=hw)
-        pass
+        target_repos = gh.query_student_repos(hw, ignore_list=ignore)
+
+    # Skip repos already patched, one query checks the branch on ~100 repos
+    patched = gh.remote_branches_exist(target_repos, patch_branch)
+    target_repos = [r for r in target_repos if not patched[r]]
+    print(f"{len(patched) - len(target_repos)} repos already patched, skipped")
 
     # Prepare data
     from hand.scripts.patch import PatchResourceBuilder
 
     res = PatchResourceBuilder(
         base_dir="patch_resource",
-        github_org="compiler-f19",
-        hw_prefix="hw3",
-        tmpl_repo_name="tmpl-hw3-revise",
-        patch_branch="0-fix-var-name",
+        github_org=settings.github.org,
+        hw_prefix=hw,
+        tmpl_repo_name=src_repo,
+        patch_branch=patch_branch,
     ).build()
 
-    res.fetch_student_remotes(["hw3-ianre657"])
+    if mirror:
+        res.fetch_template_mirror()
     res.fetch_pr_template_repo()
+    if sparse:
+        # an empty patch leaves nothing to check out, clone the whole repo then
+        res.patch_paths = res.template_patch_paths(patch_branch) or None
+
+    def show_progress(result, done: int, total: int):
+        print(f"({done}/{total}) {result.repo} {result.status}")
+
+    summary = res.fetch_student_remotes(target_repos, on_progress=show_progress)
+    print(f"Student repos: {summary}")
+    for failed in summary.failed:
+        print(f"  {failed.repo}: {failed.error}")
 
     # TODO: use a stream line approach
 
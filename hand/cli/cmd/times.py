@@ -1,5 +1,6 @@
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 import iso8601
 import typer
@@ -12,14 +13,31 @@ from ..opt import Opt
 
 
 def event_times(
-    input_file: str = Argument(
-        default=..., metavar="hw_path", help="file contains list of repo-hash"
+    input_file: Optional[str] = Argument(
+        default=None, metavar="hw_path", help="file contains list of repo-hash"
+    ),
+    prefix: Optional[str] = Option(
+        None,
+        "--prefix",
+        help="check every student repo of a homework instead of an input file",
     ),
     deadline: str = Option(
         None,
         "--deadline",
         help="deadline format: 'yyyy-mm-dd' or any ISO8601 format string (timezone will be set to local timezone)",
     ),
+    concurrency: int = Option(
+        4, "--concurrency", min=1, help="number of batched queries sent at once"
+    ),
+    extensions_file: Optional[str] = Option(
+        None,
+        "--extensions",
+        help="file with a '<repo> <deadline>' line for each personal deadline",
+    ),
+    late_tiers: str = Option(
+        "1,3,7", "--late-tiers", help="days after the deadline where penalties step up"
+    ),
+    ignore: List[str] = Opt.IGNORE,
     dry: bool = Opt.DRY,
 ):
     """
@@ -45,6 +63,46 @@ def event_times(
         typer.echo(info)
         raise typer.Abort()
 
+    try:
+        tiers = [timedelta(days=float(d)) for d in late_tiers.split(",") if d]
+        extensions = (
+            _parse_extensions(Path(extensions_file).expanduser().read_text())
+            if extensions_file
+            else {}
+        )
+    except (ValueError, iso8601.ParseError, OSError) as err:
+        typer.echo(f"Invalid late tiers or extensions: {err}")
+        raise typer.Abort()
+
+    if (input_file is None) == (prefix is None):
+        typer.echo("Provide either an input file or --prefix")
+        raise typer.Abort()
+
+    from hand.api.commit_cache import get_commit_cache
+    from hand.api.github import GithubAPI
+    from hand.scripts import Script
+    from hand.scripts.times import (
+        ScriptTimes,
+        ScriptTimesByPrefix,
+        ScriptTimesDisplayImpl,
+    )
+
+    gh_api = GithubAPI(token=settings.github.token, org=settings.github.org)
+    display = ScriptTimesDisplayImpl(deadline=deadline)
+
+    if prefix is not None:
+        print(f"Query student repos of {prefix}")
+        script: Script = ScriptTimesByPrefix(
+            gh_api=gh_api,
+            repos=gh_api.query_student_repos(prefix, ignore_list=ignore),
+            deadline=iso8601.parse_date(deadline),
+            display=display,
+            extensions=extensions,
+            late_tiers=tiers,
+        )
+        script.run()
+        return
+
     print("Check input file exists")
     fpath = Path(input_file).expanduser()
     if not fpath.exists():
@@ -60,17 +118,15 @@ def event_times(
             typer.echo(err)
             raise typer.Abort()
 
-    from hand.api.github import GithubAPI
-    from hand.scripts import Script
-    from hand.scripts.times import ScriptTimes, ScriptTimesDisplayImpl
-
-    gh_api = GithubAPI(token=settings.github.token, org=settings.github.org)
-    display = ScriptTimesDisplayImpl(deadline=deadline)
-    script: Script = ScriptTimes(
+    script = ScriptTimes(
         gh_api=gh_api,
         repos=commits,
         deadline=iso8601.parse_date(deadline),
         display=display,
+        push_cache=get_commit_cache(),
+        concurrency=concurrency,
+        extensions=extensions,
+        late_tiers=tiers,
     )
     script.run()
 
@@ -95,3 +151,14 @@ def _parse_commit_from_text(s: str) -> List[GitHubRepoCommit]:
         repo, hash = r.split(":")
         result.append(GitHubRepoCommit(name=repo, commit_hash=hash))
     return result
+
+
+def _parse_extensions(s: str) -> Dict[str, datetime]:
+    """Personal deadlines, one '<repo> <deadline>' per line"""
+    result = {}
+    for line in s.splitlines():
+        if not line.strip():
+            continue
+        repo, deadline = line.split(maxsplit=1)
+        result[repo] = iso8601.parse_date(deadline.strip())
+    return result
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Optional
+
+import typer
+from typer import Option
+
+from .opt import Opt
+
+app = typer.Typer(help="Inspect and prune local caches")
+
+
+@app.command()
+def info():
+    """Show the size of the local caches"""
+    from hand.api.commit_cache import get_commit_cache
+    from hand.api.http_cache import get_http_cache
+
+    cache = get_commit_cache()
+    stats = cache.info()
+    typer.echo(f"Commit push times: {cache.path}")
+    typer.echo(
+        f"  {stats['entries']} commits of {stats['orgs']} orgs,"
+        f" {stats['size'] // 1024} KiB"
+    )
+    http_cache = get_http_cache()
+    if http_cache is not None:
+        stats = http_cache.info()
+        typer.echo(f"Http responses: {http_cache.path}")
+        typer.echo(f"  {stats['entries']} responses, {stats['size'] // 1024} KiB")
+
+
+@app.command()
+def show(
+    org: Optional[str] = Option(None, "--org", help="only commits of this org"),
+    prefix: str = Option("", "--prefix", help="only repos starting with the prefix"),
+):
+    """List the cached commit push times"""
+    from hand.api.commit_cache import get_commit_cache
+
+    for entry_org, c, recorded_at in get_commit_cache().entries(org, prefix):
+        recorded = datetime.fromtimestamp(recorded_at).strftime("%Y-%m-%d %H:%M")
+        typer.echo(
+            f"{entry_org}/{c.repo}:{c.commit_hash}  pushed {c.pushed_time}"
+            f"  (cached {recorded})"
+        )
+
+
+@app.command()
+def prune(
+    org: Optional[str] = Option(None, "--org", help="only commits of this org"),
+    prefix: str = Option("", "--prefix", help="only repos starting with the prefix"),
+    older_than: Optional[int] = Option(
+        None, "--older-than", metavar="DAYS", help="only entries cached before"
+    ),
+    http: bool = Option(False, "--http", help="also clear cached http responses"),
+    yes: bool = Opt.ACCEPT_ALL,
+):
+    """Remove cached commit push times, all of them without any filter"""
+    from hand.api.commit_cache import get_commit_cache
+    from hand.api.http_cache import get_http_cache
+
+    if not (yes or typer.confirm("Remove the matching cache entries?")):
+        raise typer.Abort()
+    seconds = older_than * 24 * 60 * 60 if older_than is not None else None
+    removed = get_commit_cache().prune(org, prefix, seconds)
+    typer.echo(f"Removed {removed} commit push times")
+
+    http_cache = get_http_cache()
+    if http and http_cache is not None:
+        http_cache.clear()
+        typer.echo("Cleared cached http responses")
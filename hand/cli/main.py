@@ -1,4 +1,8 @@
+from pathlib import Path
+from typing import Optional
+
 import typer
+from typer import Option
 
 # from .cmd_config import app as cmd_config_app
 
@@ -17,6 +21,105 @@ from .cmd import (
     patch_project,
     publish_grade,
 )
+from .cmd_cache import app as cmd_cache_app
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    stats: bool = Option(False, "--stats", help="show the requests sent on exit"),
+    stats_json: Optional[Path] = Option(
+        None, "--stats-json", metavar="FILE", help="dump the requests sent as json"
+    ),
+    record: Optional[Path] = Option(
+        None, "--record", metavar="FILE", help="record the requests to a cassette"
+    ),
+    replay: Optional[Path] = Option(
+        None, "--replay", metavar="FILE", help="answer requests from a cassette"
+    ),
+    replay_latency: float = Option(
+        0.0, help="replay at this factor of the recorded latency, 1 for real timings"
+    ),
+):
+    transport = None
+    if record or replay:
+        transport = use_request_cassette(record, replay, replay_latency)
+        ctx.call_on_close(save_request_cassette)
+    configure_github_session(transport)
+    ctx.call_on_close(report_github_budget)
+    ctx.call_on_close(close_github_session)
+    if stats or stats_json:
+        ctx.call_on_close(lambda: report_request_stats(stats, stats_json))
+
+
+def configure_github_session(transport=None):
+    """Size the connection pool shared by every request to Github"""
+    from hand.api.session import SessionOptions, configure_session
+    from hand.config import settings
+
+    configure_session(SessionOptions(**settings.http.dict(), transport=transport))
+
+
+def use_request_cassette(
+    record: Optional[Path], replay: Optional[Path], latency: float
+):
+    """Record or replay every request of this command, returns the http transport"""
+    from hand.api.cassette import (
+        RECORD,
+        REPLAY,
+        Cassette,
+        CassetteTransport,
+        use_cassette,
+    )
+    from hand.api.http_cache import set_http_cache
+
+    if record and replay:
+        raise typer.BadParameter("use either --record or --replay")
+    if record:
+        cassette = Cassette(record, mode=RECORD)
+    else:
+        cassette = Cassette(replay, mode=REPLAY, latency=latency)
+    use_cassette(cassette)
+    # conditional requests depend on the local cache, keep the traffic replayable
+    set_http_cache(None)
+    return CassetteTransport(cassette)
+
+
+def save_request_cassette():
+    from hand.api.cassette import get_cassette
+
+    cassette = get_cassette()
+    if cassette is not None:
+        cassette.save()
+
+
+def close_github_session():
+    from hand.api.session import close_session
+
+    close_session()
+
+
+def report_github_budget():
+    """Show how much of the Github rate limit this command consumed"""
+    from hand.api.ratelimit import get_scheduler
+
+    scheduler = get_scheduler()
+    if scheduler.nm_requests > 0:
+        typer.echo("\n".join(scheduler.report()), err=True)
+
+
+def report_request_stats(show: bool, json_path: Optional[Path]):
+    """Latency and volume of the requests this command sent, per endpoint"""
+    from rich.console import Console
+
+    from hand.api.stats import get_stats
+
+    stats = get_stats()
+    if show:
+        Console(stderr=True).print(stats.summary())
+    if json_path is not None:
+        stats.dump_json(json_path)
+
 
 app.command(name="add")(add_students)
 app.command(name="grant")(grant_read_access)
@@ -25,3 +128,4 @@ app.command(name="crawl")(crawl_classroom)
 app.command(name="times")(event_times)
 app.command(name="publish")(publish_grade)
 app.command(name="check")(check_env)
+app.add_typer(cmd_cache_app, name="cache")
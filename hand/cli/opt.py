@@ -1,4 +1,4 @@
-from typing import Final
+from typing import Final, List
 
 from typer import Option
 
@@ -22,3 +22,6 @@ class Opt:
     ACCEPT_ALL: Final[bool] = Option(
         False, "--yes", help="confirm to all", show_default=False
     )
+    IGNORE: Final[List[str]] = Option(
+        [], "--ignore", help="users whose repos are skipped, e.g. graders"
+    )
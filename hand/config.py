@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from dynaconf import Dynaconf
 from pydantic import BaseModel
 
@@ -34,6 +36,12 @@ class HandConfig(BaseModel):
     class AnnounceGrade(BaseModel):
         feedback_src_repo: str
 
+    class Http(BaseModel):
+        max_connections: int = 20
+        max_keepalive_connections: int = 10
+        timeout: float = 30.0
+        http2: bool = False
+
     github: Github
     google_spreadsheet: Google
     crawl: CrawlClassroom
@@ -41,7 +49,11 @@ class HandConfig(BaseModel):
     add: AddStudens
     times: EventTimes
     announce: AnnounceGrade
+    http: Http = Http()
+
 
+# Folder to keep data shared between runs, e.g. caches
+DEFAULT_BASE_FOLDER = Path.home() / ".invisible-hand"
 
 _dyna_settings = Dynaconf(settings_files=["config/settings.toml"])
 settings: HandConfig = HandConfig.from_orm(_dyna_settings)
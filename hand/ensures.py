@@ -1,7 +1,6 @@
 import subprocess as sp
 
-import httpx
-
+from hand.api.session import get_session
 from hand.config import app_context
 from hand.errors import (
     ERR_CONFIG_NOT_EXISTS,
@@ -35,9 +34,6 @@ def ensure_gh_token(token: str):
     """
     Raise token error if token is valid by requesting github
     """
-    httpx_headers = httpx.Headers(
-        {"User-Agent": "GitHubClassroomUtils/1.0", "Authorization": f"token {token}",}
-    )
-    res = httpx.get("https://api.github.com/user", headers=httpx_headers)
+    res = get_session().client(token).get("https://api.github.com/user")
     if res.status_code != 200:
         raise ERR_INVALID_GITHUB_TOKEN(token=token)
@@ -1,7 +1,13 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class GitHubRepoCommit(BaseModel):
+    class Config:
+        # used as a dict key
+        frozen = True
+
     name: str  # name of the repository
     commit_hash: str  # 7 characters hash value
 
@@ -10,3 +16,11 @@ class GitHubCommitInfo(BaseModel):
     commit_hash: str  # 7 characters hash value
     pushed_time: str
     repo: str
+
+
+class GitHubCommitsAfter(BaseModel):
+    repo: str
+    nm_commits: int  # commits on the default branch after the given time
+    last_commit_hash: Optional[str] = None  # 7 characters hash value
+    last_committed_time: Optional[str] = None
+    last_pushed_time: Optional[str] = None
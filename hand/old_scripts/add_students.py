@@ -1,7 +1,6 @@
 import sys
 from typing import List, Optional, Tuple
 
-import requests
 import typer
 from halo import Halo
 from rich.columns import Columns
@@ -11,7 +10,7 @@ from rich.panel import Panel
 from hand.config import app_context
 from ..ensures import ensure_config_exists, ensure_gh_token
 from ..utils.github_entities import Team
-from ..utils.github_scanner import github_headers
+from ..utils.github_scanner import github_headers, github_request
 from .shared_options import opt_all_yes, opt_dry, opt_gh_org, opt_github_token
 
 
@@ -27,7 +26,8 @@ def print_table(data):
 
 
 def check_is_github_user(github_id, github_token) -> bool:
-    res = requests.get(
+    res = github_request(
+        "GET",
         f"https://api.github.com/users/{github_id}",
         headers=github_headers(github_token),
     )
@@ -59,8 +59,10 @@ class SafetyActor:
 
     def is_github_user(self, github_id: str, github_token: str) -> bool:
         def is_gh_user(gh_id: str, token: str) -> bool:
-            res = requests.get(
-                f"https://api.github.com/users/{gh_id}", headers=github_headers(token),
+            res = github_request(
+                "GET",
+                f"https://api.github.com/users/{gh_id}",
+                headers=github_headers(token),
             )
             return res.status_code == 200
 
@@ -10,14 +10,14 @@ from pprint import pprint
 from time import time
 from typing import Dict, List, Optional
 
-import httpx
 import trio
 import typer
 from halo import Halo
 
+from hand.api.session import get_session
 from hand.config import app_context
 from ..ensures import ensure_config_exists, ensure_gh_token
-from ..utils.github_scanner import get_github_endpoint_paged_list_async
+from ..utils.github_scanner import aiter_github_endpoint_paged
 from ..utils.google_student import Gstudents
 from .shared_options import opt_all_yes, opt_gh_org, opt_github_token
 
@@ -106,16 +106,7 @@ def announce_grade(
     spinner.succeed(
         f"cloning feeback source repo : {feedback_source_repo} ... {t:4.2f} sec"
     )
-    client = httpx.AsyncClient(
-        headers=httpx.Headers(
-            {
-                "User-Agent": "GitHubClassroomUtils/1.0",
-                "Authorization": "token " + token,
-                # needed for the check-suites request
-                "Accept": "application/vnd.github.antiope-preview+json",
-            }
-        )
-    )
+    client = get_session().async_client(token)
 
     hw_path = feedback_repo_path / homework_prefix / "reports"
 
@@ -168,7 +159,9 @@ def announce_grade(
         spinner.succeed("DRYRUN: skip push to remote")
     else:
         if typer.confirm("Do you want to continue?", default=False):
-            _, t = measure_time(trio.run)(push_to_remote, student_feedback_title, fbs)
+            _, t = measure_time(get_session().run)(
+                push_to_remote, student_feedback_title, fbs
+            )
             spinner.succeed(f"Push feedbacks to remote ... {t:5.2f} sec")
         else:
             spinner.warn("You refused to publish to remote")
@@ -206,16 +199,18 @@ def gen_feedbacks(hw_prefix, fb_root_path, fb_vars) -> List[Dict]:
 async def find_existing_issue(client, org, repo_name, issue_title) -> Optional[int]:
     # TODO: remove argument: org
     # print(f'finding existing issue... :{repo_name}/{issue_title}')
-    issues = await get_github_endpoint_paged_list_async(
-        client, f"repos/{org}/{repo_name}/issues", state="all"
+    issues = aiter_github_endpoint_paged(
+        client,
+        f"repos/{org}/{repo_name}/issues",
+        predicate=lambda i: i["title"] == issue_title,
+        state="all",
     )
     # TODO: deal with repo not exist case
-    if len(issues) != 0:
-        try:
-            issue = next(i for i in issues if i["title"] == issue_title)
+    try:
+        async for issue in issues:
             return int(issue["number"])
-        except:
-            pass
+    finally:
+        await issues.aclose()
     return None
 
 
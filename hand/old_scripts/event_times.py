@@ -19,10 +19,11 @@ from tabulate import tabulate
 
 from hand.config import app_context
 from ..ensures import ensure_config_exists, ensure_gh_token
+from ..utils.event_sweep import PushEventIndex, sweep_org_push_events
 from ..utils.github_entities import Team
 from ..utils.github_scanner import (
     LOCAL_TIMEZONE,
-    get_github_endpoint_paged_list,
+    iter_github_endpoint_paged,
     localtime_from_iso_datestr,
 )
 from .shared_options import opt_dry, opt_gh_org, opt_github_token
@@ -86,6 +87,9 @@ def event_times(
 
     <repo-hash> : string in <repo>:<hash> format
             hw0-ianre657:cb75e99
+
+    Push times are read from the org event feed of the token's user, pushes to
+    private repos are only listed there if the token belongs to an org member.
     """
     ensure_config_exists()
 
@@ -150,11 +154,21 @@ def event_times(
                 r for r in target_repos if get_handle(r) in target_team_members
             ]
 
+    # one pass over the org events resolves most recent pushes at once
+    push_index = PushEventIndex()
+    if not dry:
+        spinner.text = "Sweeping organization events"
+        push_index = sweep_org_push_events(
+            github_organization, github_token, [tuple(r) for r in target_repos]
+        )
+
     for idx, repo in enumerate(target_repos, start=1):
         spinner.text = f"({idx}/{len(parsed_repos)}) Checking {repo.name}"
         if dry:
             continue
-        result: Optional[commitInfo] = getCommitPushTime(
+        result: Optional[commitInfo] = commitInfoFromIndex(
+            push_index, repo.name, repo.commit_hash
+        ) or getCommitPushTime(
             org=github_organization, repo=repo.name, commit_hash=repo.commit_hash
         )
         if result:
@@ -191,14 +205,31 @@ def get_repo_infos(filename: str) -> List[GitHubRepoInfo]:
     return result
 
 
+def commitInfoFromIndex(
+    index: PushEventIndex, repo: str, commit_hash: str
+) -> Optional[commitInfo]:
+    """Find the push-time of given commit-hash among the swept org events
+    """
+    pushed = index.lookup(repo, commit_hash)
+    if pushed is None:
+        return None
+    return commitInfo(
+        pushed.sha[0:7],
+        localtime_from_iso_datestr(pushed.pushed_at),
+        tex_escape(pushed.message.splitlines()[0]),
+        repo,
+    )
+
+
 def getCommitPushTime(org: str, repo: str, commit_hash: str) -> Optional[commitInfo]:
     """Find the push-time of given commit-hash
     """
     global github_token
-    response = get_github_endpoint_paged_list(
-        f"repos/{org}/{repo}/events", github_token, verbose=False
+    event_list = iter_github_endpoint_paged(
+        f"repos/{org}/{repo}/events",
+        github_token,
+        predicate=lambda x: x["type"] == "PushEvent",
     )
-    event_list = [x for x in response if x["type"] == "PushEvent"]
     for event in event_list:
         try:
             github_id = event["actor"]["login"]
@@ -4,6 +4,7 @@ import trio
 import typer
 from tqdm import tqdm
 
+from hand.api.session import get_session
 from hand.config import app_context
 from ..ensures import ensure_config_exists, ensure_gh_token
 from ..utils.github_entities import Team
@@ -53,7 +54,7 @@ def grant_read_access(
     repos = query_matching_repos(
         org, github_repo_prefix=f"{hw_title}-", github_token=token, verbose=True
     )
-    repo_names = [r["name"] for r in repos]
+    repo_names = [r.name for r in repos]
 
     # show repos to operate on
     ncols = 3
@@ -83,7 +84,7 @@ def grant_read_access(
                     fired.refresh()
                 return
 
-        trio.run(async_github)
+        get_session().run(async_github)
 
 
 class pbar_builder:
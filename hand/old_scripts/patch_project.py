@@ -1,4 +1,3 @@
-import os
 import shutil
 import subprocess as sp
 import sys
@@ -7,17 +6,21 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional
 
-import requests
 import typer
 from git import Repo
 from git.objects.commit import Commit
 from halo import Halo
 
+from hand.api.diff_cache import TemplateDiffCache
+from hand.api.git import GitApi, sparse_patterns
+from hand.api.github import GithubAPI
 from hand.config import app_context
 from hand.ensures import ensure_config_exists, ensure_gh_token, ensure_git_cached
+from hand.scripts.patch import ScriptRemotePatch, patch_files
 from ..utils.github_scanner import (
-    get_github_endpoint_paged_list,
     github_headers,
+    github_request,
+    iter_github_endpoint_paged,
     query_matching_repos,
 )
 from .shared_options import opt_all_yes, opt_gh_org, opt_github_token
@@ -35,6 +38,15 @@ def patch_project(
         default=None, help="default to tmpl-{hw-prefix}-revise"
     ),
     only_repo: Optional[str] = typer.Option(default=None, help="only repo to patch"),
+    mirror: bool = typer.Option(
+        True, help="clone student repos against a local mirror of the source repo"
+    ),
+    sparse: bool = typer.Option(
+        True, help="only download and check out the files the patch touches"
+    ),
+    remote: bool = typer.Option(
+        False, help="commit the patch through the Github api, without clones"
+    ),
     dry: bool = typer.Option(
         False, "--dry", help="dry run, do not publish result to the remote"
     ),
@@ -67,7 +79,8 @@ def patch_project(
 
     # Check if repo already contains the patched branch. Skip if so.
     #  api : https://developer.github.com/v3/git/refs/#get-a-reference
-    res = requests.get(
+    res = github_request(
+        "GET",
         f"https://api.github.com/repos/{org}/{source_repo}/git/refs/heads/{patch_branch}",
         headers=github_headers(token),
     )
@@ -83,18 +96,13 @@ def patch_project(
     spinner.info("delete dated folder")
 
     spinner.start(f"Fetch issue template {patch_branch} from {source_repo}")
-    # Fetch patch template on the source repo
-    issues = get_github_endpoint_paged_list(
-        endpoint=f"repos/{org}/{source_repo}/issues", github_token=token, verbose=False
+    # Fetch patch template on the source repo, stop paging once it shows up
+    issues = iter_github_endpoint_paged(
+        endpoint=f"repos/{org}/{source_repo}/issues",
+        github_token=token,
+        predicate=lambda issue: issue["title"].strip() == patch_branch.strip(),
     )
-
-    def find_target_issue() -> Optional[Dict]:
-        for issue in issues:
-            if issue["title"].strip() == patch_branch.strip():
-                return issue
-        return None
-
-    target_issue = find_target_issue()
+    target_issue: Optional[Dict] = next(issues, None)
     if not target_issue:
         raise Exception(f"cannot found issue tmpl `{patch_branch}` on `{source_repo}`")
     issue_tmpl_body = target_issue["body"]
@@ -112,15 +120,19 @@ def patch_project(
     spinner.succeed(f"Create tmp folder: {root_folder}")
     spinner.info(f"Fetch source repo {source_repo} from Github")
     src_repo_path = root_folder / "source_repo"
-    sp.run(
-        [
-            "git",
-            "clone",
-            f"https://github.com/{org}/{source_repo}.git",
-            src_repo_path.name,
-        ],
-        cwd=root_folder,
-    )
+    src_repo_url = f"https://github.com/{org}/{source_repo}.git"
+    # Student repos are forks of the source repo: with a bare mirror of it,
+    # each student clone only fetches and stores the objects it adds
+    clone_args = ["--depth=1"]
+    if mirror:
+        mirror_path = (root_folder / "source_repo.git").resolve()
+        sp.run(
+            ["git", "clone", "--mirror", src_repo_url, mirror_path.name],
+            cwd=root_folder,
+        )
+        src_repo_url = str(mirror_path)
+        clone_args = ["--reference", str(mirror_path)]
+    sp.run(["git", "clone", src_repo_url, src_repo_path.name], cwd=root_folder)
 
     src_repo = Repo(src_repo_path)
     sp.run(
@@ -139,6 +151,11 @@ def patch_project(
         patch_commit=src_repo.heads[patch_branch].commit,
     )
 
+    if sparse:
+        # blobless clones, only the blobs of these paths are ever downloaded
+        clone_args += ["--filter=blob:none", "--no-checkout"]
+        sparse_args = sparse_patterns([*changed_files, *renamed_files])
+
     spinner.start("Fetch information for homework repo")
     spinner.succeed()
     if only_repo is not None:
@@ -147,11 +164,11 @@ def patch_project(
             for re in query_matching_repos(
                 org, github_repo_prefix=only_repo, github_token=token, verbose=False
             )
-            if re["name"] == only_repo
+            if re.name == only_repo
         ]
         repo = next(iter(repos), None)
         if repo:
-            spinner.info("Only patch to repo : " + repo["name"])
+            spinner.info("Only patch to repo : " + repo.name)
         repos = [repo]
     else:
         repos = query_matching_repos(
@@ -159,20 +176,51 @@ def patch_project(
         )
     spinner.succeed()
 
+    # Check which repos already contain the patched branch, in batches
+    spinner.start("Check repos already patched")
+    patched = GithubAPI(token=token, org=org).remote_branches_exist(
+        [r.name for r in repos], patch_branch
+    )
+    spinner.succeed()
+
+    if remote:
+        spinner.start("Patch repos through the Github api")
+        results = ScriptRemotePatch(
+            gh_api=GithubAPI(token=token, org=org),
+            repos=[r.name for r in repos if not patched[r.name]],
+            files=patch_files(
+                master_commit=src_repo.heads["master"].commit,
+                patch_commit=src_repo.heads[patch_branch].commit,
+            ),
+            patch_branch=patch_branch,
+            pr_body=issue_tmpl_body,
+            dry_run=dry,
+        ).run()
+        spinner.succeed()
+        for result in results:
+            if result.status == "failed":
+                spinner.fail(f"{result.repo}  Failed  {result.error}")
+            else:
+                spinner.succeed(f"{result.repo} {result.status}")
+        return
+
+    # The patch is diffed once per pair of commits, then applied to every repo
+    git_api = GitApi()
+    patch_file = TemplateDiffCache(git_api=git_api).get(
+        src_repo_path,
+        src_repo.heads["master"].commit.hexsha,
+        src_repo.heads[patch_branch].commit.hexsha,
+    )
+
     # Patch to student repos
     student_path = root_folder / "student_repos"
     student_path.mkdir()
     for repo_idx, r in enumerate(repos, start=1):
-        pre_prompt_str = f"({repo_idx}/{len(repos)}) " + r["name"]
+        pre_prompt_str = f"({repo_idx}/{len(repos)}) " + r.name
         spinner.start()
 
-        # Check if repo already contains the patched branch. Skip if so.
-        #  api : https://developer.github.com/v3/git/refs/#get-a-reference
-        res = requests.get(
-            f"https://api.github.com/repos/{org}/{r['name']}/git/refs/heads/{patch_branch}",
-            headers=github_headers(token),
-        )
-        if res.status_code == 200:  # this branch exists in the remote
+        # Skip repos which already contain the patched branch
+        if patched[r.name]:
             spinner.text = pre_prompt_str + " Skip " + " already patched"
 
             spinner.succeed()
@@ -181,13 +229,26 @@ def patch_project(
         spinner.text = pre_prompt_str + "cloning repo"
 
         sp.run(
-            ["git", "clone", "--depth=1", r["html_url"]],
+            ["git", "clone", *clone_args, r.html_url],
             cwd=student_path,
             stdout=sp.DEVNULL,
             stderr=sp.DEVNULL,
         )
 
-        hw_repo_name = r["html_url"].rsplit("/")[-1]
+        hw_repo_name = r.html_url.rsplit("/")[-1]
+        if sparse:
+            sp.run(
+                ["git", "sparse-checkout", "set", "--no-cone", *sparse_args],
+                cwd=student_path / hw_repo_name,
+                stdout=sp.DEVNULL,
+                stderr=sp.DEVNULL,
+            )
+            sp.run(
+                ["git", "reset", "--hard"],
+                cwd=student_path / hw_repo_name,
+                stdout=sp.DEVNULL,
+                stderr=sp.DEVNULL,
+            )
 
         # open a new branch & checkout to that branch
         sp.run(
@@ -197,32 +258,23 @@ def patch_project(
             stderr=sp.DEVNULL,
         )
 
-        # copy file to student repo
-        for f in changed_files.keys():
-            (student_path / hw_repo_name / f).parent.mkdir(parents=True, exist_ok=True)
-            shutil.copyfile(src=src_repo_path / f, dst=student_path / hw_repo_name / f)
-        for f in renamed_files.keys():
-            os.remove(student_path / hw_repo_name / f)
-
-        # changed_files = get_changed_files(
-        #     master_commit = src_repo.heads['master'].commit,
-        #     patch_commit = src_repo.heads[patch_branch].commit
-        # )
-        # push (publish) that branch to student repo
-        sp.run(
-            ["git", "add", "."],
-            cwd=student_path / hw_repo_name,
-            stdout=sp.DEVNULL,
-            stderr=sp.DEVNULL,
-        )
+        # apply the template patch, merging with the edits of the student
+        applied = git_api.apply_patch(student_path / hw_repo_name, patch_file)
 
         # Pass if no changed
-        student_repo = Repo(student_path / hw_repo_name)
-        if len(student_repo.index.diff("HEAD")) == 0:
+        if applied.status == "no-op":
             spinner.text = pre_prompt_str + " Passed " + " no changes in repo"
 
             spinner.succeed()
             continue
+        if applied.status == "conflicted":
+            spinner.fail(
+                pre_prompt_str + "  Conflicted  " + ", ".join(applied.conflicts)
+            )
+            continue
+        if applied.status == "failed":
+            spinner.fail(pre_prompt_str + "  Failed  " + f"{applied.error}")
+            continue
 
         sp.run(
             ["git", "commit", "-m", f":construction_worker: Patch: {patch_branch}"],
@@ -257,8 +309,9 @@ def patch_project(
             "head": patch_branch,
             "base": "master",
         }
-        res = requests.post(
-            f"https://api.github.com/repos/{org}/{r['name']}/pulls",
+        res = github_request(
+            "POST",
+            f"https://api.github.com/repos/{org}/{r.name}/pulls",
             headers=github_headers(token),
             json=body,
         )
@@ -0,0 +1,84 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence
+
+import iso8601
+from attr import attrib, attrs
+
+from hand.exchange import GitHubCommitInfo
+
+# Late penalties step up after 1, 3 and 7 days
+DEFAULT_LATE_TIERS = (timedelta(days=1), timedelta(days=3), timedelta(days=7))
+
+
+def to_epoch(time_str: str) -> float:
+    """Seconds since epoch of an ISO8601 string, naive times are taken as UTC"""
+    try:
+        # several times faster than iso8601 for the strings Github returns
+        dt = datetime.fromisoformat(time_str.replace("Z", "+00:00"))
+    except ValueError:
+        dt = iso8601.parse_date(time_str)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+@attrs(auto_attribs=True)
+class Evaluation:
+    """Per submission results, in the order the submissions were given"""
+
+    # seconds after the deadline, zero or negative when on time
+    late_seconds: array
+    # 0 when on time, i when within the i-th tier, len(tiers) + 1 beyond the last one
+    tiers: array
+
+    def late_indices(self) -> List[int]:
+        return [i for i, tier in enumerate(self.tiers) if tier]
+
+
+@attrs(auto_attribs=True)
+class DeadlineEvaluator:
+    """
+    Classify many submissions against a deadline at once.
+
+    Deadlines and late tier bounds are converted to epoch seconds once, every
+    submission is then a subtraction and a bisect over the tier bounds. Students
+    with an extension are compared against their own deadline, keyed by repo name.
+    """
+
+    deadline: datetime
+    extensions: Dict[str, datetime] = attrib(factory=dict)
+    late_tiers: Sequence[timedelta] = DEFAULT_LATE_TIERS
+
+    def __attrs_post_init__(self):
+        self._deadline = self.deadline.timestamp()
+        self._extensions = {r: d.timestamp() for r, d in self.extensions.items()}
+        self._bounds = array("d", sorted(t.total_seconds() for t in self.late_tiers))
+
+    def evaluate(self, repos: Sequence[str], pushed_times: Sequence[str]) -> Evaluation:
+        deadline, extensions, bounds = self._deadline, self._extensions, self._bounds
+        pushed = array("d", map(to_epoch, pushed_times))
+        deadlines = (
+            array("d", (extensions.get(r, deadline) for r in repos))
+            if extensions
+            else array("d", [deadline]) * len(pushed)
+        )
+        late = array("d", map(float.__sub__, pushed, deadlines))
+        tiers = array("B", (bisect_left(bounds, s) + 1 if s > 0 else 0 for s in late))
+        return Evaluation(late_seconds=late, tiers=tiers)
+
+    def evaluate_commits(self, infos: Sequence[GitHubCommitInfo]) -> Evaluation:
+        return self.evaluate([c.repo for c in infos], [c.pushed_time for c in infos])
+
+    def tier_label(self, tier: int) -> str:
+        if tier == 0:
+            return "on time"
+        if tier > len(self._bounds):
+            return f"> {_days(self._bounds[-1])}" if self._bounds else "late"
+        return f"<= {_days(self._bounds[tier - 1])}"
+
+
+def _days(seconds: float) -> str:
+    days = seconds / 86400
+    return f"{days:g} day" + ("" if days == 1 else "s")
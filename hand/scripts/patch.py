@@ -1,11 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 
+import trio
 from attr import define, field
+from git.objects.commit import Commit
 
-from hand.api.git import GitApi
+from hand.api.diff_cache import TemplateDiffCache
+from hand.api.git import ApplyResult, GitApi
+from hand.api.github import AsyncGithubAPI, GithubAPI, TreeEntry
 from ._protocol import Script
 
+# Git network operations wait on the remote most of the time, not on the cpu
+DEFAULT_SYNC_WORKERS = 8
+# Seconds before a clone or pull of a single repo is given up
+DEFAULT_SYNC_TIMEOUT = 300.0
+
+
+@define
+class RepoSyncResult:
+    repo: str
+    status: str  # "cloned", "updated" or "failed"
+    elapsed: float
+    error: Optional[str] = None
+
+
+@define
+class SyncSummary:
+    results: List[RepoSyncResult] = field(factory=list)
+
+    def _with_status(self, status: str) -> List[str]:
+        return [r.repo for r in self.results if r.status == status]
+
+    @property
+    def cloned(self) -> List[str]:
+        return self._with_status("cloned")
+
+    @property
+    def updated(self) -> List[str]:
+        return self._with_status("updated")
+
+    @property
+    def failed(self) -> List[RepoSyncResult]:
+        return [r for r in self.results if r.status == "failed"]
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.cloned)} cloned, {len(self.updated)} updated,"
+            f" {len(self.failed)} failed"
+        )
+
 
 @define
 class PatchResource:
@@ -18,28 +63,125 @@ class PatchResource:
 
     tmpl_repo_name: str
 
+    git_api: GitApi = field(factory=GitApi)
+    # bare mirror of the template, new clones borrow its objects when set
+    template_mirror: Optional[Path] = None
+    # paths the patch touches, student repos are cloned sparse when set
+    patch_paths: Optional[List[str]] = None
+
     def _repo_url(self, name):
         return f"https://github.com/{self.github_org}/{name}"
 
-    def _sync_repo(self, repo_path: Path, remote_url: str):
+    def fetch_template_mirror(self, timeout: Optional[float] = DEFAULT_SYNC_TIMEOUT):
+        """
+        Mirror the template repo once, student repos are forks of it.
+
+        Repos cloned afterwards only fetch and store the objects the template
+        does not have.
+        """
+        mirror = self.src_dir / f"{self.tmpl_repo_name}.git"
+        url = self._repo_url(self.tmpl_repo_name)
+        self.git_api.mirror_remote(mirror, url, timeout=timeout)
+        self.template_mirror = mirror
+
+    def _sync_repo(
+        self,
+        repo_path: Path,
+        remote_url: str,
+        timeout: Optional[float] = None,
+        sparse_paths: Optional[List[str]] = None,
+    ) -> str:
         """ Synchronize a local repository to remote one"""
-        api = GitApi()
         if repo_path.exists():
-            api.sync_remote(repo_path, remote_url)
-        else:
-            api.clone_remote(repo_path, remote_url)
+            self.git_api.sync_remote(repo_path, remote_url, timeout=timeout)
+            return "updated"
+        self.git_api.clone_remote(
+            repo_path,
+            remote_url,
+            timeout=timeout,
+            reference=self.template_mirror,
+            sparse_paths=sparse_paths,
+        )
+        return "cloned"
+
+    def _sync_student_repo(self, repo: str, timeout: Optional[float]) -> RepoSyncResult:
+        start = time.perf_counter()
+        target, url = self.student_dir / repo, self._repo_url(repo)
+        sparse = self.patch_paths
+        try:
+            status, error = self._sync_repo(target, url, timeout, sparse), None
+        except Exception as err:
+            status, error = "failed", str(err).strip() or type(err).__name__
+        return RepoSyncResult(repo, status, time.perf_counter() - start, error)
+
+    def fetch_student_remotes(
+        self,
+        repo_names: List[str],
+        workers: int = DEFAULT_SYNC_WORKERS,
+        timeout: Optional[float] = DEFAULT_SYNC_TIMEOUT,
+        on_progress: Optional[Callable[[RepoSyncResult, int, int], None]] = None,
+    ) -> SyncSummary:
+        """
+        Fetch list of student repositories into local folder.
 
-    def fetch_student_remotes(self, repo_names: List[str]):
-        """Fetch list of student repositories into local folder"""
-        for repo in repo_names:
-            target_folder = self.student_dir / repo
-            self._sync_repo(target_folder, self._repo_url(repo))
+        Up to `workers` repos are cloned or pulled at the same time, a repo taking
+        longer than `timeout` seconds fails without stopping the others.
+        `on_progress(result, nm_done, nm_total)` is called as each repo finishes.
+        """
+        repo_names = list(dict.fromkeys(repo_names))
+        summary = SyncSummary()
+        if not repo_names:
+            return summary
+        with ThreadPoolExecutor(max_workers=min(workers, len(repo_names))) as pool:
+            futures = [
+                pool.submit(self._sync_student_repo, repo, timeout)
+                for repo in repo_names
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                summary.results.append(result)
+                if on_progress is not None:
+                    on_progress(result, done, len(repo_names))
+        order = {repo: i for i, repo in enumerate(repo_names)}
+        summary.results.sort(key=lambda r: order[r.repo])
+        return summary
 
     def fetch_pr_template_repo(self):
         """Fetch the main repository to generate pull request"""
         target_folder = self.src_dir / self.tmpl_repo_name
         self._sync_repo(target_folder, self._repo_url(self.tmpl_repo_name))
 
+    def _template_range(
+        self, patch_branch: str, base_branch: str
+    ) -> Tuple[Path, str, str]:
+        repo_path = self.src_dir / self.tmpl_repo_name
+        base = self.git_api.resolve(repo_path, f"origin/{base_branch}")
+        head = self.git_api.resolve(repo_path, f"origin/{patch_branch}")
+        return repo_path, base, head
+
+    def template_diff(
+        self, patch_branch: str, cache: TemplateDiffCache, base_branch: str = "master"
+    ) -> Path:
+        """Patch file from the base to the patch branch of the fetched template"""
+        return cache.get(*self._template_range(patch_branch, base_branch))
+
+    def template_patch_paths(
+        self, patch_branch: str, base_branch: str = "master"
+    ) -> List[str]:
+        """Paths `template_diff` touches, e.g. to set as `patch_paths`"""
+        return self.git_api.changed_paths(
+            *self._template_range(patch_branch, base_branch)
+        )
+
+    def apply_template_patch(
+        self, patch: Path, repo_names: List[str]
+    ) -> Dict[str, ApplyResult]:
+        """Apply the patch to each fetched student repo, merging with their edits"""
+        return {
+            repo: self.git_api.apply_patch(self.student_dir / repo, patch)
+            for repo in repo_names
+        }
+
 
 @define
 class PatchResourceBuilder:
@@ -90,3 +232,175 @@ class ScriptPatchSingleProject(Script):
 
     def _repo_exists(self):
         pass
+
+
+@define
+class PatchFile:
+    """A file written or, when `content` is None, deleted by a patch"""
+
+    path: str
+    mode: str = "100644"
+    content: Optional[bytes] = None
+
+
+def patch_files(master_commit: Commit, patch_commit: Commit) -> List[PatchFile]:
+    """Files that turn the tree of `master_commit` into the one of `patch_commit`"""
+    files: Dict[str, PatchFile] = {}
+    for d in master_commit.diff(patch_commit):
+        if d.a_path and (d.deleted_file or d.renamed_file):
+            files.setdefault(d.a_path, PatchFile(d.a_path))
+        if d.b_blob is not None:
+            content = d.b_blob.data_stream.read()
+            files[d.b_path] = PatchFile(d.b_path, f"{d.b_blob.mode:o}", content)
+    return list(files.values())
+
+
+@define
+class RemotePatchResult:
+    repo: str
+    status: str  # "patched", "no-op", "dry-run" or "failed"
+    pull: Optional[int] = None
+    error: Optional[str] = None
+
+
+class _StepFailed(Exception):
+    pass
+
+
+@define
+class ScriptRemotePatch(Script):
+    """Publish a patch to student repos through the Git Data api, without clones
+    Effect, for every repo:
+        1. Commit the files on top of the tree of `base_branch`
+        2. Create `patch_branch` at that commit and open a Pull Request
+    Repos already matching the patch are left alone (no-op). Up to `concurrency`
+    repos are patched at the same time, each takes 6 requests, plus one per
+    binary file and one to list the files when the patch deletes some.
+    Options:
+        + dry_run: only check the base branch of each repo
+    """
+
+    gh_api: GithubAPI
+    repos: List[str]
+    files: List[PatchFile]
+    patch_branch: str
+    pr_body: str
+    base_branch: str = "master"
+    dry_run: bool = False
+    concurrency: int = 8
+    on_result: Optional[Callable[[RemotePatchResult], None]] = None
+    results: List[RemotePatchResult] = field(init=False, factory=list)
+
+    def run(self) -> List[RemotePatchResult]:
+        self.gh_api.session.run(self._do_run)
+        order = {repo: i for i, repo in enumerate(self.repos)}
+        self.results.sort(key=lambda r: order[r.repo])
+        return self.results
+
+    async def _do_run(self):
+        api = AsyncGithubAPI(
+            token=self.gh_api.token, org=self.gh_api.org, session=self.gh_api.session,
+        )
+        limiter = trio.CapacityLimiter(self.concurrency)
+        async with trio.open_nursery() as nursery:
+            for repo in dict.fromkeys(self.repos):
+                nursery.start_soon(self._patch_repo, api, repo, limiter)
+
+    async def _patch_repo(
+        self, api: AsyncGithubAPI, repo: str, limiter: trio.CapacityLimiter
+    ):
+        async with limiter:
+            try:
+                result = await self._publish(api, repo)
+            except _StepFailed as err:
+                result = RemotePatchResult(repo, "failed", error=str(err))
+            except Exception as err:
+                error = str(err).strip() or type(err).__name__
+                result = RemotePatchResult(repo, "failed", error=error)
+        self.results.append(result)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    async def _publish(self, api: AsyncGithubAPI, repo: str) -> RemotePatchResult:
+        head = _check(
+            await api.get_branch_head(repo, self.base_branch),
+            f"branch {self.base_branch} not found",
+        )
+        base_tree = _check(await api.get_commit_tree(repo, head), "head not found")
+        if self.dry_run:
+            return RemotePatchResult(repo, "dry-run")
+
+        entries = await self._entries(api, repo, base_tree)
+        tree = _check(
+            await api.create_tree(repo, base_tree, entries), "cannot create tree"
+        )
+        if tree == base_tree:
+            return RemotePatchResult(repo, "no-op")
+        message = f":construction_worker: Patch: {self.patch_branch}"
+        commit = _check(
+            await api.create_commit(repo, message, tree, [head]),
+            "cannot create commit",
+        )
+        _check(
+            await api.create_branch(repo, self.patch_branch, commit),
+            f"cannot create branch {self.patch_branch}",
+        )
+        pull = _check(
+            await api.create_pull(
+                repo,
+                title=f"[PATCH] {self.patch_branch}",
+                body=self.pr_body,
+                head=self.patch_branch,
+                base=self.base_branch,
+            ),
+            f"cannot create PR {self.patch_branch} to {self.base_branch}",
+        )
+        return RemotePatchResult(repo, "patched", pull=pull)
+
+    async def _entries(
+        self, api: AsyncGithubAPI, repo: str, base_tree: str
+    ) -> List[TreeEntry]:
+        """Text files go inline in the tree, binary ones need a blob first"""
+        existing: List[str] = []
+        if any(f.content is None for f in self.files):
+            # deleting a path the student already removed fails the whole tree
+            existing = _check(
+                await api.get_tree_files(repo, base_tree), "cannot list files"
+            )
+        entries: List[TreeEntry] = []
+        blobs: Dict[bytes, str] = {}
+        for f in self.files:
+            entry: TreeEntry = {"path": f.path, "mode": f.mode, "type": "blob"}
+            if f.content is None:
+                if f.path not in existing:
+                    continue
+                entry["sha"] = None
+            elif _is_text(f.content):
+                entry["content"] = f.content.decode("utf-8")
+            else:
+                # a blob per distinct content, shared by the paths holding it
+                if f.content not in blobs:
+                    blobs[f.content] = _check(
+                        await api.create_blob(repo, f.content),
+                        f"cannot create blob {f.path}",
+                    )
+                entry["sha"] = blobs[f.content]
+            entries.append(entry)
+        return entries
+
+
+def _check(value, error: str):
+    """The value of a step, which failed when it is None or False"""
+    if value is None or value is False:
+        raise _StepFailed(error)
+    return value
+
+
+def _is_text(content: bytes) -> bool:
+    if b"\0" in content:
+        return False
+    try:
+        content.decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+    return True
@@ -1,15 +1,17 @@
 from datetime import datetime, timedelta
-from typing import List, Optional, Protocol
+from typing import Dict, List, Optional, Protocol, Sequence
 
 import humanize
-import iso8601
+import trio
 from attr import attrib, attrs
 from rich.console import Console
 from rich.table import Table
 
-from hand.api.github import GithubAPI
-from hand.exchange import GitHubCommitInfo, GitHubRepoCommit
+from hand.api.commit_cache import CommitPushCache
+from hand.api.github import QL_BATCH_SIZE, GithubAPI
+from hand.exchange import GitHubCommitInfo, GitHubCommitsAfter, GitHubRepoCommit
 from ._protocol import Script
+from .deadlines import DEFAULT_LATE_TIERS, DeadlineEvaluator
 
 
 @attrs(auto_attribs=True)
@@ -18,25 +20,39 @@ class DeadLinePassed:
     commit_hash: str
     last_pushtime: str
     time_passed: timedelta
+    late_tier: str = ""
 
     @classmethod
     def from_commit_info(
-        cls, c: GitHubCommitInfo, time_passed: timedelta
+        cls, c: GitHubCommitInfo, time_passed: timedelta, late_tier: str = ""
     ) -> "DeadLinePassed":
         return DeadLinePassed(
             repo_name=c.repo,
             commit_hash=c.commit_hash,
             last_pushtime=c.pushed_time,
             time_passed=time_passed,
+            late_tier=late_tier,
         )
 
 
+@attrs(auto_attribs=True)
+class CommitFailed:
+    repo_name: str
+    commit_hash: str
+    reason: str
+
+
 class ScriptTimesDisplay(Protocol):
     def add_result_dlpassed(self, p: DeadLinePassed):
         """Displaying output to the user"""
         # left empty
         ...
 
+    def add_result_failed(self, f: CommitFailed):
+        """A commit whose push time couldn't be resolved"""
+        # left empty
+        ...
+
     def print_report(self):
         """Display the execution report"""
         # left empty
@@ -50,27 +66,46 @@ class ScriptTimesDisplayImpl(ScriptTimesDisplay):
     deadline: str
     nm_queried: int = attrib(default=0)
     dl_passed: List[DeadLinePassed] = attrib(factory=list)
+    failed: List[CommitFailed] = attrib(factory=list)
+    console: Console = attrib(factory=Console)
 
     def add_result_dlpassed(self, p: DeadLinePassed):
         self.dl_passed.append(p)
+        self.console.print(
+            f"[red]late[/red] {p.repo_name}:{p.commit_hash}"
+            f" ({humanize.naturaldelta(p.time_passed)} after)"
+        )
+
+    def add_result_failed(self, f: CommitFailed):
+        self.failed.append(f)
+        self.console.print(
+            f"[yellow]failed[/yellow] {f.repo_name}:{f.commit_hash} ({f.reason})"
+        )
 
     def print_report(self):
         t = Table(title=f"Late Submissions: deadline - [red]{self.deadline}",)
         t.add_column("Repo", justify="right", no_wrap=True)
         t.add_column("Submit time")
         t.add_column("Delta")
+        t.add_column("Late tier")
         t.add_column("Commit Hash")
 
-        for r in self.dl_passed:
+        for r in sorted(self.dl_passed, key=lambda r: r.repo_name):
             t.add_row(
                 r.repo_name,
                 r.last_pushtime,
                 f"{humanize.naturaldelta(r.time_passed)} after",
+                r.late_tier,
                 r.commit_hash,
             )
-        console = Console()
-        console.print()
-        console.print(t)
+        self.console.print()
+        self.console.print(t)
+        if self.failed:
+            self.console.print(
+                f"[yellow]{len(self.failed)} commits could not be resolved:[/yellow]"
+            )
+            for f in sorted(self.failed, key=lambda f: f.repo_name):
+                self.console.print(f"  {f.repo_name}:{f.commit_hash} ({f.reason})")
 
 
 @attrs(auto_attribs=True)
@@ -79,39 +114,131 @@ class ScriptTimes(Script):
     repos: List[GitHubRepoCommit]
     deadline: datetime
     display: ScriptTimesDisplay = attrib(factory=ScriptTimesDisplay)
+    push_cache: Optional[CommitPushCache] = None
+    # number of batched queries in flight
+    concurrency: int = 4
+    batch_size: int = QL_BATCH_SIZE
+    # personal deadlines keyed by repo name
+    extensions: Dict[str, datetime] = attrib(factory=dict)
+    late_tiers: Sequence[timedelta] = DEFAULT_LATE_TIERS
 
     def run(self):
-        self._do_run()
+        trio.run(self._do_run)
 
-    def _do_run(self):
-        for repo in self.repos:
-            commit_info = _get_commit_push_time(self.gh_api, repo)
+    async def _do_run(self):
+        self._evaluator = DeadlineEvaluator(
+            deadline=self.deadline,
+            extensions=self.extensions,
+            late_tiers=self.late_tiers,
+        )
+        repos = list(dict.fromkeys(self.repos))
+        cached = {}
+        if self.push_cache:
+            cached = self.push_cache.get_many(self.gh_api.org, repos)
+            self._check_commits(list(cached.values()))
+
+        # only commits not seen before are queried
+        unseen = [c for c in repos if c not in cached]
+        limiter = trio.CapacityLimiter(self.concurrency)
+        async with trio.open_nursery() as nursery:
+            for i in range(0, len(unseen), self.batch_size):
+                batch = unseen[i : i + self.batch_size]
+                nursery.start_soon(self._resolve_batch, batch, limiter)
+        self.display.print_report()
+
+    async def _resolve_batch(
+        self, batch: List[GitHubRepoCommit], limiter: trio.CapacityLimiter
+    ):
+        try:
+            pushed_times = await trio.to_thread.run_sync(
+                self.gh_api.get_commits_pushed_time, batch, limiter=limiter
+            )
+        except Exception as err:
+            for repo in batch:
+                self._fail(repo, f"query failed: {err}")
+            return
+
+        fetched = [_to_commit_info(c, pushed_times.get(c)) for c in batch]
+        if self.push_cache:
+            self.push_cache.put_many(self.gh_api.org, filter(None, fetched))
+        # results are reported as soon as their batch arrives
+        for repo, commit_info in zip(batch, fetched):
             if commit_info is None:
-                # TODO: warning
-                continue
+                self._fail(repo, "push time not found")
+        self._check_commits([c for c in fetched if c is not None])
+
+    def _check_commits(self, commit_infos: List[GitHubCommitInfo]):
+        result = self._evaluator.evaluate_commits(commit_infos)
+        for i in result.late_indices():
+            p = DeadLinePassed.from_commit_info(
+                commit_infos[i],
+                timedelta(seconds=result.late_seconds[i]),
+                self._evaluator.tier_label(result.tiers[i]),
+            )
+            self.display.add_result_dlpassed(p)
+
+    def _fail(self, repo: GitHubRepoCommit, reason: str):
+        f = CommitFailed(
+            repo_name=repo.name, commit_hash=repo.commit_hash, reason=reason
+        )
+        self.display.add_result_failed(f)
+
+
+@attrs(auto_attribs=True)
+class ScriptTimesByPrefix(Script):
+    """Report repos with commits after the deadline, without known commit hashes"""
+
+    gh_api: GithubAPI
+    repos: List[str]
+    deadline: datetime
+    display: ScriptTimesDisplay = attrib(factory=ScriptTimesDisplay)
+    # personal deadlines keyed by repo name
+    extensions: Dict[str, datetime] = attrib(factory=dict)
+    late_tiers: Sequence[timedelta] = DEFAULT_LATE_TIERS
 
-            time_passed: Optional[timedelta] = _check_deadline(
-                self.deadline, iso8601.parse_date(commit_info.pushed_time)
+    def run(self):
+        evaluator = DeadlineEvaluator(
+            deadline=self.deadline,
+            extensions=self.extensions,
+            late_tiers=self.late_tiers,
+        )
+        # commits after the earliest deadline, each repo is then checked against
+        # its own; a dozen batched queries for a whole class
+        since = min([self.deadline, *self.extensions.values()])
+        found = self.gh_api.get_commits_after(self.repos, since)
+        late: List[GitHubCommitsAfter] = []
+        for repo in self.repos:
+            info = found.get(repo)
+            if info is None:
+                f = CommitFailed(
+                    repo_name=repo, commit_hash="", reason="default branch not found"
+                )
+                self.display.add_result_failed(f)
+            elif info.nm_commits > 0:
+                late.append(info)
+
+        # the push time is unknown for commits not pushed by a user, e.g. merges
+        last_times = [i.last_pushed_time or i.last_committed_time for i in late]
+        result = evaluator.evaluate([i.repo for i in late], last_times)
+        for n in result.late_indices():
+            p = DeadLinePassed(
+                repo_name=late[n].repo,
+                commit_hash=late[n].last_commit_hash,
+                last_pushtime=last_times[n],
+                time_passed=timedelta(seconds=result.late_seconds[n]),
+                late_tier=evaluator.tier_label(result.tiers[n]),
             )
-            if time_passed:
-                p = DeadLinePassed.from_commit_info(commit_info, time_passed)
-                self.display.add_result_dlpassed(p)
+            self.display.add_result_dlpassed(p)
         self.display.print_report()
 
 
-def _get_commit_push_time(
-    gh_api: GithubAPI, repo_commit: GitHubRepoCommit
+def _to_commit_info(
+    repo_commit: GitHubRepoCommit, ptime: Optional[str]
 ) -> Optional[GitHubCommitInfo]:
-    """ Get the push time of a certain git commit
+    """ Attach the push time to a certain git commit
     """
-    ptime: str = gh_api.get_commit_pushed_time(repo_commit)
     if ptime is None:
         return None
     return GitHubCommitInfo(
         commit_hash=repo_commit.commit_hash, pushed_time=ptime, repo=repo_commit.name,
     )
-
-
-def _check_deadline(deadline: datetime, provided: datetime) -> Optional[timedelta]:
-    deadline = deadline.astimezone(provided.tzinfo)
-    return (deadline - provided) if deadline < provided else None
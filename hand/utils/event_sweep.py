@@ -0,0 +1,151 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger as log
+
+from .github_scanner import (
+    GithubRequestError,
+    github_headers,
+    github_request,
+    iter_github_endpoint_paged,
+)
+
+
+class PushedCommit(NamedTuple):
+    repo: str
+    sha: str
+    pushed_at: str  # created_at of the PushEvent, ISO8601
+    message: str
+    actor: str
+
+
+class PushEventIndex:
+    """
+    (repo, sha prefix) -> push of a commit, built from PushEvents.
+
+    A commit pushed several times (e.g. to another branch) keeps its earliest push.
+    """
+
+    def __init__(self):
+        self._by_repo: Dict[str, Dict[str, PushedCommit]] = {}
+        self._sorted: Dict[str, List[str]] = {}
+        self.nm_events = 0
+        self._conflicts: Set[Tuple[str, str]] = set()
+
+    def add_event(self, event: dict):
+        """Index the commits of a PushEvent of the org event feed"""
+        repo = event["repo"]["name"].split("/", 1)[-1]
+        commits = self._by_repo.setdefault(repo, {})
+        self._sorted.pop(repo, None)
+        self.nm_events += 1
+        for c in event["payload"]["commits"]:
+            known = commits.get(c["sha"])
+            if known is None or event["created_at"] < known.pushed_at:
+                commits[c["sha"]] = PushedCommit(
+                    repo=repo,
+                    sha=c["sha"],
+                    pushed_at=event["created_at"],
+                    message=c["message"],
+                    actor=event["actor"]["login"],
+                )
+
+    def lookup(self, repo: str, sha_prefix: str) -> Optional[PushedCommit]:
+        """The push of the commit starting with `sha_prefix`, None if not unique"""
+        commits = self._by_repo.get(repo)
+        if not commits:
+            return None
+        shas = self._sorted.get(repo)
+        if shas is None:
+            shas = self._sorted[repo] = sorted(commits)
+        i = bisect_left(shas, sha_prefix)
+        if i == len(shas) or not shas[i].startswith(sha_prefix):
+            return None
+        if i + 1 < len(shas) and shas[i + 1].startswith(sha_prefix):
+            if (repo, sha_prefix) not in self._conflicts:
+                self._conflicts.add((repo, sha_prefix))
+                log.warning(f"SHA prefix {sha_prefix} is ambiguous in {repo}")
+            return None
+        return commits[shas[i]]
+
+    def __len__(self) -> int:
+        return sum(len(commits) for commits in self._by_repo.values())
+
+
+def org_events_endpoint(org: str, github_token: str) -> str:
+    """
+    The event feed of `org` as seen by the owner of `github_token`.
+
+    `orgs/{org}/events` only lists the events of public repos, the private student
+    repos show up in `users/{login}/events/orgs/{org}` which needs the login of the
+    token. The public feed is used when the login can't be resolved.
+    """
+    res = github_request(
+        "GET", "https://api.github.com/user", headers=github_headers(github_token)
+    )
+    if res.status_code != 200:
+        log.warning(
+            f"Cannot resolve the user of the token ({res.status_code}), "
+            "only the public events of the org are swept"
+        )
+        return f"orgs/{org}/events"
+    return f"users/{res.json()['login']}/events/orgs/{org}"
+
+
+# The feed can't be read (404, 410), or it is paged past the events Github keeps (422)
+SWEEP_STOP_STATUSES = {404, 410, 422}
+
+
+def sweep_org_push_events(
+    org: str,
+    github_token: str,
+    targets: Iterable[Tuple[str, str]] = (),
+    verbose: bool = False,
+) -> PushEventIndex:
+    """
+    Page the org event feed once and index the commits of every PushEvent.
+
+    The feed is the one of the token's user, see `org_events_endpoint`, so pushes to
+    private repos are only found when the token belongs to a member of the org.
+    Paging stops as soon as every (repo, sha prefix) in `targets` is resolved.
+    Github only keeps the latest 300 events of a feed, older pushes (and commits
+    beyond the 20 listed per PushEvent) must be looked up per repo.
+    """
+    index = PushEventIndex()
+    pending: Dict[str, Set[str]] = {}
+    for repo, sha_prefix in targets:
+        pending.setdefault(repo, set()).add(sha_prefix)
+    wanted = bool(pending)
+    events = iter_github_endpoint_paged(
+        org_events_endpoint(org, github_token),
+        github_token,
+        predicate=lambda e: e["type"] == "PushEvent",
+        verbose=verbose,
+    )
+    try:
+        for event in events:
+            try:
+                index.add_event(event)
+                repo = event["repo"]["name"].split("/", 1)[-1]
+                shas = [c["sha"] for c in event["payload"]["commits"]]
+            except KeyError:
+                log.warning(f"Malformed event: {event}")
+                continue
+            # the index is only queried once the sweep is over
+            if repo in pending:
+                pending[repo] = {
+                    p
+                    for p in pending[repo]
+                    if not any(sha.startswith(p) for sha in shas)
+                }
+                if not pending[repo]:
+                    del pending[repo]
+            if wanted and not pending:
+                break
+    except GithubRequestError as err:
+        if err.status_code not in SWEEP_STOP_STATUSES:
+            raise
+        # whatever was indexed is still useful, the rest falls back
+        log.warning(f"Org event sweep stopped early: {err}")
+    finally:
+        events.close()
+    return index
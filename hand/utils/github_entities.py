@@ -1,16 +1,16 @@
 import sys
 from typing import Dict
 
-import httpx
-import requests
-from requests.models import Response
+from httpx import Response
 
+from hand.api.session import get_session
 from hand.config import app_context
 from hand.errors import ERR_CANNOT_FETCH_TEAM
 from .github_scanner import (
     get_github_endpoint,
     get_github_endpoint_paged_list,
     github_headers,
+    github_request,
 )
 
 
@@ -48,21 +48,14 @@ class Team:
             self._get_members()
 
         # async
-        self.httpx_headers = httpx.Headers(
-            {
-                "User-Agent": "GitHubClassroomUtils/1.0",
-                "Authorization": "token " + github_token,
-                # needed for the check-suites request
-                "Accept": "application/vnd.github.antiope-preview+json",
-            }
-        )
-        self.async_client = httpx.AsyncClient(headers=self.httpx_headers)
+        self.async_client = get_session().async_client(github_token)
 
     def add_user_to_team(self, user_name) -> Response:
         if self.dry:
             return DrySuccessResponse(200)
         else:
-            res = requests.put(
+            res = github_request(
+                "PUT",
                 "https://api.github.com/teams/{}/memberships/{}".format(
                     self.id, user_name
                 ),
@@ -90,7 +83,8 @@ class Team:
             response.set_dict({"state": "unknown"})
             return response
         else:
-            return requests.get(
+            return github_request(
+                "GET",
                 "https://api.github.com/teams/{}/memberships/{}".format(
                     self.id, user_name
                 ),
@@ -10,46 +10,80 @@ import json
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+)
+from urllib.parse import parse_qs, urlparse
 
 import iso8601
-import requests
 import trio
-from requests.models import Response
+from attr import define
+from httpx import Response
 
-from hand.config import app_context
+from hand.api.session import get_session
+from hand.config import DEFAULT_BASE_FOLDER
+from .repo_store import RepoRecord, RepoStore
 
-scanner_cache = {}
+scanner_cache: Dict[str, RepoStore] = {}
 
 
 def dict_to_pretty_json(d: dict) -> str:
     return json.dumps(d, sort_keys=True, indent=2)
 
 
+def _cache_path(github_organization: str, suffix: str) -> Path:
+    return Path(
+        DEFAULT_BASE_FOLDER / f".github-classroom-utils.{github_organization}.{suffix}"
+    )
+
+
 def load_cache(github_organization: str, verbose: bool = True):
     if github_organization in scanner_cache:
         return
 
-    cache_name = Path(
-        app_context.config_manager.base_folder
-        / f".github-classroom-utils.{github_organization}.json"
-    )
+    cache_name = _cache_path(github_organization, "sqlite3")
     try:
-        if os.path.isfile(cache_name) and os.access(cache_name, os.R_OK):
-            with open(cache_name, "r") as file:
-                data = json.loads(file.read())
-                scanner_cache[github_organization] = data
-                if verbose:
-                    print("Restored cache: " + github_organization)
+        store = RepoStore(cache_name)
+        if store.is_empty():
+            _migrate_json_cache(github_organization, store, verbose)
+        elif verbose:
+            print("Restored cache: " + github_organization)
+        scanner_cache[github_organization] = store
 
     except Exception as e:
-        print("Unexpected error loading cache: " + cache_name)
+        print("Unexpected error loading cache: " + str(cache_name))
         print(e)
         exit(1)
 
 
+def _migrate_json_cache(github_organization: str, store: RepoStore, verbose: bool):
+    """Import the cache file written by older versions, which kept the listing as json"""
+    json_name = _cache_path(github_organization, "json")
+    if not (os.path.isfile(json_name) and os.access(json_name, os.R_OK)):
+        return
+
+    with open(json_name, "r") as file:
+        data = json.loads(file.read())
+    store.replace_all(RepoRecord.from_github(r) for r in data["Contents"])
+    store.set_meta("ETag", data["ETag"])
+    store.commit()
+    if verbose:
+        print("Migrated cache: " + str(json_name))
+
+
 def store_cache(github_organization: str, verbose: bool = True):
     if github_organization not in scanner_cache:
         if verbose:
@@ -60,21 +94,14 @@ def store_cache(github_organization: str, verbose: bool = True):
             )
         return
 
-    cache_name = Path(
-        app_context.config_manager.base_folder
-        / f".github-classroom-utils.{github_organization}.json"
-    )
     try:
-        with open(cache_name, "w") as file:
-            # Pretty-printing the results, even though they're larger. Human-legibility may come in handy.
-            file.write(dict_to_pretty_json(scanner_cache[github_organization]))
-
-            if verbose:
-                print("Wrote cache for " + github_organization)
+        scanner_cache[github_organization].commit()
+        if verbose:
+            print("Wrote cache for " + github_organization)
 
     except Exception as e:
         if verbose:
-            print("Unexpected error writing cache: " + cache_name)
+            print("Unexpected error writing cache: " + github_organization)
             print(e)
 
 
@@ -97,27 +124,64 @@ def github_headers(github_token: str) -> dict:
     }
 
 
+def github_request(method: str, url: str, **kwargs) -> Response:
+    """
+    Send a request to Github over the pooled session shared by every command,
+    which goes through the rate limit scheduler and the http cache.
+    """
+    return get_session().request(method, url, **kwargs)
+
+
+class GithubRequestError(Exception):
+    """A request to the Github REST api didn't answer 200"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Request github error: status code -{status_code}")
+        self.status_code = status_code
+
+
 def fail_on_github_errors(response: Response):
     if response.status_code != 200:
         print("\nRequest failed, status code: %d" % response.status_code)
         print("Headers: %s\n" % dict_to_pretty_json(dict(response.headers)))
         print("Body: %s\n" % dict_to_pretty_json(response.json()))
-        raise (
-            Exception(
-                "Request github error: status code -{}".format(response.status_code)
-            )
-        )
+        raise GithubRequestError(response.status_code)
 
 
 def query_repos_cached(
-    github_organization: str, github_token: str, verbose: bool = True
-) -> List[dict]:
+    github_organization: str,
+    github_token: str,
+    verbose: bool = True,
+    full_sync: bool = False,
+) -> List[RepoRecord]:
+    """
+    Get every repo under the organization, reusing the on-disk cache whenever possible.
+    See `sync_repos_cached` for how the cache is kept up to date.
+    """
+    sync_repos_cached(github_organization, github_token, verbose, full_sync)
+    return scanner_cache[github_organization].all()
+
+
+def sync_repos_cached(
+    github_organization: str,
+    github_token: str,
+    verbose: bool = True,
+    full_sync: bool = False,
+):
+    """
+    Make sure the cached repo listing of the organization is up to date.
+
+    When the cached listing is outdated, only the repos created or pushed since the last
+    sync are fetched and merged into the cache (see `sync_repos_incremental`). Pass
+    `full_sync=True` to re-page the whole organization, e.g. to drop deleted repos.
+    """
     load_cache(github_organization, verbose)
+    store = scanner_cache[github_organization]
 
     # How we can tell if our cache is valid: we do a HEAD request to GitHub, which doesn't consume any
     # of our API limit. The result will include an ETag header, which is just an opaque string. Assuming
     # this string is the same as it was last time, then we'll reuse our cached data. If it's different,
-    # then something changed, so we'll rescan everything.
+    # then something changed, so we'll fetch what's new.
 
     # Ideally, we'd instead use the GitHub v4 GraphQL APIs, which are much, much more efficient than
     # the v3 REST API we're using, but unfortunately, we found some really nasty bugs in the v4
@@ -131,12 +195,9 @@ def query_repos_cached(
 
     request_headers = github_headers(github_token)
 
-    previous_etag = (
-        scanner_cache[github_organization]["ETag"]
-        if github_organization in scanner_cache
-        else ""
-    )
-    head_status = requests.head(
+    previous_etag = store.get_meta("ETag") or ""
+    head_status = github_request(
+        "HEAD",
         "https://api.github.com/orgs/" + github_organization + "/repos",
         headers=request_headers,
     )
@@ -147,7 +208,7 @@ def query_repos_cached(
     if previous_etag == current_etag:
         if verbose:
             print("Cached result for " + github_organization + " is current")
-        return scanner_cache[github_organization]["Contents"]
+        return
     else:
         if verbose:
             print(
@@ -157,24 +218,124 @@ def query_repos_cached(
     if verbose:
         sys.stdout.write("Getting repo list from GitHub")
 
-    all_repos_list = get_github_endpoint_paged_list(
-        "orgs/" + github_organization + "/repos", github_token, verbose
-    )
+    if not full_sync and not store.is_empty():
+        changed_repos, sync_etags = sync_repos_incremental(
+            github_organization, github_token, store, verbose
+        )
+        store.upsert(RepoRecord.from_github(r) for r in changed_repos)
+    else:
+        all_repos_list = get_github_endpoint_paged_list(
+            "orgs/" + github_organization + "/repos", github_token, verbose
+        )
+        if len(all_repos_list) == 0:
+            # if we got an empty list, then something went wrong so don't write it to the cache
+            if verbose:
+                print("Found no repos in %s" % github_organization)
+            return
+        store.replace_all(RepoRecord.from_github(r) for r in all_repos_list)
+        sync_etags = {}
 
-    # force it to exist before we create sub-keys
-    scanner_cache[github_organization] = {}
-    scanner_cache[github_organization]["ETag"] = current_etag
-    scanner_cache[github_organization]["Contents"] = all_repos_list
+    store.set_meta("ETag", current_etag)
+    store.set_json_meta("SyncETags", sync_etags)
 
-    num_repos = len(all_repos_list)
     if verbose:
-        print("Found %d repos in %s" % (num_repos, github_organization))
+        print("Found %d repos in %s" % (store.count(), github_organization))
+
+    store_cache(github_organization, verbose)
+
+
+# Sort orders used by the incremental sync. Listing repos newest-first by creation
+# time finds the repos accepted since the last sync, listing them by push time finds
+# the ones that have been pushed to. In both cases we can stop paging as soon as we
+# hit a repo that is already in the cache and hasn't changed.
+INCREMENTAL_SYNC_SORTS = ["created", "pushed"]
+INCREMENTAL_SYNC_PAGE_SIZE = 100
+
+
+def sync_repos_incremental(
+    github_organization: str, github_token: str, store: RepoStore, verbose: bool = True
+) -> Tuple[List[dict], Dict[str, str]]:
+    """
+    Fetch only the repos that are new or changed compared to the store.
+
+    Returns the changed repos together with the ETags of the first page of each sort
+    order, which are sent back as `If-None-Match` on the next sync. A 304 on the first
+    page means nothing changed for that sort order, and costs no API quota.
+
+    Deleted or renamed repos are not detected here, use a full sync for that.
+    """
+    # both sort orders compare against the store as it was before this sync
+    known: Dict[str, Optional[str]] = store.pushed_times()
+    previous_etags: Dict[str, str] = store.get_json_meta("SyncETags", {})
+    current_etags: Dict[str, str] = {}
+    changed: Dict[str, dict] = {}
+
+    for sort in INCREMENTAL_SYNC_SORTS:
+        repos, etag = _fetch_changed_repos(
+            github_organization, github_token, sort, known, previous_etags.get(sort)
+        )
+        if etag:
+            current_etags[sort] = etag
+        for repo in repos:
+            changed[repo["name"]] = repo
+
+    if verbose:
+        print(" Done.")
+    return list(changed.values()), current_etags
+
+
+def _fetch_changed_repos(
+    github_organization: str,
+    github_token: str,
+    sort: str,
+    known: Dict[str, Optional[str]],
+    previous_etag: Optional[str],
+) -> Tuple[List[dict], Optional[str]]:
+    changed = []
+    first_page_etag = None
+    page_number = 1
+
+    while True:
+        headers = github_headers(github_token)
+        if page_number == 1 and previous_etag:
+            headers["If-None-Match"] = previous_etag
+
+        result = github_request(
+            "GET",
+            "https://api.github.com/orgs/" + github_organization + "/repos",
+            headers=headers,
+            params={
+                "sort": sort,
+                "direction": "desc",
+                "per_page": INCREMENTAL_SYNC_PAGE_SIZE,
+                "page": page_number,
+            },
+        )
+        if result.status_code == 304:
+            # first page is unchanged, so is everything after it
+            return [], previous_etag
+        fail_on_github_errors(result)
 
-    if num_repos != 0:
-        # if we got an empty list, then something went wrong so don't write it to the cache
-        store_cache(github_organization, verbose)
+        if page_number == 1:
+            first_page_etag = result.headers.get("ETag")
 
-    return all_repos_list
+        page = result.json()
+        for repo in page:
+            if _is_repo_unchanged(sort, known, repo):
+                return changed, first_page_etag
+            changed.append(repo)
+
+        if len(page) < INCREMENTAL_SYNC_PAGE_SIZE:
+            return changed, first_page_etag
+        page_number = page_number + 1
+
+
+def _is_repo_unchanged(sort: str, known: Dict[str, Optional[str]], repo: dict) -> bool:
+    if repo["name"] not in known:
+        return False
+    if sort == "pushed":
+        return known[repo["name"]] == repo.get("pushed_at")
+    return True
 
 
 def query_matching_repos(
@@ -182,16 +343,15 @@ def query_matching_repos(
     github_repo_prefix: str,
     github_token: str,
     verbose: bool = True,
-) -> List[dict]:
+) -> List[RepoRecord]:
     """
     This is the function we expect most of our GitHub Classroom utilities to use. Every GitHub repository has
     a URL of the form https://github.com/Organization/Repository/contents, so the arguments given specify
     which organization is being queried and a string prefix for the repositories being matched. The results
-    will be cached to dot-files in the current working directory, such that subsequent queries will run
-    more quickly, assuming that there are no new repositories in the given organization.
+    will be cached to an indexed dot-file in the base folder, such that subsequent queries will run
+    more quickly and only look at the repositories matching the prefix.
 
-    The results of this call are a list of Python dict objects. The fields that you might find useful
-    include:
+    The results of this call are a list of `RepoRecord` objects, which hold only the fields we use:
 
     clone_url: https link to the repository
         (e.g., 'https://github.com/RiceComp215/comp215-week01-intro-2017-dwallach.git')
@@ -207,104 +367,179 @@ def query_matching_repos(
     :param github_repo_prefix: String prefix to match GitHub Repositories.
     :param github_token: Token for the GitHub API.
     :param verbose: Specifies whether anything should be printed to show the user status updates.
-    :return: A list of Python dicts containing the results of the query.
+    :return: A list of RepoRecords containing the results of the query.
     """
-    result = query_repos_cached(github_organization, github_token, verbose)
-    return [x for x in result if x["name"].startswith(github_repo_prefix)]
+    sync_repos_cached(github_organization, github_token, verbose)
+    return scanner_cache[github_organization].with_prefix(github_repo_prefix)
 
 
-def make_repo_private(repo: dict, github_token: str):
-    requests.patch(
-        "https://api.github.com/repos/" + repo["full_name"],
+def make_repo_private(repo: RepoRecord, github_token: str):
+    github_request(
+        "PATCH",
+        "https://api.github.com/repos/" + repo.full_name,
         headers=github_headers(github_token),
         json={"private": True},
     )
 
 
 def get_github_endpoint(endpoint: str, github_token: str, verbose: bool = True) -> dict:
-    result = requests.get(
-        "https://api.github.com/" + endpoint, headers=github_headers(github_token)
+    result = github_request(
+        "GET",
+        "https://api.github.com/" + endpoint,
+        headers=github_headers(github_token),
     )
     fail_on_github_errors(result)
 
     return result.json()
 
 
+# Largest page size the Github REST api accepts, fewer pages means fewer requests
+GITHUB_PAGE_SIZE = 100
+# Upper bound of pages fetched at the same time by the pagers
+MAX_CONCURRENT_PAGES = 8
+
+
+def last_page_from_link(link_header: Optional[str]) -> int:
+    """
+    Read the index of the last page from the `Link` header of a paged response, e.g.
+    <https://api.github.com/orgs/x/repos?per_page=100&page=34>; rel="last"
+    The header is missing when everything fits into one page.
+    """
+    if not link_header:
+        return 1
+    for link in link_header.split(","):
+        url, _, rel = link.partition(";")
+        if 'rel="last"' in rel:
+            query = parse_qs(urlparse(url.strip(" <>")).query)
+            return int(query["page"][0])
+    return 1
+
+
+def _paged_params(page_number: int, kwarg: dict) -> dict:
+    return {"per_page": GITHUB_PAGE_SIZE, **kwarg, "page": page_number}
+
+
 def get_github_endpoint_paged_list(
     endpoint: str, github_token: str, verbose: bool = True, **kwarg
 ) -> List[dict]:
-    page_number = 1
-    result_list = []
+    """
+    Get every item of a paged endpoint.
 
-    while True:
-        if verbose:
-            sys.stdout.write(".")
-            sys.stdout.flush()
+    The first page tells us how many pages there are through its `Link` header,
+    the remaining ones are then fetched concurrently. Items keep the page order.
+    """
 
-        headers = github_headers(github_token)
-        result = requests.get(
+    def get_page(page_number: int) -> Tuple[Response, List[dict]]:
+        result = github_request(
+            "GET",
             "https://api.github.com/" + endpoint,
-            headers=headers,
-            params={"page": page_number, **kwarg} if page_number > 1 else {**kwarg},
+            headers=github_headers(github_token),
+            params=_paged_params(page_number, kwarg),
         )
         fail_on_github_errors(result)
-        page_number = page_number + 1
-
-        result_l = result.json()
+        if verbose:
+            sys.stdout.write(".")
+            sys.stdout.flush()
+        return result, result.json()
 
-        if len(result_l) == 0:
-            if verbose:
-                print(" Done.")
-            break
+    first_page, result_list = get_page(1)
+    last_page_idx = last_page_from_link(first_page.headers.get("Link"))
 
-        result_list = result_list + result_l
+    if last_page_idx > 1:
+        nm_workers = min(MAX_CONCURRENT_PAGES, last_page_idx - 1)
+        with ThreadPoolExecutor(max_workers=nm_workers) as executor:
+            # map() hands back the results in the order of the pages
+            for _, page in executor.map(get_page, range(2, last_page_idx + 1)):
+                result_list.extend(page)
 
+    if verbose:
+        print(" Done.")
     return result_list
 
 
 async def get_github_endpoint_paged_list_async(
     client, endpoint: str, **kwarg
 ) -> List[dict]:
-    paged_res = {}
-
-    async def get_page_res(url, page, **kwarg):
-        return await client.get(url, params={"page": page, **kwarg})
+    """Async version of `get_github_endpoint_paged_list` using a httpx.AsyncClient"""
+    url = f"https://api.github.com/{endpoint}"
 
     # first query, get total number of pages
-    page_number = 1
-    # res_first_page = client.get('https://api.github.com/' + endpoint, params={'page':page_number, **kwarg})
-    res_first_page = await get_page_res(
-        f"https://api.github.com/{endpoint}", page_number, **kwarg
-    )
-    paged_res[page_number] = res_first_page.json()
+    res_first_page = await client.get(url, params=_paged_params(1, kwarg))
+    last_page_idx = last_page_from_link(res_first_page.headers.get("link"))
 
-    # serch through media string and find the last page index
-    media_link_str = str(res_first_page.headers.get("link"))
-    # print(res_first_page.headers)
-    link_to_last_page = re.compile('<https:[^>]*?\?page=(\d*)[^>]*>; rel="(last)"')
-    match = link_to_last_page.search(media_link_str)
-    last_page_idx = 1
-    if match != None:
-        last_page_idx = match.group(1)
+    paged_res: Dict[int, List[dict]] = {1: res_first_page.json()}
+    limiter = trio.CapacityLimiter(MAX_CONCURRENT_PAGES)
 
-    async with trio.open_nursery() as nursery:
-
-        async def collect_res(i):
-            res = await get_page_res(
-                f"https://api.github.com/{endpoint}", page_number, **kwarg
-            )
-            paged_res[i] = res.json()
+    async def collect_res(page_number: int):
+        async with limiter:
+            res = await client.get(url, params=_paged_params(page_number, kwarg))
+        paged_res[page_number] = res.json()
 
-        for i in range(1, last_page_idx + 1):
+    async with trio.open_nursery() as nursery:
+        for i in range(2, last_page_idx + 1):
             nursery.start_soon(collect_res, i)
 
     result_list = []
-    for i, res in paged_res.items():
-        # print(f'gather page:{i}')
-        result_list = result_list + res
+    for i in range(1, last_page_idx + 1):
+        result_list.extend(paged_res[i])
     return result_list
 
 
+def iter_github_endpoint_paged(
+    endpoint: str,
+    github_token: str,
+    predicate: Optional[Callable[[dict], bool]] = None,
+    verbose: bool = False,
+    **kwarg,
+) -> Iterator[dict]:
+    """
+    Yield the items of a paged endpoint one page at a time, keeping only the ones
+    accepted by `predicate`.
+
+    Pages are fetched lazily, so once the caller stops iterating (e.g. after finding
+    the item it looks for) no further pages are requested.
+    """
+    page_number, last_page_idx = 1, 1
+    while page_number <= last_page_idx:
+        result = github_request(
+            "GET",
+            "https://api.github.com/" + endpoint,
+            headers=github_headers(github_token),
+            params=_paged_params(page_number, kwarg),
+        )
+        fail_on_github_errors(result)
+        if verbose:
+            sys.stdout.write(".")
+            sys.stdout.flush()
+        if page_number == 1:
+            last_page_idx = last_page_from_link(result.headers.get("Link"))
+
+        for item in result.json():
+            if predicate is None or predicate(item):
+                yield item
+        page_number = page_number + 1
+
+    if verbose:
+        print(" Done.")
+
+
+async def aiter_github_endpoint_paged(
+    client, endpoint: str, predicate: Optional[Callable[[dict], bool]] = None, **kwarg
+) -> AsyncIterator[dict]:
+    """Async version of `iter_github_endpoint_paged` using a httpx.AsyncClient"""
+    url = f"https://api.github.com/{endpoint}"
+    page_number, last_page_idx = 1, 1
+    while page_number <= last_page_idx:
+        res = await client.get(url, params=_paged_params(page_number, kwarg))
+        if page_number == 1:
+            last_page_idx = last_page_from_link(res.headers.get("link"))
+
+        for item in res.json():
+            if predicate is None or predicate(item):
+                yield item
+        page_number = page_number + 1
+
+
 # And now for a bunch of code to handle times and timezones. This is probably going to
 # require Python 3.7 or later.
 
@@ -323,12 +558,17 @@ def localtime_from_iso_datestr(date_str: str) -> str:
     return datetime_to_local_timezone(iso8601.parse_date(date_str))
 
 
+@lru_cache(maxsize=None)
+def _student_name_pattern(github_prefix: str) -> Pattern:
+    return re.compile(github_prefix + "-(.*)$")
+
+
 def student_name_from(github_prefix: str, repo_name: str) -> str:
     """
     Given a GitHub repo "name" (e.g., "comp215-week01-intro-danwallach") return the username suffix at the
     end ("danwallach"). If it's not there, the result is an empty string ("").
     """
-    m = re.search(github_prefix + "-(.*)$", repo_name)
+    m = _student_name_pattern(github_prefix).search(repo_name)
     if not m:
         return ""  # something funny in the name, so therefore not matching
     else:
@@ -344,15 +584,82 @@ def desired_user(github_prefix: str, ignore_list: List[str], name: str) -> bool:
     (to be ignored). Since we might be dealing with student groups, which can give themselves their own group names,
     this function defaults to True, unless it finds a reason to say False.
     """
+    return _cached_partitioner(github_prefix, tuple(ignore_list)).is_desired(name)
+
+
+@define
+class RepoPartition:
+    # student -> their repos, the original one first then the `-N` clones in order
+    students: Dict[str, List[RepoRecord]]
+    # repos of the graders
+    ignored: List[RepoRecord]
+    # repos without the prefix or without a student name after it
+    unmatched: List[RepoRecord]
+
+
+class RepoPartitioner:
+    """
+    Split the repos of an assignment by student in a single pass.
 
-    # This is inefficient, since we're not caching the
-    # result, but performance doesn't really matter here.
-    lower_case_ignore_list = [x.lower() for x in ignore_list]
+    The prefix pattern and the lower-cased ignore set are built once, and each repo
+    name is parsed by one anchored match, which also captures the `-N` suffix added
+    when a student accepted the assignment several times.
+    """
 
-    m = student_name_from(github_prefix, name).lower()
-    return (
-        m != ""
-        and name.startswith(github_prefix)
-        and name != github_prefix
-        and m not in lower_case_ignore_list
+    def __init__(self, github_prefix: str, ignore_list: Iterable[str] = ()):
+        self.github_prefix = github_prefix
+        self._pattern = re.compile(re.escape(github_prefix) + r"-(.+?)(?:-(\d+))?$")
+        self._ignore: FrozenSet[str] = frozenset(x.lower() for x in ignore_list)
+
+    def student_of(self, name: str) -> str:
+        """Same as `student_name_from`, for names starting with the prefix"""
+        m = self._pattern.match(name)
+        return m.group(1).lower() if m else ""
+
+    def is_desired(self, name: str) -> bool:
+        """Same as `desired_user`"""
+        student = self.student_of(name)
+        return student != "" and student not in self._ignore
+
+    def partition(self, repos: Iterable[RepoRecord]) -> RepoPartition:
+        match, ignore = self._pattern.match, self._ignore
+        clones: Dict[str, List[Tuple[int, RepoRecord]]] = {}
+        ignored, unmatched = [], []
+        for repo in repos:
+            m = match(repo.name)
+            if m is None:
+                unmatched.append(repo)
+                continue
+            student = m.group(1).lower()
+            if student in ignore:
+                ignored.append(repo)
+                continue
+            clone_number = int(m.group(2)) if m.group(2) else 0
+            clones.setdefault(student, []).append((clone_number, repo))
+        students = {
+            student: [repo for _, repo in sorted(repos, key=lambda c: c[0])]
+            for student, repos in clones.items()
+        }
+        return RepoPartition(students=students, ignored=ignored, unmatched=unmatched)
+
+
+@lru_cache(maxsize=32)
+def _cached_partitioner(
+    github_prefix: str, ignore_list: Tuple[str, ...]
+) -> RepoPartitioner:
+    return RepoPartitioner(github_prefix, ignore_list)
+
+
+def partition_matching_repos(
+    github_organization: str,
+    github_repo_prefix: str,
+    github_token: str,
+    ignore_list: Iterable[str] = (),
+    verbose: bool = True,
+) -> RepoPartition:
+    """Partition the cached repos of an assignment by student, see `RepoPartitioner`"""
+    # "hw1-" leaves out the repos of hw10, hw11, ... from the query
+    repos = query_matching_repos(
+        github_organization, github_repo_prefix + "-", github_token, verbose
     )
+    return RepoPartitioner(github_repo_prefix, ignore_list).partition(repos)
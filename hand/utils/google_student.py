@@ -5,6 +5,8 @@ import pygsheets
 from pydantic import BaseModel
 from xlsxwriter.utility import xl_col_to_name
 
+from hand.api.cassette import Cassette, get_cassette
+from hand.api.stats import get_stats
 from hand.config import app_context
 from hand.ensures import ensure_client_secret_json_exists, ensure_config_exists
 from ..errors import ERR_REQUIRE_NO_SPACE, ERR_UNIQUE_STUDENT_ID
@@ -30,18 +32,22 @@ def contains_space(word: str) -> bool:
 class pygsheetInteractor:
     def __init__(self, pyg=pygsheets):
         ensure_client_secret_json_exists()
-        self.gc = pyg.authorize(
-            client_secret=app_context.config_manager.google_client_secret_path
-        )
+        self.stats = get_stats()
+        with self.stats.measure("google", "POST", "authorize"):
+            self.gc = pyg.authorize(
+                client_secret=app_context.config_manager.google_client_secret_path
+            )
         self.sht = None
 
     def open_by_url(self, url):
-        self.sht = self.gc.open_by_url(url)
+        with self.stats.measure("google", "GET", "spreadsheets/{id}"):
+            self.sht = self.gc.open_by_url(url)
 
     def _get_wks_by_title(self, title):
         if self.sht is None:
             raise RuntimeError("Call open_by_url before using any function")
-        return self.sht.worksheet_by_title(title)
+        with self.stats.measure("google", "GET", "spreadsheets/{id}/worksheet"):
+            return self.sht.worksheet_by_title(title)
 
     def get_all_record(self, title, head=1) -> List[Dict]:
         wks = self._get_wks_by_title(title)
@@ -49,9 +55,12 @@ class pygsheetInteractor:
 
         grange = pygsheets.GridRange(end=endtag)
 
-        data = wks.get_values(
-            grange=grange, include_tailing_empty=True, include_tailing_empty_rows=False
-        )
+        with self.stats.measure("google", "GET", "spreadsheets/{id}/values"):
+            data = wks.get_values(
+                grange=grange,
+                include_tailing_empty=True,
+                include_tailing_empty_rows=False,
+            )
 
         idx = head - 1
         keys = data[idx]
@@ -65,6 +74,35 @@ class pygsheetInteractor:
         return vals
 
 
+class CassetteInteractor:
+    """Record the records read through a pygsheetInteractor, or replay them"""
+
+    def __init__(self, cassette: Cassette, actor_factory=pygsheetInteractor):
+        self.cassette = cassette
+        # replaying doesn't need to authorize with Google
+        self.actor = actor_factory() if cassette.recording else None
+        self.url = None
+
+    def open_by_url(self, url):
+        self.url = url
+        if self.actor is not None:
+            self.actor.open_by_url(url)
+
+    def get_all_record(self, title, head=1) -> List[Dict]:
+        return self.cassette.call(
+            "google.get_all_record",
+            [self.url, title, head],
+            lambda: self.actor.get_all_record(title, head),
+        )
+
+
+def default_interactor():
+    cassette = get_cassette()
+    if cassette is not None:
+        return CassetteInteractor(cassette)
+    return pygsheetInteractor()
+
+
 class Gstudents:
     def __init__(self, url: Optional[str] = None, actor=None):
         if url:
@@ -73,7 +111,7 @@ class Gstudents:
             ensure_config_exists()
             self.url = app_context.config.google_spreadsheet.spreadsheet_url
 
-        self.actor = actor if actor is not None else pygsheetInteractor()
+        self.actor = actor if actor is not None else default_interactor()
         self.actor.open_by_url(self.url)
 
         self.config = {
@@ -0,0 +1,189 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from attr import astuple, define, fields
+
+# Bump this whenever the table layout changes, see `_migrate` for how older stores are handled
+SCHEMA_VERSION = "2"
+
+_SCHEMA_META = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    name TEXT PRIMARY KEY,
+    full_name TEXT NOT NULL,
+    html_url TEXT NOT NULL,
+    clone_url TEXT NOT NULL,
+    ssh_url TEXT NOT NULL,
+    private INTEGER NOT NULL,
+    pushed_at TEXT
+);
+"""
+
+
+@define(frozen=True)
+class RepoRecord:
+    """The fields of a Github repo we actually use, instead of the full api payload"""
+
+    name: str
+    full_name: str
+    html_url: str
+    clone_url: str
+    ssh_url: str
+    private: bool
+    pushed_at: Optional[str]
+
+    @classmethod
+    def from_github(cls, payload: dict) -> "RepoRecord":
+        """Build a record from a repo object returned by the Github REST api"""
+        return cls(
+            name=payload["name"],
+            full_name=payload["full_name"],
+            html_url=payload["html_url"],
+            clone_url=payload["clone_url"],
+            ssh_url=payload["ssh_url"],
+            private=bool(payload["private"]),
+            pushed_at=payload.get("pushed_at"),
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "RepoRecord":
+        name, full_name, html_url, clone_url, ssh_url, private, pushed_at = row
+        return cls(
+            name, full_name, html_url, clone_url, ssh_url, bool(private), pushed_at
+        )
+
+
+_COLUMNS = ", ".join(f.name for f in fields(RepoRecord))
+_PLACEHOLDERS = ", ".join("?" for _ in fields(RepoRecord))
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Smallest string greater than every string starting with `prefix`,
+    so that `prefix <= name < bound` matches exactly the names with that prefix.
+    Returns None when there is no such bound (empty prefix).
+    """
+    if prefix == "":
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class RepoStore:
+    """
+    Indexed on-disk store for the repos under a Github organization.
+
+    Repos are kept in a sqlite table keyed by name, so prefix lookups like `hw3-`
+    are range scans over the index instead of loading the whole organization.
+    Changes are kept in a transaction until `commit` is called.
+
+    The store is shared by the sync and async (worker thread) callers of the
+    scanner, every use of the connection holds the lock.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self._lock:
+            self._conn.executescript(_SCHEMA_META)
+            version = self.get_meta("schema")
+            if version != SCHEMA_VERSION:
+                self._migrate(version)
+                self.set_meta("schema", SCHEMA_VERSION)
+                self.commit()
+
+    def _migrate(self, version: Optional[str]):
+        records: List[RepoRecord] = []
+        if version == "1":
+            # version 1 kept the whole api payload of every repo
+            rows = self._conn.execute("SELECT payload FROM repos")
+            records = [RepoRecord.from_github(json.loads(p)) for (p,) in rows]
+        else:
+            # unknown layout, drop everything including the etags so it gets refetched
+            self._conn.execute("DELETE FROM meta")
+        self._conn.executescript("DROP TABLE IF EXISTS repos;")
+        self._conn.executescript(_SCHEMA)
+        self.upsert(records)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def get_json_meta(self, key: str, default=None):
+        value = self.get_meta(key)
+        return json.loads(value) if value is not None else default
+
+    def set_json_meta(self, key: str, value):
+        self.set_meta(key, json.dumps(value))
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM repos LIMIT 1").fetchone() is None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM repos").fetchone()[0]
+
+    def upsert(self, repos: Iterable[RepoRecord]):
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO repos ({_COLUMNS}) VALUES ({_PLACEHOLDERS})",
+                (astuple(r) for r in repos),
+            )
+
+    def replace_all(self, repos: Iterable[RepoRecord]):
+        with self._lock:
+            self._conn.execute("DELETE FROM repos")
+            self.upsert(repos)
+
+    def pushed_times(self) -> Dict[str, Optional[str]]:
+        """Map of repo name to its last push time"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, pushed_at FROM repos"))
+
+    def all(self) -> List[RepoRecord]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM repos ORDER BY name")
+            return [RepoRecord.from_row(row) for row in rows]
+
+    def with_prefix(self, prefix: str) -> List[RepoRecord]:
+        upper = prefix_upper_bound(prefix)
+        if upper is None:
+            return self.all()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM repos"
+                " WHERE name >= ? AND name < ? ORDER BY name",
+                (prefix, upper),
+            )
+            return [RepoRecord.from_row(row) for row in rows]
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
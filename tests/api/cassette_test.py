@@ -0,0 +1,61 @@
+import json
+from typing import List
+
+import httpx
+import pytest
+import trio
+
+from hand.api.cassette import RECORD, Cassette, CassetteMiss, CassetteTransport
+from hand.api.github import AsyncGithubAPI
+
+REPOS = ["hw1-a", "hw1-b", "missing-c"]
+
+
+def server(request: httpx.Request) -> httpx.Response:
+    variables = json.loads(request.content)["variables"]
+    data = {}
+    n = 0
+    while f"repo{n}" in variables:
+        exists = not variables[f"repo{n}"].startswith("missing-")
+        data[f"r{n}"] = {"id": "x"} if exists else None
+        n += 1
+    return httpx.Response(200, json={"data": data}, headers={"X-Test": "1"})
+
+
+@pytest.fixture
+def recorded(tmp_path, mock_api):
+    cassette = Cassette(tmp_path / "repos.json", mode=RECORD)
+    transport = CassetteTransport(cassette, transport=httpx.MockTransport(server))
+    gh = mock_api(transport=transport, token="secret-token")
+    gh.repos_exist(REPOS)
+    gh.repos_exist(["hw1-a"])
+    cassette.call("google.get_all_record", ["url", "StudentInfo", 1], lambda: [{}])
+    cassette.save()
+    return cassette.path
+
+
+def test_replay_without_network(recorded, mock_api):
+    assert "secret-token" not in recorded.read_text()
+    sleeps: List[float] = []
+    cassette = Cassette(recorded, latency=1.0, sleep=sleeps.append)
+    gh = mock_api(transport=CassetteTransport(cassette))
+
+    assert gh.repos_exist(REPOS) == {"hw1-a": True, "hw1-b": True, "missing-c": False}
+    assert gh.repo_exists("hw1-a")
+    assert len(sleeps) == 2
+    records = cassette.call("google.get_all_record", ["url", "StudentInfo", 1], None)
+    assert records == [{}]
+    # every recorded answer was consumed
+    with pytest.raises(CassetteMiss):
+        gh.repo_exists("hw1-a")
+
+
+def test_async_replay(recorded, mock_session):
+    cassette = Cassette(recorded)
+    session = mock_session(transport=CassetteTransport(cassette))
+
+    async def main():
+        gh = AsyncGithubAPI(token="abc", org="org", session=session)
+        return await gh.repos_exist(REPOS)
+
+    assert trio.run(main) == {"hw1-a": True, "hw1-b": True, "missing-c": False}
@@ -0,0 +1,35 @@
+from hand.api.commit_cache import CommitPushCache
+from hand.exchange import GitHubCommitInfo, GitHubRepoCommit
+
+
+def info(repo: str, hash: str) -> GitHubCommitInfo:
+    return GitHubCommitInfo(
+        repo=repo, commit_hash=hash, pushed_time="2020-01-01T00:00:00Z"
+    )
+
+
+def test_get_only_seen_commits(tmp_path):
+    cache = CommitPushCache(tmp_path / "push.sqlite3")
+    cache.put_many("org", [info("hw1-a", "aaaaaaa")])
+    seen = GitHubRepoCommit(name="hw1-a", commit_hash="aaaaaaa")
+    unseen = GitHubRepoCommit(name="hw1-b", commit_hash="bbbbbbb")
+
+    assert cache.get_many("org", [seen, unseen]) == {seen: info("hw1-a", "aaaaaaa")}
+    assert cache.get_many("other-org", [seen]) == {}
+    cache.close()
+
+    # persisted between runs
+    assert len(CommitPushCache(tmp_path / "push.sqlite3").get_many("org", [seen])) == 1
+
+
+def test_prune(tmp_path):
+    cache = CommitPushCache(tmp_path / "push.sqlite3")
+    cache.put_many("org", [info("hw1-a", "a"), info("hw1_b", "b"), info("hw2-a", "c")])
+    cache.put_many("org2", [info("hw1-a", "d")])
+
+    # "_" isn't a wildcard
+    assert [c.repo for _, c, _ in cache.entries("org", "hw1_")] == ["hw1_b"]
+    assert cache.prune(older_than=60) == 0
+    assert cache.prune("org", "hw1") == 2
+    assert cache.info()["entries"] == 2
+    assert cache.prune() == 2
@@ -0,0 +1,248 @@
+import inspect
+import json
+from datetime import datetime, timezone
+from typing import List
+
+import httpx
+import trio
+
+from hand.api.github import AsyncGithubAPI, GithubAPI
+from hand.exchange import GitHubRepoCommit
+
+
+class FakeGraphQL:
+    """Resolve pushedDate lookups, repos named `missing-*` don't exist"""
+
+    def __init__(self):
+        self.queries: List[dict] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.queries.append(body)
+        variables = body["variables"]
+        data, errors = {}, []
+        n = 0
+        while f"repo{n}" in variables:
+            repo = variables[f"repo{n}"]
+            if repo.startswith("missing-"):
+                data[f"r{n}"] = None
+                errors.append({"type": "NOT_FOUND", "path": [f"r{n}"]})
+            else:
+                pushed = f"2020-01-01T00:00:{n % 60:02d}Z"
+                data[f"r{n}"] = {"object": {"pushedDate": pushed}}
+            n += 1
+        payload = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        return httpx.Response(200, json=payload)
+
+
+def test_commits_pushed_time_in_batches(mock_api):
+    server = FakeGraphQL()
+    gh = mock_api(server)
+    commits = [
+        GitHubRepoCommit(name=f"hw1-s{n}", commit_hash=f"{n:07x}") for n in range(120)
+    ]
+
+    pushed = gh.get_commits_pushed_time(commits + commits[:3], batch_size=50)
+
+    assert [len(q["variables"]) for q in server.queries] == [101, 101, 41]
+    assert set(pushed) == set(commits)
+    assert all(t is not None for t in pushed.values())
+
+
+def test_commits_pushed_time_partial_errors(mock_api):
+    server = FakeGraphQL()
+    gh = mock_api(server)
+    ok = GitHubRepoCommit(name="hw1-a", commit_hash="aaaaaaa")
+    missing = GitHubRepoCommit(name="missing-b", commit_hash="bbbbbbb")
+
+    pushed = gh.get_commits_pushed_time([missing, ok])
+
+    assert pushed == {missing: None, ok: "2020-01-01T00:00:01Z"}
+    assert gh.get_commit_pushed_time(ok) == "2020-01-01T00:00:00Z"
+
+
+def history_server(request: httpx.Request) -> httpx.Response:
+    """hw1-late has 3 commits after the deadline, hw1-empty has no commits at all"""
+    variables = json.loads(request.content)["variables"]
+    assert variables["since"] == "2020-01-01T00:00:00+00:00"
+    data = {}
+    n = 0
+    while f"repo{n}" in variables:
+        repo = variables[f"repo{n}"]
+        if repo == "hw1-empty":
+            data[f"r{n}"] = {"defaultBranchRef": None}
+        else:
+            late = repo == "hw1-late"
+            nodes = [
+                {
+                    "abbreviatedOid": "abc1234",
+                    "committedDate": "2020-01-02T00:00:00Z",
+                    "pushedDate": None,
+                }
+            ]
+            history = {"totalCount": 3 if late else 0, "nodes": nodes if late else []}
+            data[f"r{n}"] = {"defaultBranchRef": {"target": {"history": history}}}
+        n += 1
+    return httpx.Response(200, json={"data": data})
+
+
+def test_commits_after(mock_api):
+    gh = mock_api(history_server)
+    since = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    found = gh.get_commits_after(["hw1-late", "hw1-ok", "hw1-empty"], since)
+
+    assert found["hw1-empty"] is None
+    assert found["hw1-ok"].nm_commits == 0
+    assert found["hw1-late"].nm_commits == 3
+    assert found["hw1-late"].last_commit_hash == "abc1234"
+
+
+def test_async_api_parity():
+    public = [n for n in dir(GithubAPI) if not n.startswith("_") and n != "close"]
+    for name in public:
+        assert inspect.iscoroutinefunction(getattr(AsyncGithubAPI, name)), name
+    assert inspect.iscoroutinefunction(AsyncGithubAPI.aclose)
+
+
+def test_async_commits_pushed_time_batches(mock_session):
+    server = FakeGraphQL()
+    session = mock_session(server)
+    commits = [
+        GitHubRepoCommit(name=f"hw1-s{n}", commit_hash=f"{n:07x}") for n in range(120)
+    ]
+
+    async def main():
+        gh = AsyncGithubAPI(token="abc", org="org", session=session)
+        pushed = await gh.get_commits_pushed_time(commits, batch_size=50)
+        await gh.aclose()
+        return pushed
+
+    pushed = trio.run(main)
+
+    assert sorted(len(q["variables"]) for q in server.queries) == [41, 101, 101]
+    assert list(pushed) == commits
+    assert all(t is not None for t in pushed.values())
+
+
+class FakeChecks:
+    """
+    Repos hw{k}-a.. exist unless named `missing-*`, only `*-a` repos have the
+    `grading` branch, hw1-a has 100 issues before the one titled `Grade`
+    """
+
+    def __init__(self):
+        self.queries: List[dict] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/graphql":
+            assert request.url.path == "/orgs/org/teams/students/memberships/alice"
+            return httpx.Response(200, json={"state": "pending"})
+        body = json.loads(request.content)
+        self.queries.append(body)
+        query, variables = body["query"], body["variables"]
+        data, errors = {}, []
+        n = 0
+        while f"repo{n}" in variables:
+            repo = variables[f"repo{n}"]
+            if repo.startswith("missing-"):
+                data[f"r{n}"] = None
+                errors.append({"type": "NOT_FOUND", "path": [f"r{n}"]})
+            elif "issues(" in query:
+                data[f"r{n}"] = {"issues": self.issues(repo, variables[f"after{n}"])}
+            elif "ref(" in query:
+                assert variables["ref"] == "refs/heads/grading"
+                data[f"r{n}"] = {"ref": {"id": "x"} if repo.endswith("-a") else None}
+            else:
+                data[f"r{n}"] = {"id": repo}
+            n += 1
+        payload = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        return httpx.Response(200, json=payload)
+
+    def issues(self, repo: str, cursor):
+        if repo != "hw1-a":
+            return {"nodes": [], "pageInfo": {"hasNextPage": False, "endCursor": None}}
+        if cursor is None:
+            nodes = [{"number": n, "title": f"issue {n}"} for n in range(100)]
+            page_info = {"hasNextPage": True, "endCursor": "p2"}
+            return {"nodes": nodes, "pageInfo": page_info}
+        nodes = [{"number": 142, "title": "Grade "}]
+        return {"nodes": nodes, "pageInfo": {"hasNextPage": False, "endCursor": "p3"}}
+
+
+def test_existence_checks_in_batches(mock_api):
+    server = FakeChecks()
+    gh = mock_api(server)
+    repos = [f"hw{k}-{c}" for k in range(50) for c in "ab"] + ["missing-c"]
+
+    exists = gh.repos_exist(repos)
+    assert len(server.queries) == 2
+    assert exists == {r: not r.startswith("missing-") for r in repos}
+
+    branches = gh.remote_branches_exist(repos, "grading")
+    assert branches == {r: r.endswith("-a") for r in repos}
+    assert gh.remote_branch_exists("hw1-b", "grading") is False
+
+    server.queries.clear()
+    issues = gh.find_issues_with_title(["hw1-a", "hw1-b", "missing-c"], "Grade")
+    assert issues == {"hw1-a": 142, "hw1-b": None, "missing-c": None}
+    # only hw1-a had more issues to scan
+    assert [len(q["variables"]) for q in server.queries] == [7, 3]
+    assert gh.find_issue_with_title("hw1-a", "Grade") == 142
+
+    assert gh.invite_users_to_team("students", ["alice"]) == {"alice": True}
+
+
+def test_async_existence_checks(mock_session):
+    server = FakeChecks()
+    session = mock_session(server)
+    repos = ["hw1-a", "hw1-b", "missing-c"]
+
+    async def main():
+        gh = AsyncGithubAPI(token="abc", org="org", session=session)
+        return (
+            await gh.repos_exist(repos),
+            await gh.remote_branch_exists("hw1-a", "grading"),
+            await gh.find_issues_with_title(repos, "Grade"),
+        )
+
+    exists, branch, issues = trio.run(main)
+    assert exists == {"hw1-a": True, "hw1-b": True, "missing-c": False}
+    assert branch is True
+    assert issues == {"hw1-a": 142, "hw1-b": None, "missing-c": None}
+
+
+def test_repo_prefix_from_sync_and_async_callers(fake_github):
+    fake_github.add_classroom(3)
+    gh = GithubAPI(token="abc", org="org")
+    expected = ["hw1-student0", "hw1-student1", "hw1-student2"]
+
+    # the repo store is opened here, then used from a trio worker thread
+    assert gh.query_repo_with_prefix("hw1") == expected
+
+    async def query():
+        agh = AsyncGithubAPI(token="abc", org="org")
+        return await agh.query_repo_with_prefix("hw1")
+
+    assert trio.run(query) == expected
+    assert gh.query_repo_with_prefix("hw1-student1") == ["hw1-student1"]
+
+
+def test_query_student_repos(fake_github):
+    fake_github.add_classroom(2)
+    for name in ["hw10-student0", "hw1-ta", "hw1-student0-2", "hw1", "tmpl-hw1"]:
+        fake_github.add_repo(name)
+    gh = GithubAPI(token="abc", org="org")
+
+    expected = ["hw1-student0", "hw1-student0-2", "hw1-student1"]
+    assert gh.query_student_repos("hw1", ignore_list=["TA"]) == expected
+
+    async def query():
+        agh = AsyncGithubAPI(token="abc", org="org")
+        return await agh.query_student_repos("hw1", ignore_list=["TA"])
+
+    assert trio.run(query) == expected
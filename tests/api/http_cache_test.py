@@ -0,0 +1,103 @@
+import json
+from typing import Dict, List
+
+import trio
+
+from hand.api.http_cache import HttpCache
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body=None, headers: Dict[str, str] = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(body).encode() if body is not None else b""
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeServer:
+    """Answer 304 whenever the client already has the current etag"""
+
+    def __init__(self, body, etag: str = '"v1"'):
+        self.body = body
+        self.etag = etag
+        self.received: List[Dict[str, str]] = []
+
+    def send(self, headers: Dict[str, str]) -> FakeResponse:
+        self.received.append(headers)
+        if headers.get("If-None-Match") == self.etag:
+            return FakeResponse(304, headers={"ETag": self.etag})
+        return FakeResponse(200, self.body, {"ETag": self.etag, "Link": "<x>"})
+
+
+URL = "https://api.github.com/teams/1/members"
+AUTH = {"Authorization": "token abc"}
+
+
+def test_revalidates_and_serves_304_from_disk(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite3")
+    server = FakeServer([{"login": "a"}])
+
+    first = cache.get(URL, {"page": 1}, AUTH, server.send)
+    assert first.status_code == 200
+    assert "If-None-Match" not in server.received[0]
+
+    second = cache.get(URL, {"page": 1}, AUTH, server.send)
+    assert server.received[1]["If-None-Match"] == '"v1"'
+    assert second.status_code == 200
+    assert second.from_cache
+    assert second.json() == [{"login": "a"}]
+    assert second.headers["link"] == "<x>"
+
+    # content changed on the server side
+    server.body, server.etag = [{"login": "b"}], '"v2"'
+    third = cache.get(URL, {"page": 1}, AUTH, server.send)
+    assert third.json() == [{"login": "b"}]
+
+
+def test_entries_are_per_url_and_token(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite3")
+    server = FakeServer([])
+    cache.get(URL, {"page": 1}, AUTH, server.send)
+    cache.get(URL, {"page": 2}, AUTH, server.send)
+    cache.get(URL, {"page": 1}, {"Authorization": "token other"}, server.send)
+    assert all("If-None-Match" not in h for h in server.received)
+
+
+def test_caller_conditional_request_bypasses_cache(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite3")
+    server = FakeServer([])
+    cache.get(URL, None, AUTH, server.send)
+    resp = cache.get(URL, None, {**AUTH, "If-None-Match": '"v1"'}, server.send)
+    assert resp.status_code == 304
+
+
+def test_lru_eviction(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite3", max_size=250)
+    body = ["x" * 90]  # 96 bytes once encoded
+    for page in range(1, 4):
+        cache.get(URL, {"page": page}, AUTH, FakeServer(body).send)
+    # refresh page 2 so page 3 becomes the least recently used
+    cache.get(URL, {"page": 2}, AUTH, FakeServer(body).send)
+    cache.get(URL, {"page": 4}, AUTH, FakeServer(body).send)
+
+    assert cache.info()["entries"] == 2
+    assert cache.info()["size"] <= 250
+    server = FakeServer(body)
+    cache.get(URL, {"page": 2}, AUTH, server.send)
+    assert "If-None-Match" in server.received[0]
+
+
+def test_async_get(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite3")
+    server = FakeServer({"id": 1})
+
+    async def send(headers):
+        return server.send(headers)
+
+    async def main():
+        await cache.aget(URL, None, AUTH, send)
+        return await cache.aget(URL, None, AUTH, send)
+
+    assert trio.run(main).from_cache
@@ -0,0 +1,131 @@
+from typing import Dict, List
+
+import trio
+
+from hand.api.ratelimit import RateLimitScheduler
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 200, headers: Dict = None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body or {}
+
+    def json(self):
+        return self._body
+
+
+def limit_headers(remaining: int, reset: int = 1000, resource: str = "core"):
+    return {
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset),
+        "X-RateLimit-Resource": resource,
+    }
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept: List[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def mk_scheduler(clock: FakeClock) -> RateLimitScheduler:
+    return RateLimitScheduler(max_concurrency=8, clock=clock.time, sleep=clock.sleep)
+
+
+def test_budget_report():
+    clock = FakeClock()
+    scheduler = mk_scheduler(clock)
+    for remaining in [4999, 4998, 4997]:
+        scheduler.request(lambda: FakeResponse(headers=limit_headers(remaining)))
+    scheduler.request(
+        lambda: FakeResponse(headers=limit_headers(4990, resource="graphql"))
+    )
+
+    assert scheduler.nm_requests == 4
+    assert scheduler.budgets["core"].consumed == 3
+    assert scheduler.budgets["core"].nm_requests == 3
+    assert scheduler.budgets["graphql"].consumed == 1
+    assert "Github requests: 4" in scheduler.report()[0]
+
+
+def test_secondary_limit_backs_off_and_retries():
+    clock = FakeClock()
+    scheduler = mk_scheduler(clock)
+    responses = [
+        FakeResponse(403, {"Retry-After": "30"}),
+        FakeResponse(200, limit_headers(4000)),
+    ]
+    resp = scheduler.request(lambda: responses.pop(0))
+
+    assert resp.status_code == 200
+    assert clock.slept == [30.0]
+    assert scheduler.window == 4 + 1 / 4
+    assert scheduler.nm_throttled == 1
+
+
+def test_secondary_limit_from_message():
+    clock = FakeClock()
+    scheduler = mk_scheduler(clock)
+    responses = [
+        FakeResponse(403, body={"message": "exceeded a secondary rate limit"}),
+        FakeResponse(200),
+    ]
+    scheduler.request(lambda: responses.pop(0))
+    assert clock.slept == [60.0]
+
+
+def test_primary_limit_sleeps_until_reset():
+    clock = FakeClock()
+    clock.now = 100.0
+    scheduler = mk_scheduler(clock)
+
+    # the last allowed request succeeds, the next one waits for the reset
+    scheduler.request(lambda: FakeResponse(200, limit_headers(0, reset=400)))
+    assert clock.slept == []
+    scheduler.request(lambda: FakeResponse(200, limit_headers(4999, reset=4000)))
+    assert clock.slept == [301.0]
+
+
+def test_other_errors_are_not_retried():
+    clock = FakeClock()
+    scheduler = mk_scheduler(clock)
+    calls = []
+
+    def send():
+        calls.append(1)
+        return FakeResponse(404)
+
+    assert scheduler.request(send).status_code == 404
+    assert len(calls) == 1
+
+
+def test_async_concurrency_is_bounded():
+    scheduler = RateLimitScheduler(max_concurrency=3)
+    in_flight, peak = 0, 0
+
+    async def send():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await trio.sleep(0.01)
+        in_flight -= 1
+        return FakeResponse(200)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for _ in range(10):
+                nursery.start_soon(scheduler.arequest, send)
+
+    trio.run(main)
+    # never more than the limit, how many overlap depends on the timing
+    assert peak <= 3
+    assert scheduler.nm_requests == 10
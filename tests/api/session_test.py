@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import httpx
+import trio
+
+from hand.api.github import GithubAPI
+from hand.api.session import get_session
+
+URL = "https://api.github.com/orgs/org/repos"
+
+
+class Recorder:
+    """Answer every request with the same etag, 304 if the client already has it"""
+
+    def __init__(self):
+        self.requests: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, json=[{"name": "hw1"}], headers={"ETag": '"v1"'})
+
+
+def test_client_reuses_pool_and_revalidates(mock_session):
+    recorder = Recorder()
+    session = mock_session(recorder)
+    client = session.client("abc")
+
+    first = client.get(URL, params={"page": 1})
+    pool = session.http
+    second = client.get(URL, params={"page": 1})
+
+    assert first.json() == second.json() == [{"name": "hw1"}]
+    assert getattr(second, "from_cache", False)
+    assert session.http is pool
+    assert [r.headers["Authorization"] for r in recorder.requests] == ["token abc"] * 2
+    assert recorder.requests[1].headers["If-None-Match"] == '"v1"'
+    assert session.scheduler.nm_requests == 2
+
+
+def test_close_and_reopen(mock_session):
+    recorder = Recorder()
+    with mock_session(recorder) as session:
+        pool = session.http
+        session.client("abc").post(URL, json={})
+    assert session._client is None
+    assert session.http is not pool
+    session.close()
+
+
+def test_http2_falls_back_without_h2(mock_session):
+    session = mock_session(Recorder(), http2=True)
+    session.client("abc").get(URL)
+    session.close()
+
+
+def test_async_client_per_trio_run(mock_session):
+    recorder = Recorder()
+    session = mock_session(recorder)
+    clients = []
+
+    async def main():
+        resp = await session.async_client("abc").get(URL)
+        assert resp.json() == [{"name": "hw1"}]
+        clients.append(session.async_http)
+        await session.aclose()
+
+    trio.run(main)
+    trio.run(main)
+
+    assert len(recorder.requests) == 2
+    assert clients[0] is not clients[1]
+
+
+def test_run_closes_async_client(mock_session):
+    session = mock_session(Recorder())
+    clients = []
+
+    async def main(token: str):
+        await session.async_client(token).get(URL)
+        clients.append(session.async_http)
+        return token
+
+    assert session.run(main, "abc") == "abc"
+    assert session._async_client is None
+    assert clients[0].is_closed
+
+
+def test_http_client_created_once_across_threads(mock_session):
+    session = mock_session(Recorder())
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = set(executor.map(lambda _: id(session.http), range(32)))
+    assert len(clients) == 1
+    session.close()
+
+
+def test_api_close_keeps_shared_session(mock_session):
+    shared = get_session()
+    pool = shared.http
+    GithubAPI(token="abc", org="org").close()
+    assert shared.http is pool
+
+    private = mock_session(Recorder())
+    assert private.http is not None
+    GithubAPI(token="abc", org="org", session=private).close()
+    assert private._client is None
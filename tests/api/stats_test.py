@@ -0,0 +1,71 @@
+import json
+
+import httpx
+
+from hand.api.ratelimit import RateLimitScheduler
+from hand.api.session import GithubSession, SessionOptions
+from hand.api.stats import RequestStats, endpoint_template
+
+API = "https://api.github.com"
+
+
+def test_endpoint_template():
+    assert endpoint_template(f"{API}/repos/org/hw1-a/issues/3?page=2") == (
+        "/repos/{owner}/{repo}/issues/{number}"
+    )
+    assert endpoint_template(f"{API}/repos/org/hw1-a/git/refs/heads/fix") == (
+        "/repos/{owner}/{repo}/git/refs/{ref}"
+    )
+    assert endpoint_template(f"{API}/orgs/org/teams/ta/memberships/bob") == (
+        "/orgs/{org}/teams/{team}/memberships/{user}"
+    )
+    assert endpoint_template(f"{API}/graphql") == "/graphql"
+
+
+def test_percentiles():
+    stats = RequestStats()
+    for n in range(1, 101):
+        stats.record("github", "GET", "/x", latency=n / 1000, status_code=200)
+
+    [s] = stats.endpoints.values()
+    assert s.percentiles(50, 95, 99) == [0.05, 0.095, 0.099]
+    assert s.nm_errors == 0
+
+
+class Server:
+    """Rate limits the first request, then answers 304 to revalidations"""
+
+    def __init__(self):
+        self.nm_requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.nm_requests += 1
+        if self.nm_requests == 1:
+            return httpx.Response(429, headers={"Retry-After": "1"})
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, json=[{"name": "hw1"}], headers={"ETag": '"v1"'})
+
+
+def test_session_records_attempts(tmp_path):
+    stats = RequestStats()
+    options = SessionOptions(transport=httpx.MockTransport(Server()))
+    scheduler = RateLimitScheduler(sleep=lambda s: None)
+    session = GithubSession(options, scheduler=scheduler, stats=stats)
+    client = session.client("abc")
+
+    for repo in ("hw1-a", "hw1-a", "hw1-b"):
+        client.get(f"{API}/repos/org/{repo}")
+
+    [s] = stats.endpoints.values()
+    assert (s.method, s.endpoint) == ("GET", "/repos/{owner}/{repo}")
+    assert s.nm_requests == 4
+    assert s.nm_retries == 1
+    assert s.nm_errors == 1
+    assert s.nm_not_modified == 1
+    assert s.bytes_received == 2 * len(b'[{"name": "hw1"}]')
+
+    stats.dump_json(tmp_path / "stats.json")
+    dumped = json.loads((tmp_path / "stats.json").read_text())
+    assert dumped["requests"] == 4
+    assert dumped["endpoints"][0]["retries"] == 1
@@ -0,0 +1,124 @@
+"""
+Compare loading the org repo cache from the legacy json file with the sqlite store
+
+Run with: pytest -m bench -s tests/bench/cache_load_bench_test.py
+"""
+import json
+import subprocess as sp
+import sys
+from pathlib import Path
+
+import pytest
+
+from hand.utils.repo_store import RepoRecord, RepoStore
+
+NM_REPOS = 5000
+
+# Each snippet runs in a fresh interpreter, and reports the growth of its peak RSS (KiB)
+# while loading the cache. VmHWM is used since ru_maxrss is inherited from the parent.
+PEAK_RSS = """
+import resource
+def peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            return int(f.read().split("VmHWM:")[1].split()[0])
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+"""
+
+LOAD_JSON = (
+    PEAK_RSS
+    + """
+import json, sys, time
+rss = peak_rss()
+t = time.perf_counter()
+with open(sys.argv[1]) as f:
+    repos = json.loads(f.read())["Contents"]
+elapsed = time.perf_counter() - t
+print(elapsed, peak_rss() - rss, len(repos))
+"""
+)
+
+LOAD_STORE = (
+    PEAK_RSS
+    + """
+import sys, time
+from hand.utils.repo_store import RepoStore
+rss = peak_rss()
+t = time.perf_counter()
+repos = RepoStore(sys.argv[1]).{query}
+elapsed = time.perf_counter() - t
+print(elapsed, peak_rss() - rss, len(repos))
+"""
+)
+
+
+def github_payload(n: int) -> dict:
+    """Mimic a repo object of the Github api, which has around a hundred fields"""
+    name = f"hw{n % 10}-student{n}"
+    api = f"https://api.github.com/repos/org/{name}"
+    payload = {f"field_{i}_url": f"{api}/field_{i}{{/id}}" for i in range(85)}
+    payload.update(
+        {
+            "id": n,
+            "name": name,
+            "full_name": f"org/{name}",
+            "html_url": f"https://github.com/org/{name}",
+            "clone_url": f"https://github.com/org/{name}.git",
+            "ssh_url": f"git@github.com:org/{name}.git",
+            "private": True,
+            "pushed_at": "2020-10-10T10:10:10Z",
+            "created_at": "2020-10-01T10:10:10Z",
+            "description": None,
+            "owner": {"login": "org", "id": 1, "type": "Organization"},
+            "permissions": {"admin": True, "push": True, "pull": True},
+        }
+    )
+    return payload
+
+
+def run_snippet(code: str, *args: str):
+    out = sp.run(
+        [sys.executable, "-c", code, *args],
+        stdout=sp.PIPE,
+        check=True,
+        cwd=Path(__file__).parents[2],
+    ).stdout
+    elapsed, rss, count = out.decode().split()
+    return float(elapsed), int(rss), int(count)
+
+
+@pytest.mark.bench
+def test_bench_cache_load(tmp_path):
+    payloads = [github_payload(n) for n in range(NM_REPOS)]
+
+    json_path = tmp_path / "cache.json"
+    json_path.write_text(
+        json.dumps({"ETag": "x", "Contents": payloads}, sort_keys=True, indent=2)
+    )
+    store_path = tmp_path / "cache.sqlite3"
+    store = RepoStore(store_path)
+    store.replace_all(RepoRecord.from_github(p) for p in payloads)
+    store.commit()
+    store.close()
+
+    results = {
+        "json (legacy)": run_snippet(LOAD_JSON, str(json_path)),
+        "sqlite, all repos": run_snippet(
+            LOAD_STORE.replace("{query}", "all()"), str(store_path)
+        ),
+        "sqlite, prefix hw3-": run_snippet(
+            LOAD_STORE.replace("{query}", "with_prefix('hw3-')"), str(store_path)
+        ),
+    }
+
+    print(f"\nLoading {NM_REPOS} repos")
+    print(f"  file size: json {json_path.stat().st_size // 1024} KiB,", end=" ")
+    print(f"sqlite {store_path.stat().st_size // 1024} KiB")
+    for label, (elapsed, rss, count) in results.items():
+        print(
+            f"  {label:<22} {elapsed * 1000:8.1f} ms"
+            f"  +{rss / 1024:6.1f} MiB peak RSS  ({count} repos)"
+        )
+
+    assert results["sqlite, all repos"][2] == NM_REPOS
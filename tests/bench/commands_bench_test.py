@@ -0,0 +1,154 @@
+"""
+Run the Github side of each command against a simulated 5,000 repo organization
+
+Every request takes LATENCY seconds, the org has 2,000 students and trips the
+secondary rate limit beyond MAX_CONCURRENT requests in flight.
+
+Run with: pytest -m bench -s tests/bench/commands_bench_test.py
+"""
+import time
+from datetime import timedelta
+
+import pytest
+import trio
+from rich.console import Console
+
+from hand.api.github import AsyncGithubAPI, GithubAPI
+from hand.api.stats import get_stats
+from hand.exchange import GitHubRepoCommit
+from hand.scripts.add import ScriptAddStudents
+from hand.scripts.patch import PatchFile, ScriptRemotePatch
+from hand.scripts.times import ScriptTimes, ScriptTimesByPrefix, ScriptTimesDisplay
+from hand.utils.github_scanner import query_matching_repos
+from ..fake_github import EPOCH
+
+NM_STUDENTS = 2_000
+HOMEWORKS = ("hw1", "hw2")
+NM_INVITED = 200
+# 6 requests each, within the 5,000 requests an hour of a token
+NM_PATCHED = 500
+LATENCY = 0.02
+MAX_CONCURRENT = 16
+
+
+@pytest.fixture
+def classroom(fake_github):
+    fake_github.add_classroom(NM_STUDENTS, HOMEWORKS)
+    # 5,000 repos in total
+    for n in range(5_000 - NM_STUDENTS * len(HOMEWORKS)):
+        fake_github.add_repo(f"project-{n}")
+    for n in range(0, NM_STUDENTS, 10):
+        fake_github.push(f"hw1-student{n}", EPOCH + timedelta(days=3))
+    fake_github.latency = LATENCY
+    fake_github.jitter = 0.5
+    fake_github.max_concurrent = MAX_CONCURRENT
+    fake_github.retry_after = 0.5
+    return fake_github
+
+
+class CountingDisplay(ScriptTimesDisplay):
+    def __init__(self):
+        self.nm_late = 0
+
+    def add_result_dlpassed(self, p):
+        self.nm_late += 1
+
+
+def report(title: str, elapsed: float):
+    stats = get_stats()
+    print(f"\n{title}: {elapsed:.2f}s, {stats.nm_requests} requests")
+    Console().print(stats.summary())
+    stats.endpoints.clear()
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+@pytest.mark.bench
+def test_bench_repo_listing(classroom):
+    repos, cold = timed(lambda: query_matching_repos("org", "hw1-", "abc", False))
+    report("repo listing, cold", cold)
+    _, warm = timed(lambda: query_matching_repos("org", "hw1-", "abc", False))
+    report("repo listing, revalidated", warm)
+    assert len(repos) == NM_STUDENTS
+
+
+@pytest.mark.bench
+def test_bench_times(classroom):
+    gh = GithubAPI(token="abc", org="org")
+    commits = [
+        GitHubRepoCommit(
+            name=f"hw2-student{n}",
+            commit_hash=classroom.repos[f"hw2-student{n}"].commits[-1].sha[:7],
+        )
+        for n in range(NM_STUDENTS)
+    ]
+    display = CountingDisplay()
+    script = ScriptTimes(gh_api=gh, repos=commits, deadline=EPOCH, display=display)
+    _, elapsed = timed(script.run)
+    report(f"times, {len(commits)} commits", elapsed)
+    assert display.nm_late == NM_STUDENTS - 1
+
+
+@pytest.mark.bench
+def test_bench_times_by_prefix(classroom):
+    gh = GithubAPI(token="abc", org="org")
+    repos = [f"hw1-student{n}" for n in range(NM_STUDENTS)]
+    display = CountingDisplay()
+    script = ScriptTimesByPrefix(
+        gh_api=gh, repos=repos, deadline=EPOCH + timedelta(days=2), display=display
+    )
+    _, elapsed = timed(script.run)
+    report(f"times --prefix, {len(repos)} repos", elapsed)
+    assert display.nm_late == NM_STUDENTS // 10
+
+
+@pytest.mark.bench
+def test_bench_patch_preflight(classroom):
+    gh = GithubAPI(token="abc", org="org")
+    repos = list(classroom.repos)
+    patched, elapsed = timed(lambda: gh.remote_branches_exist(repos, "fix-1"))
+    report(f"patch preflight, {len(repos)} repos", elapsed)
+    assert not any(patched.values())
+
+
+@pytest.mark.bench
+def test_bench_add_students(classroom):
+    users = [f"new{n}" for n in range(NM_INVITED)]
+    for u in users:
+        classroom.add_user(u)
+    gh = GithubAPI(token="abc", org="org")
+
+    script = ScriptAddStudents(
+        gh_invite_team="students", user_handles=users, dry_run=False, gh_api=gh
+    )
+    _, elapsed = timed(script.run)
+    report(f"add, {NM_INVITED} students one by one", elapsed)
+
+    async def invite():
+        agh = AsyncGithubAPI(token="abc", org="org")
+        return await agh.invite_users_to_team("students", users)
+
+    invited, elapsed = timed(lambda: trio.run(invite))
+    report(f"add, {NM_INVITED} students concurrently", elapsed)
+    assert all(invited.values())
+
+
+@pytest.mark.bench
+def test_bench_remote_patch(classroom):
+    repos = [f"hw1-student{n}" for n in range(NM_PATCHED)]
+    files = [PatchFile("Makefile", content=b"all:\n\tcc main.c\n")]
+    script = ScriptRemotePatch(
+        gh_api=GithubAPI(token="abc", org="org"),
+        repos=repos,
+        files=files,
+        patch_branch="fix-1",
+        pr_body="",
+        concurrency=MAX_CONCURRENT,
+    )
+    results, elapsed = timed(script.run)
+    report(f"patch through the api, {len(repos)} repos", elapsed)
+    assert all(r.status == "patched" for r in results)
@@ -0,0 +1,65 @@
+"""
+Compare classifying submissions one at a time with the bulk deadline evaluator
+
+Run with: pytest -m bench -s tests/bench/deadline_bench_test.py
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import iso8601
+import pytest
+
+from hand.scripts.deadlines import DEFAULT_LATE_TIERS, DeadlineEvaluator
+
+NM_SUBMISSIONS = 100_000
+
+
+def _check_deadline(deadline: datetime, provided: datetime) -> Optional[timedelta]:
+    """The per-submission check the times script used before DeadlineEvaluator"""
+    deadline = deadline.astimezone(provided.tzinfo)
+    return (deadline - provided) if deadline < provided else None
+
+
+def one_at_a_time(deadline, extensions, repos, pushed_times):
+    """What evaluating each submission with _check_deadline costs"""
+    bounds = [t.total_seconds() for t in DEFAULT_LATE_TIERS]
+    tiers = []
+    for repo, pushed in zip(repos, pushed_times):
+        passed = _check_deadline(
+            extensions.get(repo, deadline), iso8601.parse_date(pushed)
+        )
+        late = -passed.total_seconds() if passed else 0
+        tier = next((i + 1 for i, b in enumerate(bounds) if late <= b), len(bounds) + 1)
+        tiers.append(tier if late else 0)
+    return tiers
+
+
+@pytest.mark.bench
+def test_bench_deadline_evaluation():
+    rng = random.Random(0)
+    deadline = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    repos = [f"hw1-student{n}" for n in range(NM_SUBMISSIONS)]
+    pushed_times = [
+        (deadline + timedelta(seconds=rng.randint(-10 * 86400, 10 * 86400)))
+        .isoformat()
+        .replace("+00:00", "Z")
+        for _ in repos
+    ]
+    extensions = {r: deadline + timedelta(days=3) for r in repos[::20]}
+
+    t = time.perf_counter()
+    expected = one_at_a_time(deadline, extensions, repos, pushed_times)
+    single = time.perf_counter() - t
+
+    t = time.perf_counter()
+    evaluator = DeadlineEvaluator(deadline=deadline, extensions=extensions)
+    result = evaluator.evaluate(repos, pushed_times)
+    bulk = time.perf_counter() - t
+
+    print(f"\nClassifying {NM_SUBMISSIONS} submissions")
+    print(f"  one at a time     {single * 1000:8.1f} ms")
+    print(f"  bulk evaluator    {bulk * 1000:8.1f} ms  ({single / bulk:.1f}x)")
+
+    assert list(result.tiers) == expected
@@ -0,0 +1,60 @@
+"""
+Compare grouping repos by student with the per repo helpers and RepoPartitioner
+
+Run with: pytest -m bench -s tests/bench/repo_partition_bench_test.py
+"""
+import random
+import time
+from typing import Dict, List
+
+import pytest
+
+from hand.utils.github_scanner import RepoPartitioner, desired_user, student_name_from
+from hand.utils.repo_store import RepoRecord
+
+NM_REPOS = 50_000
+GRADERS = [f"ta{n}" for n in range(20)]
+
+
+def per_repo(prefix: str, repos: List[RepoRecord]) -> Dict[str, List[str]]:
+    """How callers group repos with the per repo helpers, two name parses per repo"""
+    students: Dict[str, List[str]] = {}
+    for r in repos:
+        if desired_user(prefix, GRADERS, r.name):
+            students.setdefault(student_name_from(prefix, r.name), []).append(r.name)
+    return students
+
+
+@pytest.mark.bench
+def test_bench_repo_partition():
+    rng = random.Random(0)
+    names = [f"hw{rng.randint(1, 9)}-student{n // 2}" for n in range(NM_REPOS)]
+    names += [f"hw3-{ta}" for ta in GRADERS]
+    names = [n + rng.choice(["", "", "", "-1", "-2"]) for n in names]
+    repos = [
+        RepoRecord(
+            name=n,
+            full_name=f"org/{n}",
+            html_url="",
+            clone_url="",
+            ssh_url="",
+            private=True,
+            pushed_at="",
+        )
+        for n in names
+    ]
+
+    t = time.perf_counter()
+    expected = per_repo("hw3", repos)
+    single = time.perf_counter() - t
+
+    t = time.perf_counter()
+    partition = RepoPartitioner("hw3", GRADERS).partition(repos)
+    bulk = time.perf_counter() - t
+
+    print(f"\nPartitioning {len(repos)} repos")
+    print(f"  per repo helpers  {single * 1000:8.1f} ms")
+    print(f"  RepoPartitioner   {bulk * 1000:8.1f} ms  ({single / bulk:.1f}x)")
+
+    got = {s: sorted(r.name for r in rs) for s, rs in partition.students.items()}
+    assert got == {s: sorted(ns) for s, ns in expected.items()}
@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 
 def pytest_deselected(items):
     if not items:
@@ -19,3 +21,82 @@ def pytest_terminal_summary(terminalreporter, exitstatus, config):
         terminalreporter.section("Deselected tests", sep="-", yellow=True, bold=True)
         content = os.linesep.join(item.nodeid for item in deselected)
         terminalreporter.line(content)
+
+
+@pytest.fixture(autouse=True)
+def isolated_http_cache(tmp_path):
+    """Keep the http cache of the tests away from the user's base folder"""
+    from hand.api.http_cache import HttpCache, set_http_cache
+
+    cache = HttpCache(tmp_path / "http-cache.sqlite3")
+    set_http_cache(cache)
+    yield cache
+    set_http_cache(None)
+
+
+@pytest.fixture(autouse=True)
+def isolated_session():
+    """Don't share pooled connections between tests"""
+    from hand.api.session import close_session
+
+    yield
+    close_session()
+
+
+@pytest.fixture
+def fake_github(monkeypatch, tmp_path):
+    """Point every request of `hand` at an in-memory Github, see fake_github.py"""
+    from hand.api import ratelimit, stats
+    from hand.api.session import SessionOptions, configure_session
+    from hand.utils import github_scanner
+    from .fake_github import FakeGithub
+
+    github = FakeGithub()
+    # fresh rate limit budgets, stats and repo listing for every test
+    monkeypatch.setattr(ratelimit, "_scheduler", ratelimit.RateLimitScheduler())
+    monkeypatch.setattr(stats, "_stats", stats.RequestStats())
+    monkeypatch.setattr(github_scanner, "scanner_cache", {})
+    monkeypatch.setattr(
+        github_scanner, "_cache_path", lambda org, suffix: tmp_path / f"{org}.{suffix}"
+    )
+    configure_session(SessionOptions(transport=github.transport))
+    yield github
+    configure_session(SessionOptions())
+
+
+@pytest.fixture
+def mock_session():
+    """
+    Build sessions answered by `handler` (see httpx.MockTransport) or by a given
+    `transport`, each with its own rate limit scheduler
+    """
+    import httpx
+
+    from hand.api.ratelimit import RateLimitScheduler
+    from hand.api.session import GithubSession, SessionOptions
+
+    sessions = []
+
+    def make(handler=None, transport=None, **options) -> GithubSession:
+        if transport is None:
+            transport = httpx.MockTransport(handler)
+        options = SessionOptions(transport=transport, **options)
+        session = GithubSession(options, scheduler=RateLimitScheduler())
+        sessions.append(session)
+        return session
+
+    yield make
+    for session in sessions:
+        session.close()
+
+
+@pytest.fixture
+def mock_api(mock_session):
+    """Build a GithubAPI of the org `org` over a `mock_session`"""
+    from hand.api.github import GithubAPI
+
+    def make(handler=None, transport=None, token: str = "abc") -> GithubAPI:
+        session = mock_session(handler, transport=transport)
+        return GithubAPI(token=token, org="org", session=session)
+
+    return make
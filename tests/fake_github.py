@@ -0,0 +1,737 @@
+"""
+In-memory Github answering the REST and GraphQL requests `hand` sends.
+
+Plug `FakeGithub.transport` into the session (see the `fake_github` fixture) to run
+commands against an organization of any size, with simulated latency, injected
+errors and the primary and secondary rate limits of Github.
+"""
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+import trio
+from attr import define, field
+
+API = "https://api.github.com"
+# Github only keeps the latest events of an org
+MAX_ORG_EVENTS = 300
+EPOCH = datetime(2020, 9, 1, tzinfo=timezone.utc)
+
+
+def iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@define
+class FakeCommit:
+    sha: str
+    message: str
+    committed_at: str
+    pushed_at: str
+    tree: str = ""
+    parents: List[str] = field(factory=list)
+
+
+@define
+class FakeRepo:
+    org: str
+    name: str
+    created_at: str
+    pushed_at: Optional[str] = None
+    default_branch: str = "master"
+    private: bool = True
+    # newest last
+    commits: List[FakeCommit] = field(factory=list)
+    # branch -> sha of its head
+    branches: Dict[str, str] = field(factory=dict)
+    issues: List[dict] = field(factory=list)
+    pulls: List[dict] = field(factory=list)
+    events: List[dict] = field(factory=list)
+    # git objects, commits created through the Git Data api aren't in `commits`
+    objects: Dict[str, FakeCommit] = field(factory=dict)
+    # sha -> {path: (mode, blob sha)}
+    trees: Dict[str, Dict[str, Tuple[str, str]]] = field(factory=dict)
+    blobs: Dict[str, bytes] = field(factory=dict)
+
+    def to_json(self) -> dict:
+        full_name = f"{self.org}/{self.name}"
+        return {
+            "name": self.name,
+            "full_name": full_name,
+            "html_url": f"https://github.com/{full_name}",
+            "clone_url": f"https://github.com/{full_name}.git",
+            "ssh_url": f"git@github.com:{full_name}.git",
+            "private": self.private,
+            "created_at": self.created_at,
+            "pushed_at": self.pushed_at,
+            "default_branch": self.default_branch,
+        }
+
+    def find_commit(self, sha_prefix: str) -> Optional[FakeCommit]:
+        found = [c for c in self.commits if c.sha.startswith(sha_prefix)]
+        return found[0] if len(found) == 1 else None
+
+    def add_blob(self, content: bytes) -> str:
+        sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+        self.blobs[sha] = content
+        return sha
+
+    def add_tree(self, entries: Dict[str, Tuple[str, str]]) -> str:
+        sha = hashlib.sha1(_dumps(sorted(entries.items()))).hexdigest()
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def files(self, branch: Optional[str] = None) -> Dict[str, bytes]:
+        """Content of every file at the head of the branch"""
+        head = self.objects[self.branches[branch or self.default_branch]]
+        return {p: self.blobs[sha] for p, (_, sha) in self.trees[head.tree].items()}
+
+
+@define
+class FakeTeam:
+    id: int
+    slug: str
+    # login -> "active" or "pending"
+    members: Dict[str, str] = field(factory=dict)
+    repos: Dict[str, str] = field(factory=dict)
+
+
+@define
+class RateBudget:
+    limit: int
+    remaining: int
+    reset: float
+
+
+@define
+class Reply:
+    status: int
+    body: Any = None
+    headers: Dict[str, str] = field(factory=dict)
+
+
+class NotFound(Exception):
+    pass
+
+
+class FakeGithub:
+    """
+    A single organization with its repos, teams, users and events.
+
+    latency: seconds every request takes, `jitter` adds up to that fraction
+    error_rate: probability of answering 502, see also `fail_next`
+    rate_limit: requests per hour and token, for REST and GraphQL each
+    max_concurrent: requests of a token in flight before a secondary rate limit
+    """
+
+    def __init__(
+        self,
+        org: str = "org",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: int = 5000,
+        max_concurrent: Optional[int] = None,
+        retry_after: float = 1.0,
+        seed: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.org = org
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.clock = clock
+        self.random = random.Random(seed)
+
+        self.repos: Dict[str, FakeRepo] = {}
+        self.teams: Dict[str, FakeTeam] = {}
+        self.users = {"hand-bot"}
+        self.events: List[dict] = []  # newest first
+        self.requests: List[Tuple[str, str]] = []
+        self.nm_secondary_limited = 0
+
+        self._budgets: Dict[Tuple[str, str], RateBudget] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._failures: List[Tuple[str, re.Pattern, int]] = []
+        self._shas = count(1)
+        self._lock = threading.RLock()
+        self._routes = self._build_routes()
+
+    # Populate
+
+    def add_classroom(
+        self,
+        nm_students: int,
+        homeworks: Tuple[str, ...] = ("hw1",),
+        team: str = "students",
+    ) -> List[str]:
+        """A team of students, each with a repo and one commit per homework"""
+        students = [f"student{n}" for n in range(nm_students)]
+        self.add_team(team, students)
+        for hw in homeworks:
+            for n, student in enumerate(students):
+                repo = self.add_repo(f"{hw}-{student}", created=EPOCH)
+                self.push(repo.name, EPOCH + timedelta(minutes=n), actor=student)
+        return students
+
+    def add_user(self, login: str):
+        self.users.add(login)
+
+    def add_team(self, slug: str, members=()) -> FakeTeam:
+        team = FakeTeam(id=len(self.teams) + 1, slug=slug)
+        for m in members:
+            self.add_user(m)
+            team.members[m] = "active"
+        self.teams[slug] = team
+        return team
+
+    def add_repo(self, name: str, created: datetime = EPOCH) -> FakeRepo:
+        repo = FakeRepo(org=self.org, name=name, created_at=iso(created))
+        self.repos[name] = repo
+        return repo
+
+    def push(
+        self,
+        repo_name: str,
+        when: datetime,
+        message: str = "update",
+        actor: str = "hand-bot",
+        branch: Optional[str] = None,
+        committed: Optional[datetime] = None,
+        files: Optional[Dict[str, Optional[bytes]]] = None,
+    ) -> FakeCommit:
+        """
+        Push a new commit, which becomes the head of the branch
+
+        `files` are written on top of the tree of the previous head, None
+        deletes a file.
+        """
+        repo = self.repos[repo_name]
+        branch = branch or repo.default_branch
+        parent = repo.objects.get(repo.branches.get(branch, ""))
+        entries = dict(repo.trees[parent.tree]) if parent else {}
+        for path, content in (files or {}).items():
+            if content is None:
+                entries.pop(path, None)
+            else:
+                entries[path] = ("100644", repo.add_blob(content))
+        sha = hashlib.sha1(f"{repo_name}{next(self._shas)}".encode()).hexdigest()
+        commit = FakeCommit(
+            sha,
+            message,
+            iso(committed or when),
+            iso(when),
+            tree=repo.add_tree(entries),
+            parents=[parent.sha] if parent else [],
+        )
+        repo.commits.append(commit)
+        repo.objects[sha] = commit
+        repo.branches[branch] = sha
+        repo.pushed_at = iso(when)
+        event = {
+            "type": "PushEvent",
+            "actor": {"login": actor},
+            "repo": {"name": f"{self.org}/{repo_name}"},
+            "created_at": iso(when),
+            "payload": {"commits": [{"sha": sha, "message": message}]},
+        }
+        repo.events.insert(0, event)
+        self.events.insert(0, event)
+        return commit
+
+    def add_issue(self, repo_name: str, title: str, body: str = "") -> dict:
+        repo = self.repos[repo_name]
+        issue = {
+            "number": len(repo.issues) + len(repo.pulls) + 1,
+            "title": title,
+            "body": body,
+            "state": "open",
+        }
+        repo.issues.append(issue)
+        return issue
+
+    def fail_next(self, method: str, path_pattern: str, status=502, times: int = 1):
+        """Answer the next `times` matching requests with `status`"""
+        for _ in range(times):
+            self._failures.append((method, re.compile(path_pattern), status))
+
+    @property
+    def transport(self) -> "FakeGithubTransport":
+        return FakeGithubTransport(self)
+
+    # Request handling
+
+    def delay(self) -> float:
+        return self.latency * (1 + self.jitter * self.random.random())
+
+    def enter(self, token: str) -> bool:
+        """Count a request in flight, False when it trips the secondary limit"""
+        with self._lock:
+            in_flight = self._in_flight.get(token, 0)
+            if self.max_concurrent is not None and in_flight >= self.max_concurrent:
+                self.nm_secondary_limited += 1
+                return False
+            self._in_flight[token] = in_flight + 1
+            return True
+
+    def leave(self, token: str):
+        with self._lock:
+            self._in_flight[token] -= 1
+
+    def secondary_limited(self) -> httpx.Response:
+        body = {"message": "You have exceeded a secondary rate limit."}
+        headers = {"Retry-After": f"{self.retry_after:g}"}
+        return httpx.Response(403, json=body, headers=headers)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        method, path = request.method, request.url.path
+        token = request.headers.get("Authorization", "")
+        resource = "graphql" if path == "/graphql" else "core"
+        with self._lock:
+            self.requests.append((method, path))
+            budget = self._budget(token, resource)
+            limit_headers = {
+                "X-RateLimit-Limit": str(budget.limit),
+                "X-RateLimit-Remaining": str(budget.remaining),
+                "X-RateLimit-Reset": str(int(budget.reset)),
+                "X-RateLimit-Resource": resource,
+            }
+            if budget.remaining <= 0:
+                body = {"message": "API rate limit exceeded"}
+                return httpx.Response(403, json=body, headers=limit_headers)
+
+            reply = self._injected_failure(method, path) or self._route(request)
+            if reply.status == 200 and method in ("GET", "HEAD"):
+                etag = '"' + hashlib.sha1(_dumps(reply.body)).hexdigest() + '"'
+                reply.headers["ETag"] = etag
+                if request.headers.get("If-None-Match") == etag:
+                    # conditional requests answered with 304 are free
+                    return httpx.Response(304, headers={"ETag": etag, **limit_headers})
+            budget.remaining -= 1
+            limit_headers["X-RateLimit-Remaining"] = str(budget.remaining)
+
+        headers = {**limit_headers, **reply.headers}
+        if reply.body is None or method == "HEAD":
+            return httpx.Response(reply.status, headers=headers)
+        return httpx.Response(reply.status, json=reply.body, headers=headers)
+
+    def _budget(self, token: str, resource: str) -> RateBudget:
+        now = self.clock()
+        budget = self._budgets.get((token, resource))
+        if budget is None or budget.reset <= now:
+            budget = RateBudget(self.rate_limit, self.rate_limit, now + 3600)
+            self._budgets[(token, resource)] = budget
+        return budget
+
+    def _injected_failure(self, method: str, path: str) -> Optional[Reply]:
+        for i, (m, pattern, status) in enumerate(self._failures):
+            if m == method and pattern.search(path):
+                del self._failures[i]
+                return Reply(status, {"message": "Injected failure"})
+        if self.error_rate and self.random.random() < self.error_rate:
+            return Reply(502, {"message": "Server Error"})
+        return None
+
+    def _route(self, request: httpx.Request) -> Reply:
+        for method, pattern, handler in self._routes:
+            if request.method not in method:
+                continue
+            match = pattern.fullmatch(request.url.path)
+            if match:
+                try:
+                    return handler(request, *match.groups())
+                except NotFound:
+                    break
+        return Reply(404, {"message": "Not Found"})
+
+    def _build_routes(self):
+        org = re.escape(self.org)
+        name = r"([^/]+)"
+        repo = rf"/repos/{org}/{name}"
+        routes = [
+            (("GET", "HEAD"), rf"/orgs/{org}/repos", self._org_repos),
+            (("GET",), rf"/orgs/{org}/events", self._org_events),
+            (("GET",), rf"/orgs/{org}/teams/{name}", self._team),
+            (("PUT",), rf"/orgs/{org}/teams/{name}/memberships/{name}", self._invite),
+            (("PUT",), rf"/orgs/{org}/teams/{name}/repos/{org}/{name}", self._grant),
+            (("GET",), r"/teams/(\d+)/members", self._team_members),
+            (("GET", "PUT"), rf"/teams/(\d+)/memberships/{name}", self._membership),
+            (("PUT",), rf"/teams/(\d+)/repos/{org}/{name}", self._grant_by_id),
+            (("GET",), rf"/users/{name}", self._user),
+            (("GET",), r"/user", lambda req: Reply(200, {"login": "hand-bot"})),
+            (("GET", "PATCH"), repo, self._repo),
+            (("GET",), rf"{repo}/events", self._repo_events),
+            (("GET",), rf"{repo}/git/refs?/heads/(.+)", self._ref),
+            (("POST",), rf"{repo}/git/refs", self._create_ref),
+            (("GET",), rf"{repo}/git/commits/(\w+)", self._git_commit),
+            (("POST",), rf"{repo}/git/commits", self._create_commit),
+            (("POST",), rf"{repo}/git/trees", self._create_tree),
+            (("GET",), rf"{repo}/git/trees/(\w+)", self._tree),
+            (("POST",), rf"{repo}/git/blobs", self._create_blob),
+            (("GET", "POST"), rf"{repo}/issues", self._issues),
+            (("GET", "PATCH"), rf"{repo}/issues/(\d+)", self._issue),
+            (("GET", "POST"), rf"{repo}/pulls", self._pulls),
+            (("POST",), r"/graphql", self._graphql),
+        ]
+        return [(m, re.compile(p), h) for m, p, h in routes]
+
+    # REST
+
+    def _repo_of(self, name: str) -> FakeRepo:
+        repo = self.repos.get(name)
+        if repo is None:
+            raise NotFound(name)
+        return repo
+
+    def _team_of(self, team_id: str) -> FakeTeam:
+        for team in self.teams.values():
+            if team.id == int(team_id):
+                return team
+        raise NotFound(team_id)
+
+    def _org_repos(self, request):
+        params = request.url.params
+        sort = params.get("sort", "created")
+        key = {
+            "created": lambda r: r.created_at,
+            "pushed": lambda r: r.pushed_at or "",
+            "full_name": lambda r: r.name,
+        }[sort]
+        default_direction = "asc" if sort == "full_name" else "desc"
+        reverse = params.get("direction", default_direction) == "desc"
+        # stable sort keeps the creation order of ties
+        repos = list(self.repos.values())
+        if reverse:
+            repos.reverse()
+        repos.sort(key=key, reverse=reverse)
+        return _paged(request, [r.to_json() for r in repos])
+
+    def _org_events(self, request):
+        return _paged(request, self.events[:MAX_ORG_EVENTS], default_size=30)
+
+    def _team(self, request, slug):
+        team = self.teams.get(slug)
+        if team is None:
+            raise NotFound(slug)
+        return Reply(200, {"id": team.id, "slug": team.slug, "name": team.slug})
+
+    def _team_members(self, request, team_id):
+        team = self._team_of(team_id)
+        members = [{"login": m} for m, s in team.members.items() if s == "active"]
+        return _paged(request, members)
+
+    def _membership(self, request, team_id, user):
+        team = self._team_of(team_id)
+        if request.method == "GET":
+            if user not in team.members:
+                raise NotFound(user)
+            return Reply(200, {"state": team.members[user], "role": "member"})
+        return self._add_member(team, user)
+
+    def _invite(self, request, slug, user):
+        team = self.teams.get(slug)
+        if team is None:
+            raise NotFound(slug)
+        return self._add_member(team, user)
+
+    def _add_member(self, team: FakeTeam, user: str) -> Reply:
+        if user not in self.users:
+            raise NotFound(user)
+        team.members.setdefault(user, "pending")
+        return Reply(200, {"state": team.members[user], "role": "member"})
+
+    def _grant(self, request, slug, repo_name):
+        team = self.teams.get(slug)
+        if team is None:
+            raise NotFound(slug)
+        team.repos[self._repo_of(repo_name).name] = "pull"
+        return Reply(204)
+
+    def _grant_by_id(self, request, team_id, repo_name):
+        self._team_of(team_id).repos[self._repo_of(repo_name).name] = "pull"
+        return Reply(204)
+
+    def _user(self, request, login):
+        if login not in self.users:
+            raise NotFound(login)
+        return Reply(200, {"login": login})
+
+    def _repo(self, request, repo_name):
+        repo = self._repo_of(repo_name)
+        if request.method == "PATCH":
+            repo.private = json.loads(request.content).get("private", repo.private)
+        return Reply(200, repo.to_json())
+
+    def _repo_events(self, request, repo_name):
+        return _paged(request, self._repo_of(repo_name).events, default_size=30)
+
+    def _ref(self, request, repo_name, branch):
+        repo = self._repo_of(repo_name)
+        if branch not in repo.branches:
+            raise NotFound(branch)
+        ref = {
+            "ref": f"refs/heads/{branch}",
+            "object": {"sha": repo.branches[branch], "type": "commit"},
+        }
+        return Reply(200, ref)
+
+    def _create_ref(self, request, repo_name):
+        repo = self._repo_of(repo_name)
+        body = json.loads(request.content)
+        branch = body["ref"][len("refs/heads/") :]
+        if branch in repo.branches:
+            return Reply(422, {"message": "Reference already exists"})
+        if body["sha"] not in repo.objects:
+            return Reply(422, {"message": "Object does not exist"})
+        repo.branches[branch] = body["sha"]
+        return Reply(201, {"ref": body["ref"], "object": {"sha": body["sha"]}})
+
+    def _git_commit(self, request, repo_name, sha):
+        commit = self._repo_of(repo_name).objects.get(sha)
+        if commit is None:
+            raise NotFound(sha)
+        parents = [{"sha": p} for p in commit.parents]
+        body = {"sha": sha, "tree": {"sha": commit.tree}, "parents": parents}
+        return Reply(200, {**body, "message": commit.message})
+
+    def _create_commit(self, request, repo_name):
+        repo = self._repo_of(repo_name)
+        body = json.loads(request.content)
+        if body["tree"] not in repo.trees:
+            return Reply(422, {"message": "Tree SHA does not exist"})
+        if any(p not in repo.objects for p in body.get("parents", [])):
+            return Reply(422, {"message": "Parent SHA does not exist"})
+        sha = hashlib.sha1(f"{repo_name}{next(self._shas)}".encode()).hexdigest()
+        now = iso(datetime.fromtimestamp(self.clock(), timezone.utc))
+        commit = FakeCommit(
+            sha, body["message"], now, now, body["tree"], body.get("parents", [])
+        )
+        repo.objects[sha] = commit
+        return Reply(201, {"sha": sha, "tree": {"sha": commit.tree}})
+
+    def _tree(self, request, repo_name, sha):
+        entries = self._repo_of(repo_name).trees.get(sha)
+        if entries is None:
+            raise NotFound(sha)
+        # recursive listing of the blobs only, the subtrees don't matter here
+        tree = [
+            {"path": p, "mode": mode, "type": "blob", "sha": blob}
+            for p, (mode, blob) in sorted(entries.items())
+        ]
+        return Reply(200, {"sha": sha, "tree": tree, "truncated": False})
+
+    def _create_tree(self, request, repo_name):
+        repo = self._repo_of(repo_name)
+        body = json.loads(request.content)
+        base = body.get("base_tree")
+        if base is not None and base not in repo.trees:
+            return Reply(422, {"message": "base_tree is not a valid tree oid"})
+        entries = dict(repo.trees[base]) if base else {}
+        for e in body["tree"]:
+            if "content" in e:
+                entries[e["path"]] = (e["mode"], repo.add_blob(e["content"].encode()))
+            elif e.get("sha") is None:
+                if e["path"] not in entries:
+                    return Reply(422, {"message": "GitRPC::BadObjectState"})
+                del entries[e["path"]]
+            elif e["sha"] not in repo.blobs:
+                return Reply(422, {"message": "tree.sha is not a valid blob"})
+            else:
+                entries[e["path"]] = (e["mode"], e["sha"])
+        return Reply(201, {"sha": repo.add_tree(entries)})
+
+    def _create_blob(self, request, repo_name):
+        repo = self._repo_of(repo_name)
+        body = json.loads(request.content)
+        content = body["content"]
+        if body.get("encoding") == "base64":
+            data = base64.b64decode(content)
+        else:
+            data = content.encode()
+        return Reply(201, {"sha": repo.add_blob(data)})
+
+    def _issues(self, request, repo_name):
+        repo = self._repo_of(repo_name)
+        if request.method == "POST":
+            body = json.loads(request.content)
+            issue = self.add_issue(repo.name, body["title"], body.get("body", ""))
+            return Reply(201, issue)
+        state = request.url.params.get("state", "open")
+        issues = [i for i in repo.issues if state in ("all", i["state"])]
+        return _paged(request, issues, default_size=30)
+
+    def _issue(self, request, repo_name, number):
+        repo = self._repo_of(repo_name)
+        for issue in repo.issues:
+            if issue["number"] == int(number):
+                if request.method == "PATCH":
+                    issue.update(json.loads(request.content))
+                return Reply(200, issue)
+        raise NotFound(number)
+
+    def _pulls(self, request, repo_name):
+        repo = self._repo_of(repo_name)
+        if request.method == "GET":
+            return _paged(request, repo.pulls, default_size=30)
+        body = json.loads(request.content)
+        if body["head"] not in repo.branches:
+            error = {"message": f"head {body['head']} not found"}
+            return Reply(422, {"message": "Validation Failed", "errors": [error]})
+        pull = {
+            "number": len(repo.issues) + len(repo.pulls) + 1,
+            "title": body["title"],
+            "body": body.get("body", ""),
+            "head": {"ref": body["head"]},
+            "base": {"ref": body["base"]},
+            "state": "open",
+        }
+        repo.pulls.append(pull)
+        return Reply(201, pull)
+
+    # GraphQL, for the query shapes `hand` sends
+
+    def _graphql(self, request):
+        body = json.loads(request.content)
+        query, variables = body["query"], body.get("variables") or {}
+        if "viewerIsAMember" in query:
+            if variables.get("org") != self.org:
+                error = {"type": "NOT_FOUND", "path": ["organization"]}
+                return Reply(200, {"data": {"organization": None}, "errors": [error]})
+            data = {"organization": {"viewerIsAMember": True}}
+            return Reply(200, {"data": data})
+
+        data, errors = {}, []
+        blocks = list(_ALIAS.finditer(query))
+        for i, m in enumerate(blocks):
+            alias, repo_var = m.group(1), m.group(2)
+            end = blocks[i + 1].start() if i + 1 < len(blocks) else len(query)
+            selection = query[m.end() : end]
+            repo = self.repos.get(variables.get(repo_var, ""))
+            if repo is None:
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias]})
+                continue
+            data[alias] = self._select(repo, selection, variables)
+        payload = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        return Reply(200, payload)
+
+    def _select(self, repo: FakeRepo, selection: str, variables: dict) -> dict:
+        def var(name_pattern: str):
+            found = re.search(name_pattern + r"\s*:\s*\$(\w+)", selection)
+            return variables.get(found.group(1)) if found else None
+
+        if "object(expression" in selection:
+            commit = repo.find_commit(var(r"expression"))
+            return {"object": {"pushedDate": commit.pushed_at} if commit else None}
+        if "history(" in selection:
+            head = repo.branches.get(repo.default_branch)
+            if head is None:
+                return {"defaultBranchRef": None}
+            since = var(r"since")
+            after = [
+                c
+                for c in repo.commits
+                if since is None or c.committed_at > iso(_parse(since))
+            ]
+            nodes = [
+                {
+                    "abbreviatedOid": c.sha[:7],
+                    "committedDate": c.committed_at,
+                    "pushedDate": c.pushed_at,
+                }
+                for c in after[::-1][:1]
+            ]
+            history = {"totalCount": len(after), "nodes": nodes}
+            return {"defaultBranchRef": {"target": {"history": history}}}
+        if "ref(qualifiedName" in selection:
+            ref = var(r"qualifiedName") or ""
+            branch = ref[len("refs/heads/") :]
+            exists = branch in repo.branches
+            return {"ref": {"id": f"{repo.name}:{branch}"} if exists else None}
+        if "issues(" in selection:
+            size = int(re.search(r"first:\s*(\d+)", selection).group(1))
+            start = int(var(r"after") or 0)
+            page = repo.issues[start : start + size]
+            nodes = [{"number": i["number"], "title": i["title"]} for i in page]
+            end = start + len(page)
+            info = {"hasNextPage": end < len(repo.issues), "endCursor": str(end)}
+            return {"issues": {"nodes": nodes, "pageInfo": info}}
+        return {"id": repo.name}
+
+
+_ALIAS = re.compile(r"(\w+):\s*repository\(owner:\s*\$\w+,\s*name:\s*\$(\w+)\)")
+
+
+def _parse(time_str: str) -> datetime:
+    return datetime.fromisoformat(time_str.replace("Z", "+00:00"))
+
+
+def _dumps(body: Any) -> bytes:
+    return json.dumps(body, sort_keys=True).encode()
+
+
+def _paged(request: httpx.Request, items: List, default_size: int = 30) -> Reply:
+    """A page of the items with the `Link` header of Github"""
+    params = request.url.params
+    size = min(int(params.get("per_page", default_size)), 100)
+    page = int(params.get("page", 1))
+    last = max((len(items) + size - 1) // size, 1)
+    headers = {}
+    if last > 1:
+
+        def link(n: int) -> str:
+            query = {**dict(params), "per_page": size, "page": n}
+            return f"<{API}{request.url.path}?{urlencode(query)}>"
+
+        rels = [("first", 1), ("prev", page - 1), ("next", page + 1), ("last", last)]
+        headers["Link"] = ", ".join(
+            f'{link(n)}; rel="{rel}"' for rel, n in rels if 1 <= n <= last
+        )
+    return Reply(200, items[(page - 1) * size : page * size], headers)
+
+
+class FakeGithubTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Send the requests of the sync and async clients to a FakeGithub"""
+
+    def __init__(self, github: FakeGithub):
+        self.github = github
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        token = request.headers.get("Authorization", "")
+        if not self.github.enter(token):
+            return self.github.secondary_limited()
+        try:
+            delay = self.github.delay()
+            if delay:
+                time.sleep(delay)
+            return self.github.handle(request)
+        finally:
+            self.github.leave(token)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        token = request.headers.get("Authorization", "")
+        if not self.github.enter(token):
+            return self.github.secondary_limited()
+        try:
+            delay = self.github.delay()
+            if delay:
+                await trio.sleep(delay)
+            return self.github.handle(request)
+        finally:
+            self.github.leave(token)
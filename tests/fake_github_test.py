@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+import pytest
+import trio
+
+from hand.api.github import AsyncGithubAPI, GithubAPI, GithubQueryError
+from hand.api.ratelimit import RateLimitScheduler
+from hand.api.session import GithubSession, SessionOptions, get_session
+from hand.exchange import GitHubRepoCommit
+from hand.utils.github_scanner import query_matching_repos
+from .fake_github import EPOCH, FakeGithub
+
+
+def test_repo_listing_pages_and_revalidates(fake_github):
+    fake_github.add_classroom(250)
+
+    repos = query_matching_repos("org", "hw1-", "abc", verbose=False)
+    assert len(repos) == 250
+    # HEAD, then three pages of 100
+    assert len(fake_github.requests) == 4
+
+    # unchanged listing, the cache is still current
+    query_matching_repos("org", "hw1-", "abc", verbose=False)
+    assert len(fake_github.requests) == 5
+
+    # the HEAD request only sees changes to the first page, newest repos first
+    fake_github.push("hw1-student249", EPOCH + timedelta(days=1))
+    repos = query_matching_repos("org", "hw1-student249", "abc", verbose=False)
+    assert repos[0].pushed_at == "2020-09-02T00:00:00Z"
+
+
+def test_graphql_queries(fake_github):
+    fake_github.add_classroom(3)
+    late = fake_github.push("hw1-student1", EPOCH + timedelta(days=2))
+    fake_github.push("hw1-student2", EPOCH, branch="grading")
+    fake_github.add_issue("hw1-student2", "Grade")
+    gh = GithubAPI(token="abc", org="org")
+
+    assert gh.can_access_org()
+    commit = GitHubRepoCommit(name="hw1-student1", commit_hash=late.sha[:7])
+    assert gh.get_commit_pushed_time(commit) == "2020-09-03T00:00:00Z"
+    after = gh.get_commits_after(
+        ["hw1-student0", "hw1-student1", "hw1-nobody"], EPOCH + timedelta(days=1)
+    )
+    assert after["hw1-student0"].nm_commits == 0
+    assert after["hw1-student1"].last_commit_hash == late.sha[:7]
+    assert after["hw1-nobody"] is None
+    assert gh.remote_branches_exist(["hw1-student1", "hw1-student2"], "grading") == {
+        "hw1-student1": False,
+        "hw1-student2": True,
+    }
+    assert gh.find_issue_with_title("hw1-student2", "Grade") == 1
+
+
+def test_rate_limit_waits_for_reset():
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    github = FakeGithub(rate_limit=3, clock=lambda: now[0])
+    github.add_classroom(5)
+    scheduler = RateLimitScheduler(clock=lambda: now[0], sleep=sleep)
+    session = GithubSession(SessionOptions(transport=github.transport), scheduler)
+    gh = GithubAPI(token="abc", org="org", session=session)
+
+    assert all(gh.repo_exists(f"hw1-student{n}") for n in range(5))
+    # the scheduler saw the budget run out and waited for the reset, no retries
+    assert now[0] >= 1000 + 3600
+    assert len(github.requests) == 5
+
+
+def test_secondary_limit_and_errors(fake_github):
+    fake_github.add_classroom(2)
+    fake_github.latency = 0.01
+    fake_github.max_concurrent = 2
+    fake_github.retry_after = 0.01
+    users = [f"user{n}" for n in range(12)]
+    for u in users:
+        fake_github.add_user(u)
+
+    async def invite():
+        gh = AsyncGithubAPI(token="abc", org="org", concurrency=6)
+        return await gh.invite_users_to_team("students", users)
+
+    assert all(trio.run(invite).values())
+    assert fake_github.nm_secondary_limited > 0
+    assert get_session().scheduler.nm_throttled > 0
+
+    # a failed batch is an error, not a batch of missing repos
+    fake_github.fail_next("POST", "^/graphql$")
+    gh = GithubAPI(token="abc", org="org")
+    with pytest.raises(GithubQueryError):
+        gh.repos_exist(["hw1-student0"])
+    assert gh.repos_exist(["hw1-student0"]) == {"hw1-student0": True}
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+import iso8601
+
+from hand.scripts.deadlines import DeadlineEvaluator, to_epoch
+
+
+def test_to_epoch_formats():
+    assert to_epoch("2020-01-01T00:00:00Z") == 1577836800
+    assert to_epoch("2020-01-01T08:00:00+08:00") == 1577836800
+    # naive times are UTC, like iso8601.parse_date
+    assert to_epoch("2020-01-01 00:00:00") == 1577836800
+    assert to_epoch("20200101T000000Z") == 1577836800
+
+
+def test_evaluate_tiers_and_extensions():
+    evaluator = DeadlineEvaluator(
+        deadline=iso8601.parse_date("2020-01-01T00:00:00Z"),
+        extensions={"hw1-ext": iso8601.parse_date("2020-01-05T00:00:00Z")},
+    )
+    repos = ["hw1-a", "hw1-b", "hw1-c", "hw1-d", "hw1-e", "hw1-ext"]
+    pushed = [
+        "2019-12-31T23:00:00Z",  # on time
+        "2020-01-01T01:00:00Z",  # hours late
+        "2020-01-02T00:00:00Z",  # exactly 1 day late
+        "2020-01-03T00:00:01Z",  # 2 days late
+        "2020-01-20T00:00:00Z",  # beyond the last tier
+        "2020-01-04T00:00:00Z",  # on time with the extension
+    ]
+
+    result = evaluator.evaluate(repos, pushed)
+
+    assert list(result.tiers) == [0, 1, 1, 2, 4, 0]
+    assert result.late_indices() == [1, 2, 3, 4]
+    assert result.late_seconds[1] == timedelta(hours=1).total_seconds()
+    assert evaluator.tier_label(1) == "<= 1 day"
+    assert evaluator.tier_label(3) == "<= 7 days"
+    assert evaluator.tier_label(4) == "> 7 days"
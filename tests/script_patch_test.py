@@ -0,0 +1,339 @@
+import shutil
+import subprocess as sp
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import List
+
+import git as gitpython
+
+from hand.api.diff_cache import TemplateDiffCache
+from hand.api.git import GitApi
+from hand.api.github import GithubAPI
+from hand.scripts.patch import (
+    PatchResource,
+    RepoSyncResult,
+    ScriptRemotePatch,
+    patch_files,
+)
+from .fake_github import EPOCH
+
+
+class SlowGitApi:
+    """Every clone or pull takes a while, `hw1-bad` can't be reached"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.timeouts: List[float] = []
+
+    def _work(self, dst: Path, timeout):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.timeouts.append(timeout)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        if dst.name == "hw1-bad":
+            raise RuntimeError("could not resolve host")
+
+    def clone_remote(self, dst: Path, remote_url: str, timeout=None, **_):
+        self._work(dst, timeout)
+        dst.mkdir()
+
+    def sync_remote(self, dst: Path, remote_url: str, timeout=None):
+        self._work(dst, timeout)
+
+
+def make_resource(tmp_path: Path, git_api=None) -> PatchResource:
+    kwargs = {} if git_api is None else {"git_api": git_api}
+    return PatchResource(
+        base_dir=tmp_path,
+        src_dir=tmp_path / "source_repos",
+        student_dir=tmp_path / "student_repos",
+        github_org="org",
+        tmpl_repo_name="tmpl-hw1",
+        **kwargs,
+    )
+
+
+def test_fetch_student_remotes_in_parallel(tmp_path):
+    git_api = SlowGitApi()
+    res = make_resource(tmp_path, git_api)
+    res.student_dir.mkdir()
+    (res.student_dir / "hw1-s0").mkdir()
+    repos = [f"hw1-s{n}" for n in range(12)] + ["hw1-bad"]
+    progress: List[RepoSyncResult] = []
+
+    summary = res.fetch_student_remotes(
+        repos, workers=4, timeout=5, on_progress=lambda r, *_: progress.append(r)
+    )
+
+    assert git_api.max_in_flight <= 4
+    assert set(git_api.timeouts) == {5}
+    assert len(progress) == 13
+    assert summary.updated == ["hw1-s0"]
+    assert summary.cloned == repos[1:12]
+    assert [f.repo for f in summary.failed] == ["hw1-bad"]
+    assert "could not resolve host" in summary.failed[0].error
+    assert str(summary) == "11 cloned, 1 updated, 1 failed"
+
+
+def git(*args, cwd: Path):
+    sp.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def test_fetch_local_remotes(tmp_path, monkeypatch):
+    remotes = tmp_path / "remotes"
+    work = tmp_path / "work"
+    work.mkdir()
+    git("init", "-q", "-b", "master", cwd=work)
+    author = ("-c", "user.name=t", "-c", "user.email=t@t")
+    git(*author, "commit", "-q", "--allow-empty", "-m", "init", cwd=work)
+    for repo in ("hw1-a", "hw1-b"):
+        git("clone", "-q", "--bare", str(work), str(remotes / repo), cwd=tmp_path)
+    monkeypatch.setattr(PatchResource, "_repo_url", lambda _, name: str(remotes / name))
+    res = make_resource(tmp_path)
+    res.student_dir.mkdir()
+
+    first = res.fetch_student_remotes(["hw1-a", "hw1-b", "hw1-missing"])
+    second = res.fetch_student_remotes(["hw1-a"])
+
+    assert first.cloned == ["hw1-a", "hw1-b"]
+    assert [f.repo for f in first.failed] == ["hw1-missing"]
+    assert second.updated == ["hw1-a"]
+    assert (res.student_dir / "hw1-b" / ".git").is_dir()
+
+
+def count_objects(repo: Path) -> int:
+    out = sp.run(
+        ["git", "count-objects", "-v"], cwd=repo, check=True, capture_output=True
+    )
+    stats = dict(line.split(": ") for line in out.stdout.decode().splitlines())
+    return int(stats["count"]) + int(stats["in-pack"])
+
+
+def test_clone_against_template_mirror(tmp_path, monkeypatch):
+    remotes = tmp_path / "remotes"
+    work = tmp_path / "work"
+    work.mkdir()
+    author = ("-c", "user.name=t", "-c", "user.email=t@t")
+    git("init", "-q", "-b", "master", cwd=work)
+    for n in range(20):
+        (work / f"data{n}.txt").write_text(f"template {n}\n" * 1000)
+    git("add", ".", cwd=work)
+    git(*author, "commit", "-q", "-m", "template", cwd=work)
+    git("clone", "-q", "--bare", str(work), str(remotes / "tmpl-hw1"), cwd=tmp_path)
+    (work / "answer.txt").write_text("student\n")
+    git("add", ".", cwd=work)
+    git(*author, "commit", "-q", "-m", "answer", cwd=work)
+    git("clone", "-q", "--bare", str(work), str(remotes / "hw1-a"), cwd=tmp_path)
+    # file urls go through the git transport like a real remote would
+    monkeypatch.setattr(PatchResource, "_repo_url", lambda _, n: (remotes / n).as_uri())
+    res = make_resource(tmp_path)
+    res.src_dir.mkdir()
+    res.student_dir.mkdir()
+
+    res.fetch_template_mirror()
+    res.fetch_template_mirror()  # an existing mirror is updated in place
+    summary = res.fetch_student_remotes(["hw1-a"])
+
+    student = res.student_dir / "hw1-a"
+    assert summary.cloned == ["hw1-a"]
+    alternates = (student / ".git" / "objects" / "info" / "alternates").read_text()
+    assert alternates.strip() == str(res.src_dir / "tmpl-hw1.git" / "objects")
+    # the student commit, its tree and blob, and at most a delta base for the
+    # tree; none of the 20 template blobs are fetched again
+    assert count_objects(student) <= 4
+    assert (student / "data19.txt").read_text().startswith("template 19")
+
+
+def test_sparse_clone_of_patch_paths(tmp_path, monkeypatch):
+    remotes = tmp_path / "remotes"
+    work = tmp_path / "work"
+    (work / "src").mkdir(parents=True)
+    author = ("-c", "user.name=t", "-c", "user.email=t@t")
+    git("init", "-q", "-b", "master", cwd=work)
+    (work / "src" / "main.c").write_text("int main() {}\n")
+    (work / "src" / "[odd] name?.h").write_text("#pragma once\n")
+    (work / "dataset.bin").write_bytes(bytes(range(256)) * 4096)
+    git("add", ".", cwd=work)
+    git(*author, "commit", "-q", "-m", "answer", cwd=work)
+    git("clone", "-q", "--bare", str(work), str(remotes / "hw1-a"), cwd=tmp_path)
+    git("config", "uploadpack.allowFilter", "true", cwd=remotes / "hw1-a")
+    monkeypatch.setattr(PatchResource, "_repo_url", lambda _, n: (remotes / n).as_uri())
+    res = make_resource(tmp_path)
+    res.student_dir.mkdir()
+    res.patch_paths = ["src/[odd] name?.h", "src/new.c"]
+
+    assert res.fetch_student_remotes(["hw1-a"]).cloned == ["hw1-a"]
+
+    student = res.student_dir / "hw1-a"
+    assert sorted(p.name for p in student.iterdir()) == [".git", "src"]
+    assert [p.name for p in (student / "src").iterdir()] == ["[odd] name?.h"]
+    objects = sp.run(
+        ["git", "rev-list", "--objects", "--all", "--missing=print"],
+        cwd=student,
+        check=True,
+        capture_output=True,
+    )
+    missing = [o for o in objects.stdout.decode().splitlines() if o.startswith("?")]
+    # main.c and the dataset were never downloaded
+    assert len(missing) == 2
+
+
+def template_patch(tmp_path: Path):
+    """A template with a patch branch: edits, adds, deletes and renames files"""
+    work = tmp_path / "tmpl"
+    work.mkdir()
+    author = ("-c", "user.name=t", "-c", "user.email=t@t")
+    git("init", "-q", "-b", "master", cwd=work)
+    (work / "main.c").write_text("int main() {}\n")
+    (work / "old.h").write_text("#pragma once\n")
+    (work / "stale.txt").write_text("stale\n")
+    git("add", ".", cwd=work)
+    git(*author, "commit", "-q", "-m", "template", cwd=work)
+    git("checkout", "-q", "-b", "fix-1", cwd=work)
+    (work / "main.c").write_text("int main() { return 0; }\n")
+    (work / "logo.png").write_bytes(b"\x89PNG\0\xff")
+    git("mv", "old.h", "new.h", cwd=work)
+    git("rm", "-q", "stale.txt", cwd=work)
+    git("add", ".", cwd=work)
+    git(*author, "commit", "-q", "-m", "fix", cwd=work)
+    repo = gitpython.Repo(work)
+    return patch_files(repo.commit("master"), repo.commit("fix-1"))
+
+
+def test_remote_patch(fake_github, tmp_path):
+    files = template_patch(tmp_path)
+    assert sorted((f.path, f.content is None) for f in files) == [
+        ("logo.png", False),
+        ("main.c", False),
+        ("new.h", False),
+        ("old.h", True),
+        ("stale.txt", True),
+    ]
+    template = {
+        "main.c": b"int main() {}\n",
+        "old.h": b"#pragma once\n",
+        "stale.txt": b"stale\n",
+        "answer.c": b"42\n",
+    }
+    for repo in ("hw1-a", "hw1-b"):
+        fake_github.add_repo(repo)
+        fake_github.push(repo, EPOCH, files=template)
+    patched = {f.path: f.content for f in files}
+    fake_github.push("hw1-b", EPOCH + timedelta(days=1), files=patched)
+    fake_github.add_repo("hw1-empty")
+    done = []
+
+    script = ScriptRemotePatch(
+        gh_api=GithubAPI(token="abc", org="org"),
+        repos=["hw1-a", "hw1-b", "hw1-empty"],
+        files=files,
+        patch_branch="fix-1",
+        pr_body="Please merge",
+        on_result=done.append,
+    )
+    results = script.run()
+
+    assert [(r.repo, r.status) for r in results] == [
+        ("hw1-a", "patched"),
+        ("hw1-b", "no-op"),
+        ("hw1-empty", "failed"),
+    ]
+    assert results[2].error == "branch master not found"
+    assert len(done) == 3
+    hw1_a = fake_github.repos["hw1-a"]
+    assert hw1_a.files("fix-1") == {
+        "main.c": b"int main() { return 0; }\n",
+        "new.h": b"#pragma once\n",
+        "logo.png": b"\x89PNG\0\xff",
+        "answer.c": b"42\n",
+    }
+    assert hw1_a.pulls[0]["number"] == results[0].pull
+    assert hw1_a.pulls[0]["body"] == "Please merge"
+    # head, tree of the head, its files, a blob for the binary file, then the
+    # tree, commit, branch and PR
+    sent = [p for _, p in fake_github.requests if p.startswith("/repos/org/hw1-a")]
+    assert len(sent) == 8
+    assert "fix-1" not in fake_github.repos["hw1-b"].branches
+
+
+def test_changed_paths_of_a_rename(tmp_path):
+    author = ("-c", "user.name=t", "-c", "user.email=t@t")
+    git("init", "-q", "-b", "master", cwd=tmp_path)
+    (tmp_path / "old name.c").write_text("int main() {}\n" * 10)
+    git("add", ".", cwd=tmp_path)
+    git(*author, "commit", "-q", "-m", "template", cwd=tmp_path)
+    git("mv", "old name.c", "new.c", cwd=tmp_path)
+    git(*author, "commit", "-q", "-m", "rename", cwd=tmp_path)
+
+    paths = GitApi().changed_paths(tmp_path, "HEAD~1", "HEAD")
+    assert sorted(paths) == ["new.c", "old name.c"]
+
+
+def test_apply_template_patch(tmp_path, monkeypatch):
+    remotes = tmp_path / "remotes"
+    work = tmp_path / "work"
+    work.mkdir()
+    author = ("-c", "user.name=t", "-c", "user.email=t@t")
+    lines = [f"line {n}\n" for n in range(20)]
+    git("init", "-q", "-b", "master", cwd=work)
+    (work / "main.c").write_text("".join(lines))
+    git("add", ".", cwd=work)
+    git(*author, "commit", "-q", "-m", "template", cwd=work)
+    git("checkout", "-q", "-b", "fix-1", cwd=work)
+    (work / "main.c").write_text("".join(lines).replace("line 2\n", "fixed 2\n"))
+    (work / "Makefile").write_text("all:\n")
+    git("add", ".", cwd=work)
+    git(*author, "commit", "-q", "-m", "fix", cwd=work)
+    git("clone", "-q", "--bare", str(work), str(remotes / "tmpl-hw1"), cwd=tmp_path)
+
+    # students start from the template and edit it
+    edits = {
+        "hw1-clean": "".join(lines),
+        "hw1-merged": "".join(lines).replace("line 15\n", "student 15\n"),
+        "hw1-conflict": "".join(lines).replace("line 2\n", "student 2\n"),
+        "hw1-done": (work / "main.c").read_text(),
+    }
+    git("checkout", "-q", "master", cwd=work)
+    for repo, main_c in edits.items():
+        student = tmp_path / repo
+        git("clone", "-q", str(work), str(student), cwd=tmp_path)
+        (student / "main.c").write_text(main_c)
+        if repo == "hw1-done":
+            (student / "Makefile").write_text("all:\n")
+        git("add", ".", cwd=student)
+        git(*author, "commit", "-q", "--allow-empty", "-m", "hw", cwd=student)
+        git("clone", "-q", "--bare", str(student), str(remotes / repo), cwd=tmp_path)
+    monkeypatch.setattr(PatchResource, "_repo_url", lambda _, n: str(remotes / n))
+    res = make_resource(tmp_path)
+    res.src_dir.mkdir()
+    res.student_dir.mkdir()
+    res.fetch_pr_template_repo()
+    res.fetch_student_remotes(list(edits))
+
+    assert res.template_patch_paths("fix-1") == ["Makefile", "main.c"]
+    cache = TemplateDiffCache(tmp_path / "diffs")
+    patch = res.template_diff("fix-1", cache)
+    results = res.apply_template_patch(patch, list(edits))
+
+    assert {repo: r.status for repo, r in results.items()} == {
+        "hw1-clean": "applied",
+        "hw1-merged": "applied",
+        "hw1-conflict": "conflicted",
+        "hw1-done": "no-op",
+    }
+    assert results["hw1-conflict"].conflicts == ["main.c"]
+    merged = (res.student_dir / "hw1-merged" / "main.c").read_text()
+    assert "fixed 2\n" in merged and "student 15\n" in merged
+    assert (res.student_dir / "hw1-clean" / "Makefile").exists()
+
+    # the same pair of commits is never diffed twice
+    assert list(cache.path.iterdir()) == [patch]
+    shutil.rmtree(res.src_dir)
+    assert cache.get(res.src_dir, *patch.stem.split("-")) == patch
@@ -1,3 +1,6 @@
+import threading
+import time
+from datetime import timedelta
 from typing import List
 from unittest.mock import MagicMock
 
@@ -5,10 +8,12 @@ import iso8601
 import pytest
 from attr import attrib, attrs
 
-from hand.exchange import GitHubCommitInfo, GitHubRepoCommit
+from hand.exchange import GitHubCommitInfo, GitHubCommitsAfter, GitHubRepoCommit
 from hand.scripts.times import (
+    CommitFailed,
     DeadLinePassed,
     ScriptTimes,
+    ScriptTimesByPrefix,
     ScriptTimesDisplay,
     ScriptTimesDisplayImpl,
 )
@@ -58,8 +63,8 @@ def test_display():
     class MockedGHAPI:
         def __init__(self):
             m = MagicMock()
-            m.side_effect = input_commits
-            self.get_commit_pushed_time = m
+            m.side_effect = lambda commits: dict(zip(commits, input_commits))
+            self.get_commits_pushed_time = m
 
     gh_api = MockedGHAPI()
     display = ScriptTimesDisplayImpl(deadline=deadline)
@@ -87,8 +92,8 @@ def test_times():
     class MockedGHAPI:
         def __init__(self):
             m = MagicMock()
-            m.side_effect = input_commits
-            self.get_commit_pushed_time = m
+            m.side_effect = lambda commits: dict(zip(commits, input_commits))
+            self.get_commits_pushed_time = m
 
     gh_api = MockedGHAPI()
     display = FakeDisplay()
@@ -104,4 +109,165 @@ def test_times():
     script.run()
 
     assert len(display.passed) == 2
-    gh_api.get_commit_pushed_time.assert_called()
+    # every commit is resolved in a single batch
+    gh_api.get_commits_pushed_time.assert_called_once()
+
+
+def test_times_push_cache(tmp_path):
+    from hand.api.commit_cache import CommitPushCache
+
+    deadline = "2019-11-11 23:59:59"
+    repos = [
+        GitHubRepoCommit(name=f"repo{n}", commit_hash=f"aaaaaa{n}") for n in range(4)
+    ]
+
+    class MockedGHAPI:
+        org = "org"
+
+        def __init__(self):
+            self.get_commits_pushed_time = MagicMock(
+                side_effect=lambda commits: {c: "2019-11-12 13:00:11" for c in commits}
+            )
+
+    gh_api = MockedGHAPI()
+    cache = CommitPushCache(tmp_path / "push.sqlite3")
+    for nm_repos in (2, 4):
+        display = FakeDisplay()
+        script = ScriptTimes(
+            gh_api=gh_api,
+            repos=repos[:nm_repos],
+            deadline=iso8601.parse_date(deadline),
+            display=display,
+            push_cache=cache,
+        )
+        script.run()
+        assert len(display.passed) == nm_repos
+
+    # the second run only queries the commits not seen before
+    calls = gh_api.get_commits_pushed_time.call_args_list
+    assert [c.args[0] for c in calls] == [repos[:2], repos[2:]]
+
+
+def test_times_concurrent_batches():
+    deadline = "2019-11-11 23:59:59"
+    repos = [
+        GitHubRepoCommit(name=f"repo{n}", commit_hash=f"aaaaaa{n}") for n in range(10)
+    ]
+
+    class SlowGHAPI:
+        org = "org"
+
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+        def get_commits_pushed_time(self, commits):
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(0.02)
+            with self.lock:
+                self.in_flight -= 1
+            if commits[0].name == "repo4":
+                raise RuntimeError("bad gateway")
+            # repo9 doesn't exist
+            return {
+                c: None if c.name == "repo9" else "2019-11-12 13:00:11" for c in commits
+            }
+
+    @attrs(auto_attribs=True)
+    class FailureDisplay(FakeDisplay):
+        failed: List[CommitFailed] = attrib(factory=list)
+
+        def add_result_failed(self, f: CommitFailed):
+            self.failed.append(f)
+
+    gh_api = SlowGHAPI()
+    display = FailureDisplay()
+    script = ScriptTimes(
+        gh_api=gh_api,
+        repos=repos,
+        deadline=iso8601.parse_date(deadline),
+        display=display,
+        concurrency=2,
+        batch_size=2,
+    )
+    script.run()
+
+    assert gh_api.max_in_flight <= 2
+    assert len(display.passed) == 7
+    assert sorted(f.repo_name for f in display.failed) == ["repo4", "repo5", "repo9"]
+
+
+def test_times_by_prefix():
+    deadline = "2019-11-11 23:59:59"
+
+    class MockedGHAPI:
+        def get_commits_after(self, repos, since):
+            return {
+                "hw1-a": GitHubCommitsAfter(repo="hw1-a", nm_commits=0),
+                "hw1-b": GitHubCommitsAfter(
+                    repo="hw1-b",
+                    nm_commits=2,
+                    last_commit_hash="abc1234",
+                    last_committed_time="2019-11-12 13:00:11",
+                    last_pushed_time="2019-11-13 20:59:59",
+                ),
+                "hw1-c": None,
+            }
+
+    display = FakeDisplay()
+    script = ScriptTimesByPrefix(
+        gh_api=MockedGHAPI(),
+        repos=["hw1-a", "hw1-b", "hw1-c"],
+        deadline=iso8601.parse_date(deadline),
+        display=display,
+    )
+    script.run()
+
+    assert [(p.repo_name, p.last_pushtime) for p in display.passed] == [
+        ("hw1-b", "2019-11-13 20:59:59")
+    ]
+
+
+def test_times_by_prefix_with_extension():
+    deadline = iso8601.parse_date("2019-11-11 23:59:59")
+
+    def after(repo: str, pushed: str) -> GitHubCommitsAfter:
+        return GitHubCommitsAfter(
+            repo=repo,
+            nm_commits=1,
+            last_commit_hash="abc1234",
+            last_committed_time=pushed,
+            last_pushed_time=pushed,
+        )
+
+    class MockedGHAPI:
+        def get_commits_after(self, repos, since):
+            self.since = since
+            return {
+                "hw1-late": after("hw1-late", "2019-11-13 20:59:59"),
+                "hw1-ext": after("hw1-ext", "2019-11-13 20:59:59"),
+                "hw1-ext-late": after("hw1-ext-late", "2019-11-20 00:00:00"),
+            }
+
+    gh_api = MockedGHAPI()
+    display = FakeDisplay()
+    extension = iso8601.parse_date("2019-11-15 23:59:59")
+    script = ScriptTimesByPrefix(
+        gh_api=gh_api,
+        repos=["hw1-late", "hw1-ext", "hw1-ext-late"],
+        deadline=deadline,
+        display=display,
+        extensions={"hw1-ext": extension, "hw1-ext-late": extension},
+    )
+    script.run()
+
+    assert gh_api.since == deadline
+    # hw1-ext pushed within its own deadline
+    assert [(p.repo_name, p.late_tier) for p in display.passed] == [
+        ("hw1-late", "<= 3 days"),
+        ("hw1-ext-late", "<= 7 days"),
+    ]
+    assert display.passed[1].time_passed == timedelta(days=4, seconds=1)
@@ -0,0 +1,117 @@
+from typing import List
+
+import pytest
+
+from hand.api.session import get_session
+from hand.utils.event_sweep import PushEventIndex, sweep_org_push_events
+from hand.utils.github_scanner import GithubRequestError
+from .fake_http import FakeResponse, link_header
+
+
+def push_event(repo: str, created_at: str, *shas: str) -> dict:
+    return {
+        "type": "PushEvent",
+        "repo": {"name": f"org/{repo}"},
+        "actor": {"login": "student"},
+        "created_at": created_at,
+        "payload": {"commits": [{"sha": s, "message": f"commit {s}"} for s in shas]},
+    }
+
+
+def test_index_lookup_by_prefix():
+    index = PushEventIndex()
+    index.add_event(push_event("hw1-a", "2020-01-03T00:00:00Z", "abc1234ff", "abd99"))
+    # pushed again to another branch later on
+    index.add_event(push_event("hw1-a", "2020-01-05T00:00:00Z", "abc1234ff"))
+    index.add_event(push_event("hw1-a", "2020-01-01T00:00:00Z", "0123456"))
+
+    assert index.lookup("hw1-a", "abc1234").pushed_at == "2020-01-03T00:00:00Z"
+    assert index.lookup("hw1-a", "0123").sha == "0123456"
+    # ambiguous or unknown
+    assert index.lookup("hw1-a", "ab") is None
+    assert index.lookup("hw1-a", "fff") is None
+    assert index.lookup("hw1-b", "abc1234") is None
+    assert len(index) == 3
+
+
+def test_sweep_stops_once_targets_resolved(monkeypatch):
+    requested: List[int] = []
+
+    def fake_request(method, url, headers, params=None):
+        if url == "https://api.github.com/user":
+            return FakeResponse({"login": "ta"}, {})
+        assert url == "https://api.github.com/users/ta/events/orgs/org"
+        page = params["page"]
+        requested.append(page)
+        events = [
+            push_event(f"hw1-s{page}", "2020-01-01T00:00:00Z", f"{page:07d}"),
+            {"type": "IssuesEvent"},
+        ]
+        return FakeResponse(events, {"Link": link_header(3)})
+
+    monkeypatch.setattr(get_session().http, "request", fake_request)
+
+    index = sweep_org_push_events("org", "token", [("hw1-s1", "0000001")])
+    assert requested == [1]
+    assert index.lookup("hw1-s1", "0000001") is not None
+
+    requested.clear()
+    index = sweep_org_push_events("org", "token", [("hw1-s9", "0000009")])
+    # not in the feed, every page is swept and the caller falls back
+    assert requested == [1, 2, 3]
+    assert index.lookup("hw1-s9", "0000009") is None
+    assert index.nm_events == 3
+
+
+def test_sweep_falls_back_to_public_org_events(monkeypatch):
+    requested: List[str] = []
+
+    def fake_request(method, url, headers, params=None):
+        requested.append(url)
+        if url == "https://api.github.com/user":
+            return FakeResponse({"message": "Bad credentials"}, {}, status_code=401)
+        assert url == "https://api.github.com/orgs/org/events"
+        events = [push_event("hw1-s1", "2020-01-01T00:00:00Z", "0000001")]
+        return FakeResponse(events, {})
+
+    monkeypatch.setattr(get_session().http, "request", fake_request)
+
+    index = sweep_org_push_events("org", "token", [("hw1-s1", "0000001")])
+    assert requested == [
+        "https://api.github.com/user",
+        "https://api.github.com/orgs/org/events",
+    ]
+    assert index.lookup("hw1-s1", "0000001") is not None
+
+
+def test_ambiguous_prefix_is_reported_once(capsys):
+    index = PushEventIndex()
+    index.add_event(push_event("hw1-a", "2020-01-01T00:00:00Z", "abc1234", "abc9999"))
+    assert index.lookup("hw1-a", "abc") is None
+    assert index.lookup("hw1-a", "abc") is None
+    assert index._conflicts == {("hw1-a", "abc")}
+    assert capsys.readouterr().out == ""
+
+
+def paged_feed(status_of_page2: int):
+    def fake_request(method, url, headers, params=None):
+        if url == "https://api.github.com/user":
+            return FakeResponse({"login": "ta"}, {})
+        if params["page"] == 2:
+            return FakeResponse({"message": "error"}, {}, status_code=status_of_page2)
+        events = [push_event("hw1-s1", "2020-01-01T00:00:00Z", "0000001")]
+        return FakeResponse(events, {"Link": link_header(3)})
+
+    return fake_request
+
+
+def test_sweep_stops_past_the_kept_events(monkeypatch):
+    monkeypatch.setattr(get_session().http, "request", paged_feed(422))
+    index = sweep_org_push_events("org", "token", [("hw1-s9", "0000009")])
+    assert index.lookup("hw1-s1", "0000001") is not None
+
+
+def test_sweep_raises_other_errors(monkeypatch):
+    monkeypatch.setattr(get_session().http, "request", paged_feed(401))
+    with pytest.raises(GithubRequestError):
+        sweep_org_push_events("org", "token", [("hw1-s9", "0000009")])
@@ -0,0 +1,18 @@
+"""Stand-ins for the responses of the pooled http client, see `get_session().http`"""
+from typing import Any, Dict
+
+
+class FakeResponse:
+    def __init__(self, body: Any, headers: Dict[str, str], status_code: int = 200):
+        self.status_code = status_code
+        self.headers = headers
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+def link_header(last: int) -> str:
+    """`Link` header of the first page of a paged listing with `last` pages"""
+    url = "https://api.github.com/orgs/org/repos?per_page=100"
+    return f'<{url}&page=2>; rel="next", <{url}&page={last}>; rel="last"'
@@ -0,0 +1,170 @@
+import threading
+
+import trio
+
+from hand.api.session import get_session
+from hand.utils import github_scanner
+from hand.utils.github_scanner import (
+    RepoPartitioner,
+    desired_user,
+    last_page_from_link,
+    student_name_from,
+)
+from hand.utils.repo_store import RepoRecord
+from .fake_http import FakeResponse, link_header
+
+
+def test_last_page_from_link():
+    assert last_page_from_link(None) == 1
+    assert last_page_from_link("") == 1
+    assert last_page_from_link(link_header(34)) == 34
+    # parameters can come in any order
+    last = '<https://api.github.com/teams/1/members?page=7&per_page=100>; rel="last"'
+    assert last_page_from_link(last) == 7
+
+
+class FakePagedEndpoint:
+    """Serve `nm_pages` pages of three items each"""
+
+    def __init__(self, nm_pages: int):
+        self.nm_pages = nm_pages
+        self.requested_pages = []
+        self._lock = threading.Lock()
+
+    def respond(self, params) -> FakeResponse:
+        page = params["page"]
+        assert params["per_page"] == 100
+        with self._lock:
+            self.requested_pages.append(page)
+        headers = {"Link": link_header(self.nm_pages)} if self.nm_pages > 1 else {}
+        return FakeResponse([page * 10 + i for i in range(3)], headers)
+
+
+def test_paged_list_keeps_page_order(monkeypatch):
+    endpoint = FakePagedEndpoint(nm_pages=12)
+    monkeypatch.setattr(
+        get_session().http,
+        "request",
+        lambda method, url, headers, params: endpoint.respond(params),
+    )
+
+    result = github_scanner.get_github_endpoint_paged_list(
+        "orgs/org/repos", "token", verbose=False
+    )
+    assert result == [p * 10 + i for p in range(1, 13) for i in range(3)]
+    # no extra request for an empty page after the last one
+    assert sorted(endpoint.requested_pages) == list(range(1, 13))
+
+
+def test_paged_list_single_page(monkeypatch):
+    endpoint = FakePagedEndpoint(nm_pages=1)
+    monkeypatch.setattr(
+        get_session().http,
+        "request",
+        lambda method, url, headers, params: endpoint.respond(params),
+    )
+
+    result = github_scanner.get_github_endpoint_paged_list(
+        "orgs/org/repos", "token", verbose=False
+    )
+    assert result == [10, 11, 12]
+    assert endpoint.requested_pages == [1]
+
+
+def test_paged_list_async():
+    endpoint = FakePagedEndpoint(nm_pages=5)
+
+    class FakeClient:
+        async def get(self, url, params):
+            # finish pages in reverse order to make sure the order is restored
+            await trio.sleep(0.01 * (10 - params["page"]))
+            resp = endpoint.respond(params)
+            resp.headers = {k.lower(): v for k, v in resp.headers.items()}
+            return resp
+
+    result = trio.run(
+        github_scanner.get_github_endpoint_paged_list_async,
+        FakeClient(),
+        "orgs/org/repos",
+    )
+    assert result == [p * 10 + i for p in range(1, 6) for i in range(3)]
+
+
+def test_iter_paged_stops_early(monkeypatch):
+    endpoint = FakePagedEndpoint(nm_pages=10)
+    monkeypatch.setattr(
+        get_session().http,
+        "request",
+        lambda method, url, headers, params: endpoint.respond(params),
+    )
+
+    items = github_scanner.iter_github_endpoint_paged(
+        "repos/org/repo/issues", "token", predicate=lambda x: x % 10 == 1
+    )
+    assert next(items) == 11
+    assert next(items) == 21
+    assert endpoint.requested_pages == [1, 2]
+
+    assert list(items) == [p * 10 + 1 for p in range(3, 11)]
+    assert endpoint.requested_pages == list(range(1, 11))
+
+
+def test_aiter_paged_stops_early():
+    endpoint = FakePagedEndpoint(nm_pages=10)
+
+    class FakeClient:
+        async def get(self, url, params):
+            resp = endpoint.respond(params)
+            resp.headers = {"link": resp.headers["Link"]}
+            return resp
+
+    async def first_match():
+        items = github_scanner.aiter_github_endpoint_paged(
+            FakeClient(), "repos/org/repo/issues", predicate=lambda x: x == 42
+        )
+        async for item in items:
+            await items.aclose()
+            return item
+
+    assert trio.run(first_match) == 42
+    assert endpoint.requested_pages == [1, 2, 3, 4]
+
+
+def repo(name: str) -> RepoRecord:
+    return RepoRecord(
+        name=name,
+        full_name=f"org/{name}",
+        html_url="",
+        clone_url="",
+        ssh_url="",
+        private=True,
+        pushed_at="",
+    )
+
+
+def test_partition_repos():
+    names = [
+        "hw1-Alice-2",
+        "hw1-alice",
+        "hw1-bob",
+        "hw1-alice-1",
+        "hw1-TA-grader",
+        "hw1",
+        "hw10-carol",
+        "hw2-bob",
+    ]
+    partitioner = RepoPartitioner("hw1", ignore_list=["ta-Grader"])
+    result = partitioner.partition(repo(n) for n in names)
+
+    assert {s: [r.name for r in rs] for s, rs in result.students.items()} == {
+        "alice": ["hw1-alice", "hw1-alice-1", "hw1-Alice-2"],
+        "bob": ["hw1-bob"],
+    }
+    assert [r.name for r in result.ignored] == ["hw1-TA-grader"]
+    assert [r.name for r in result.unmatched] == ["hw1", "hw10-carol", "hw2-bob"]
+
+    # agrees with the per repo helpers
+    for n in names:
+        assert partitioner.is_desired(n) == desired_user("hw1", ["ta-Grader"], n)
+        if n.startswith("hw1-"):
+            assert partitioner.student_of(n) == student_name_from("hw1", n)
@@ -0,0 +1,147 @@
+import json
+import sqlite3
+
+from hand.api.session import get_session
+from hand.utils import github_scanner
+from hand.utils.repo_store import RepoRecord, RepoStore, prefix_upper_bound
+
+
+def mk_repo(name: str, pushed_at: str = "2020-01-01T00:00:00Z") -> dict:
+    """A trimmed down repo payload as returned by the Github api"""
+    return {
+        "name": name,
+        "full_name": f"org/{name}",
+        "html_url": f"https://github.com/org/{name}",
+        "clone_url": f"https://github.com/org/{name}.git",
+        "ssh_url": f"git@github.com:org/{name}.git",
+        "private": True,
+        "pushed_at": pushed_at,
+        "owner": {"login": "org"},
+    }
+
+
+def mk_record(name: str, pushed_at: str = "2020-01-01T00:00:00Z") -> RepoRecord:
+    return RepoRecord.from_github(mk_repo(name, pushed_at))
+
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound("hw3-") == "hw3."
+    assert prefix_upper_bound("") is None
+
+
+def test_prefix_query(tmp_path):
+    store = RepoStore(tmp_path / "repos.sqlite3")
+    store.replace_all(
+        [mk_record(n) for n in ["hw3-a", "hw3-b", "hw30-c", "hw3", "hw2-a", "hw4-a"]]
+    )
+    store.commit()
+
+    names = [r.name for r in store.with_prefix("hw3-")]
+    assert names == ["hw3-a", "hw3-b"]
+    assert len(store.with_prefix("")) == 6
+
+
+def test_store_persists_between_opens(tmp_path):
+    path = tmp_path / "repos.sqlite3"
+    store = RepoStore(path)
+    store.upsert([mk_record("hw1-a")])
+    store.set_meta("ETag", "abc")
+    store.commit()
+    store.close()
+
+    store = RepoStore(path)
+    assert store.get_meta("ETag") == "abc"
+    assert store.pushed_times() == {"hw1-a": "2020-01-01T00:00:00Z"}
+    assert store.all() == [mk_record("hw1-a")]
+
+
+def test_migrate_schema_v1(tmp_path):
+    path = tmp_path / "repos.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.executescript(
+        """
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE repos (name TEXT PRIMARY KEY, pushed_at TEXT, payload TEXT);
+        INSERT INTO meta VALUES ('schema', '1'), ('ETag', 'e1');
+        """
+    )
+    conn.execute(
+        "INSERT INTO repos VALUES (?, ?, ?)",
+        ("hw1-a", None, json.dumps(mk_repo("hw1-a"))),
+    )
+    conn.commit()
+    conn.close()
+
+    store = RepoStore(path)
+    assert store.get_meta("ETag") == "e1"
+    assert store.all() == [mk_record("hw1-a")]
+
+
+def test_migrate_json_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(github_scanner, "DEFAULT_BASE_FOLDER", tmp_path)
+    monkeypatch.setattr(github_scanner, "scanner_cache", {})
+    legacy = tmp_path / ".github-classroom-utils.org.json"
+    legacy.write_text(json.dumps({"ETag": "e1", "Contents": [mk_repo("hw1-a")]}))
+
+    github_scanner.load_cache("org", verbose=False)
+
+    store = github_scanner.scanner_cache["org"]
+    assert store.get_meta("ETag") == "e1"
+    assert [r.name for r in store.all()] == ["hw1-a"]
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body=None, etag: str = ""):
+        self.status_code = status_code
+        self.headers = {"ETag": etag}
+        self._body = body
+        self.content = json.dumps(body).encode()
+
+    def json(self):
+        return self._body
+
+
+def test_incremental_sync_stops_at_known_repo(tmp_path, monkeypatch):
+    store = RepoStore(tmp_path / "repos.sqlite3")
+    store.replace_all([mk_record("hw1-a"), mk_record("hw1-b")])
+    store.set_json_meta("SyncETags", {"pushed": "p1"})
+
+    calls = []
+
+    def fake_request(method, url, headers, params):
+        calls.append((params["sort"], headers.get("If-None-Match")))
+        if params["sort"] == "created":
+            return FakeResponse(200, [mk_repo("hw1-c"), mk_repo("hw1-b")], "c2")
+        return FakeResponse(304)
+
+    monkeypatch.setattr(get_session().http, "request", fake_request)
+
+    changed, etags = github_scanner.sync_repos_incremental(
+        "org", "token", store, verbose=False
+    )
+    assert [r["name"] for r in changed] == ["hw1-c"]
+    assert etags == {"created": "c2", "pushed": "p1"}
+    assert calls == [("created", None), ("pushed", "p1")]
+
+
+def test_incremental_sync_new_repo_and_older_push(tmp_path, monkeypatch):
+    t0, t1, t2 = "2020-01-01T00:00:00Z", "2020-01-02T00:00:00Z", "2020-01-03T00:00:00Z"
+    store = RepoStore(tmp_path / "repos.sqlite3")
+    store.replace_all([mk_record("hw1-a", t0), mk_record("hw1-z", t0)])
+
+    def fake_request(method, url, headers, params):
+        if params["sort"] == "created":
+            return FakeResponse(200, [mk_repo("hw1-b", t2), mk_repo("hw1-a", t1)])
+        # the new repo is the latest push, hw1-a was pushed since the last sync
+        pushed = [mk_repo("hw1-b", t2), mk_repo("hw1-a", t1), mk_repo("hw1-z", t0)]
+        return FakeResponse(200, pushed)
+
+    monkeypatch.setattr(get_session().http, "request", fake_request)
+
+    changed, _ = github_scanner.sync_repos_incremental(
+        "org", "token", store, verbose=False
+    )
+    assert sorted((r["name"], r["pushed_at"]) for r in changed) == [
+        ("hw1-a", t1),
+        ("hw1-b", t2),
+    ]